@@ -1,18 +1,43 @@
-import grpc
-from tensorflow_serving.apis import model_pb2
-from tensorflow_serving.apis import get_model_metadata_pb2, predict_pb2
-from tensorflow_serving.apis import get_model_status_pb2, model_management_pb2
-
-from tensorflow_serving.apis import prediction_service_pb2_grpc
-from tensorflow_serving.apis import model_service_pb2_grpc
-
-from base import Message, GRPCService
-from config import ModelConfig, ModelConfigList
+import queue
+import time
+from collections import deque
+from collections.abc import Mapping
+
+from base import Message, LazyMessage, RawStub, ChannelPool, ChannelOptions, GRPCService, AsyncGRPCService
+from base import _call_kwargs
+from fields import ScalarField, ValueField, MessageField, RepeatedScalarField
+from fields import RepeatedMessageField, MapField
+from config import ModelConfig, ModelConfigList, ModelServerConfig
 from util import Status
-from tf_utils import _make_tensor_proto, _make_ndarray
-
+from wire import encode_varint, encode_length_delimited, scan_map
+from lazy_loader import LazyLoader
+
+# imported on first use, see `LazyLoader`
+asyncio = LazyLoader('asyncio', globals(), 'asyncio')
+np = LazyLoader('np', globals(), 'numpy')
+model_pb2 = LazyLoader('model_pb2', globals(), 'tensorflow_serving.apis.model_pb2')
+get_model_metadata_pb2 = LazyLoader('get_model_metadata_pb2', globals(),
+                                    'tensorflow_serving.apis.get_model_metadata_pb2')
+predict_pb2 = LazyLoader('predict_pb2', globals(), 'tensorflow_serving.apis.predict_pb2')
+get_model_status_pb2 = LazyLoader('get_model_status_pb2', globals(),
+                                  'tensorflow_serving.apis.get_model_status_pb2')
+model_management_pb2 = LazyLoader('model_management_pb2', globals(),
+                                  'tensorflow_serving.apis.model_management_pb2')
+prediction_service_pb2 = LazyLoader('prediction_service_pb2', globals(),
+                                    'tensorflow_serving.apis.prediction_service_pb2')
+prediction_service_pb2_grpc = LazyLoader('prediction_service_pb2_grpc', globals(),
+                                         'tensorflow_serving.apis.prediction_service_pb2_grpc')
+model_service_pb2_grpc = LazyLoader('model_service_pb2_grpc', globals(),
+                                    'tensorflow_serving.apis.model_service_pb2_grpc')
+tensor_pb2 = LazyLoader('tensor_pb2', globals(), 'tensorflow.core.framework.tensor_pb2')
+types_pb2 = LazyLoader('types_pb2', globals(), 'tensorflow.core.framework.types_pb2')
+dtypes = LazyLoader('dtypes', globals(), 'tensorflow.python.framework.dtypes')
+tensor_util = LazyLoader('tensor_util', globals(), 'tensorflow.python.framework.tensor_util')
+tf_utils = LazyLoader('tf_utils', globals(), 'tf_utils')
 
 class ModelSpec(Message):
+    __slots__ = ()
+
     def __init__(self, name=None, version=None, version_label=None,
                     signature_name=None, **kwargs):
         super().__init__(model_pb2.ModelSpec(),
@@ -23,47 +48,21 @@ class ModelSpec(Message):
                          **kwargs)
     
     # type: string
-    @property
-    def name(self):
-        return self._protobuf.name
-        
-    @name.setter
-    def name(self, _name):
-        self._protobuf.name = _name
-        self.__set_in_parent__()
+    name = ScalarField()
 
     # type: (Int64Wrapper) message
-    @property
-    def version(self):
-        return self._protobuf.version.value
-        
-    @version.setter
-    def version(self, _version):
-        self._protobuf.version.value = _version
-        self.__set_in_parent__()
+    version = ValueField()
 
     # type: string
-    @property
-    def version_label(self):
-        return self._protobuf.version_label
-        
-    @version_label.setter
-    def version_label(self, _version_label):
-        self._protobuf.version_label = _version_label
-        self.__set_in_parent__()
+    version_label = ScalarField()
 
     # type: string
-    @property
-    def signature_name(self):
-        return self._protobuf.signature_name
-        
-    @signature_name.setter
-    def signature_name(self, _signature_name):
-        self._protobuf.signature_name = _signature_name
-        self.__set_in_parent__()
+    signature_name = ScalarField()
 
 
 class ModelVersionStatus(Message):
+    __slots__ = ()
+
     def __init__(self, version=None, state=None, status=None, **kwargs):
         super().__init__(get_model_status_pb2.ModelVersionStatus(),
                          version=version,
@@ -72,58 +71,51 @@ class ModelVersionStatus(Message):
                          **kwargs)
     
     # type: int
-    @property
-    def version(self):
-        return self._protobuf.version
-        
-    @version.setter
-    def version(self, _version):
-        self._protobuf.version = _version
-        self.__set_in_parent__()
+    version = ScalarField()
 
     # type: enum
-    @property
-    def state(self):
-        return self._protobuf.state
-        
-    @state.setter
-    def state(self, _state):
-        self._protobuf.state = _state
-        self.__set_in_parent__()
+    state = ScalarField()
 
     # type: message
-    @property
-    def status(self):
-        if not hasattr(self, '_status'):
-            self._status = Status(container=self, descriptor='status')
-        return self._status.copy(self._protobuf.status)
-        
-    @status.setter
-    def status(self, _status):
-        self._protobuf.status.CopyFrom(self.unwrap_pb(_status))
-        self.__set_in_parent__()
+    status = MessageField(Status)
+
+
+# The input keys a sparse input `key` is sent as by default, its indices, values
+# and dense shape; the names the signature expects can be given as `keys`.
+SPARSE_KEYS = ('{}_indices', '{}_values', '{}_dense_shape')
 
 
+# `float_dtype` (float16 or bfloat16) opts in to encoding the float inputs as
+# half precision, halving their size on the wire; only use it if the model's
+# signature accepts it. Inputs given an explicit `dtype` are left as is.
+# NOTE: it trades CPU for wire size: float16 rounding (numpy's) is slower than
+# sending float32 over a fast network, e.g. +10 ms end to end for 3M values
+# over loopback; bfloat16 rounding is cheaper, about break-even. Only worth it
+# on a network slower than that, see `tests/benchmark_half_precision.py`.
+# `dtype_policy` (a `DtypePolicy`) sets the dtype of each input from the signature.
 class PredictRequest(Message):
+    __slots__ = ('input_shape', 'float_dtype', 'dtype_policy')
+
     def __init__(self, model_spec=None, inputs=None, output_filter=None, **kwargs):
         self.input_shape = kwargs.pop('input_shape', None)
+        self.float_dtype = kwargs.pop('float_dtype', None)
+        self.dtype_policy = kwargs.pop('dtype_policy', None)
         super().__init__(predict_pb2.PredictRequest(),
                          model_spec=model_spec,
                          inputs=inputs,
                          output_filter=output_filter,
                          **kwargs)
 
+    @classmethod
+    def _wrap(cls, protobuf, **kwargs):
+        obj = super()._wrap(protobuf, **kwargs)
+        obj.input_shape = None
+        obj.float_dtype = None
+        obj.dtype_policy = None
+        return obj
+
     # type: message
-    @property
-    def model_spec(self):
-        if not hasattr(self, '_model_spec'):
-            self._model_spec = ModelSpec(container=self, descriptor='model_spec')
-        return self._model_spec.copy(self._protobuf.model_spec)
-
-    @model_spec.setter
-    def model_spec(self, _model_spec):
-        self._protobuf.model_spec.CopyFrom(self.unwrap_pb(_model_spec))
-        self.__set_in_parent__()
+    model_spec = MessageField(ModelSpec)
 
     # type: (map) string : tensor_proto
     @property
@@ -133,24 +125,40 @@ class PredictRequest(Message):
     @inputs.setter
     def inputs(self, _dict_of_dicts):
         for key, kwargs in _dict_of_dicts.items():
-            self._protobuf.inputs[key].CopyFrom(_make_tensor_proto(**kwargs))
+            if 'sparse' in kwargs:
+                self._set_sparse_input(key, **kwargs)
+            else:
+                self._set_input(key, kwargs)
         self.__set_in_parent__()
 
-    # type: (repeated) string
-    @property
-    def output_filter(self):
-        return self._protobuf.output_filter
+    def _set_input(self, key, kwargs):
+        if self.dtype_policy is not None:
+            kwargs = self.dtype_policy.apply(key, kwargs)
+        elif self.float_dtype is not None and 'downcast' not in kwargs:
+            kwargs = dict(kwargs, downcast=self.float_dtype)
+        # a batch given as per-example arrays, see `_make_batch_tensor_proto`
+        make = (tf_utils._make_batch_tensor_proto if 'examples' in kwargs
+                else tf_utils._make_tensor_proto)
+        self._protobuf.inputs[key].CopyFrom(make(**kwargs))
+
+    # a sparse input, i.e. `{'sparse': matrix}` (see `_sparse_components`), is sent
+    # as its three component tensors, under the `keys` formatted with `key`; the
+    # other kwargs (e.g. `dtype`) apply to the values, as for a dense input
+    def _set_sparse_input(self, key, sparse, keys=SPARSE_KEYS, reorder=True, **kwargs):
+        indices_key, values_key, dense_shape_key = (name.format(key) for name in keys)
+        indices, values, dense_shape = tf_utils._sparse_components(sparse, reorder)
+        self._protobuf.inputs[indices_key].CopyFrom(tf_utils._make_tensor_proto(indices, dtypes.int64))
+        self._set_input(values_key, dict(kwargs, values=values))
+        self._protobuf.inputs[dense_shape_key].CopyFrom(
+            tf_utils._make_tensor_proto(dense_shape, dtypes.int64))
 
-    @output_filter.setter
-    def output_filter(self, _list):
-        if not isinstance(_list, (list, tuple)):
-            _list = [_list]
-        self._protobuf.ClearField('output_filter')
-        self._protobuf.output_filter.extend(_list)
-        self.__set_in_parent__()
+    # type: (repeated) string
+    output_filter = RepeatedScalarField()
 
 
 class PredictResponse(Message):
+    __slots__ = ()
+
     def __init__(self, model_spec=None, outputs=None, **kwargs):
         super().__init__(predict_pb2.PredictResponse(),
                          model_spec=model_spec,
@@ -158,34 +166,190 @@ class PredictResponse(Message):
                          **kwargs)
     
     # type: message
-    @property
-    def model_spec(self):
-        if not hasattr(self, '_model_spec'):
-            self._model_spec = ModelSpec(container=self, descriptor='model_spec')
-        return self._model_spec.copy(self._protobuf.model_spec)
-
-    @model_spec.setter
-    def model_spec(self, _model_spec):
-        raise AttributeError("Attribute is read-only, can't be set.")
+    model_spec = MessageField(ModelSpec, read_only=True)
 
     # type: (map) string : tensor_proto
-    @property
-    def outputs(self):
-        return self._protobuf.outputs
-
-    @outputs.setter
-    def outputs(self, _dict):
-        raise AttributeError("Attribute is read-only, can't be set.")
+    outputs = MapField(read_only=True)
 
-    def parse_outputs(self):
+    # `copy=False` returns read-only views over the response bytes where possible
+    def parse_outputs(self, lazy=False, copy=True):
+        if lazy:
+            return LazyOutputs(self.outputs, copy)
         parsed_output_dict = dict()
         for key in self.outputs.keys():
-            parsed_output_dict.setdefault(key, _make_ndarray(self.outputs[key]))
+            parsed_output_dict.setdefault(key, tf_utils._make_ndarray(self.outputs[key], copy))
         return parsed_output_dict
 
+    # Same as `parse_outputs(lazy=True)`, but straight from the serialized
+    # response, e.g. `predict_bytes(...).data`; the outputs not in `keys` are
+    # skipped over without being parsed.
+    @staticmethod
+    def parse_outputs_from_bytes(data, keys=None, copy=True):
+        return LazyOutputs(scan_map(data, 1, keys), copy)
+
+
+# A read-only mapping over the `outputs` of a `PredictResponse`, which
+# decodes an output to a `np.ndarray` on first access (and caches it).
+# The values are either `tensor_proto`s or their serialized bytes.
+class LazyOutputs(Mapping):
+    __slots__ = ('_tensors', '_copy', '_arrays')
+
+    def __init__(self, tensors, copy=True):
+        self._tensors = tensors
+        self._copy = copy
+        self._arrays = {}
+
+    def __getitem__(self, key):
+        array = self._arrays.get(key)
+        if array is None:
+            tensor = self._tensors[key]
+            if isinstance(tensor, (bytes, memoryview)):
+                tensor = tensor_pb2.TensorProto.FromString(tensor)
+            array = self._arrays[key] = tf_utils._make_ndarray(tensor, self._copy)
+        return array
+
+    def __contains__(self, key):
+        return key in self._tensors
+
+    def __iter__(self):
+        return iter(self._tensors)
+
+    def __len__(self):
+        return len(self._tensors)
+
+    def __repr__(self):
+        return '{}({})'.format(type(self).__name__, list(self._tensors))
+
     
+# A `PredictRequest` for a fixed model, serialized once; only the contents of
+# the input tensors are spliced in on `render`, which returns the wire bytes
+# of the request, without building any `pb` message.
+#
+#   >>> template = PredictRequestTemplate(PredictRequest(model_spec=model_spec,
+#   ...                                   inputs={'images': {'values': batch}}))
+#   >>> prediction_service.predict_bytes(template.render(images=next_batch))
+#
+# NOTE: the inputs must be of the same dtype as the template's tensors (float
+# inputs are rounded for float16 and bfloat16 tensors); the shape may change,
+# e.g. the batch size, in which case the (cached) tensor header is re-encoded.
+class PredictRequestTemplate(object):
+    def __init__(self, request):
+        request = Message.unwrap_pb(request)
+        # the fields before `inputs` (i.e. `model_spec`), and after it (e.g. `output_filter`),
+        # rendered around the inputs, in field number order as protobuf serializes them
+        number = request.DESCRIPTOR.fields_by_name['inputs'].number
+        head, tail = predict_pb2.PredictRequest(), predict_pb2.PredictRequest()
+        head.CopyFrom(request)
+        tail.CopyFrom(request)
+        for field, _ in request.ListFields():
+            if field.number >= number:
+                head.ClearField(field.name)
+            if field.number <= number:
+                tail.ClearField(field.name)
+        self._head = head.SerializeToString()
+        self._tail = tail.SerializeToString()
+        self._inputs = {key: _TemplateInput(key, tensor) for key, tensor in request.inputs.items()}
+
+    @property
+    def input_keys(self):
+        return list(self._inputs)
+
+    def render(self, inputs=None, **kwargs):
+        inputs = dict(inputs or {}, **kwargs)
+        if inputs.keys() != self._inputs.keys():
+            raise ValueError('Expected the inputs {}, got {}.'.format(sorted(self._inputs),
+                                                                      sorted(inputs)))
+        parts = [self._head]
+        for key, _input in self._inputs.items():
+            _input.encode(inputs[key], parts)
+        parts.append(self._tail)
+        return b''.join(parts)
+
+
+class _TemplateInput(object):
+    __slots__ = ('key_field', 'dtype', 'np_dtype', 'shape', 'headers')
+
+    # number of tensor headers kept per input, one per distinct shape
+    max_headers = 64
+
+    def __init__(self, key, tensor):
+        dtype = dtypes.as_dtype(tensor.dtype)
+        if dtype not in tensor_util._TENSOR_CONTENT_TYPES:
+            raise ValueError('`{}` of type {} can\'t be templated.'.format(key, tensor.dtype))
+        np_dtype = np.dtype(dtype.as_numpy_dtype)
+        # quantized types are structured numpy types around a single field
+        self.np_dtype = np_dtype[0] if np_dtype.fields else np_dtype
+        self.dtype = tensor.dtype
+        self.key_field = encode_length_delimited(1, key.encode('utf-8'))
+        self.shape = tuple(dim.size for dim in tensor.tensor_shape.dim)
+        self.headers = {}
+
+    def header(self, shape):
+        header = self.headers.get(shape)
+        if header is None:
+            if len(self.headers) >= self.max_headers:
+                self.headers.clear()
+            tensor = tensor_pb2.TensorProto(dtype=self.dtype)
+            for size in shape:
+                tensor.tensor_shape.dim.add(size=size)
+            header = self.headers[shape] = tensor.SerializeToString()
+        return header
+
+    def encode(self, value, parts):
+        if isinstance(value, (list, tuple)):
+            shape, contents = self.examples(value)
+        elif isinstance(value, np.ndarray):
+            value = self.array(value)
+            shape, contents = value.shape, [value]
+        else:
+            # a raw buffer, laid out as the template's tensor
+            shape, contents = self.shape, [self.buffer(value, self.shape)]
+        content_size = sum(memoryview(content).nbytes for content in contents)
+        header = self.header(shape)
+        # tensor_content = 4
+        content_field = b'\x22' + encode_varint(content_size)
+        tensor_size = len(header) + len(content_field) + content_size
+        # InputsEntry.value = 2
+        value_field = b'\x12' + encode_varint(tensor_size)
+        entry_size = len(self.key_field) + len(value_field) + tensor_size
+        # PredictRequest.inputs = 2
+        parts.extend((b'\x12', encode_varint(entry_size), self.key_field, value_field,
+                      header, content_field))
+        parts.extend(contents)
+
+    def array(self, value, shape=None):
+        if self.dtype == types_pb2.DT_BFLOAT16 and value.dtype.kind == 'f':
+            value = tensor_util.float32_to_bfloat16(value).view(np.uint16)
+        elif self.dtype == types_pb2.DT_HALF and value.dtype.kind == 'f':
+            value = value.astype(np.float16)
+        if value.dtype != self.np_dtype:
+            raise TypeError('Incompatible types: {} vs. {}.'.format(self.np_dtype, value.dtype))
+        if shape is not None and value.shape != shape:
+            raise ValueError('Expected an example of shape {}, got {}.'.format(shape, value.shape))
+        return np.ascontiguousarray(value)
+
+    def buffer(self, value, shape):
+        if memoryview(value).nbytes != int(np.prod(shape)) * self.np_dtype.itemsize:
+            raise ValueError('Buffer of {} bytes doesn\'t match the shape {}.'.format(
+                memoryview(value).nbytes, shape))
+        return value
+
+    # a batch of per-example arrays (or raw buffers), spliced in one by one,
+    # i.e. only copied once, into the rendered request
+    def examples(self, examples):
+        if not examples:
+            raise ValueError('Expected at least one example.')
+        example_shape = self.shape[1:]
+        if isinstance(examples[0], np.ndarray):
+            example_shape = examples[0].shape
+        contents = [self.array(example, example_shape) if isinstance(example, np.ndarray)
+                    else self.buffer(example, example_shape) for example in examples]
+        return (len(examples),) + tuple(example_shape), contents
+
+
 class GetModelMetadataRequest(Message):
-    
+    __slots__ = ()
+
     _supported_metadatafields = frozenset(['signature_def'])
 
     def __init__(self, model_spec=None, metadata_field=None, **kwargs):
@@ -195,16 +359,7 @@ class GetModelMetadataRequest(Message):
                          **kwargs)
         
     # type: message
-    @property
-    def model_spec(self):
-        if not hasattr(self, '_model_spec'):
-            self._model_spec = ModelSpec(container=self, descriptor='model_spec')
-        return self._model_spec.copy(self._protobuf.model_spec)
-
-    @model_spec.setter
-    def model_spec(self, _model_spec):
-        self._protobuf.model_spec.CopyFrom(self.unwrap_pb(_model_spec))
-        self.__set_in_parent__()
+    model_spec = MessageField(ModelSpec)
     
     # type: (repeated) string
     @property
@@ -229,6 +384,8 @@ class GetModelMetadataRequest(Message):
 
         
 class GetModelMetadataResponse(Message):
+    __slots__ = ()
+
     def __init__(self, model_spec=None, metadata=None, **kwargs):
         super().__init__(get_model_metadata_pb2.GetModelMetadataResponse(),
                          model_spec=model_spec,
@@ -236,125 +393,343 @@ class GetModelMetadataResponse(Message):
                          **kwargs)
         
     # type: message
-    @property
-    def model_spec(self):
-        if not hasattr(self, '_model_spec'):
-            self._model_spec = ModelSpec(container=self, descriptor='model_spec')
-        return self._model_spec.copy(self._protobuf.model_spec)
-
-    @model_spec.setter
-    def model_spec(self, _model_spec):
-        raise AttributeError("Attribute is read-only, can't be set.")
+    model_spec = MessageField(ModelSpec, read_only=True)
 
     # type: (map) string : any_proto
+    metadata = MapField(read_only=True)
+
+    # returns the `signature_def` map (`pb`) of signature name : signature_def
+    def parse_signature_def_map(self):
+        signature_def_map = get_model_metadata_pb2.SignatureDefMap()
+        if 'signature_def' in self.metadata:
+            self.metadata['signature_def'].Unpack(signature_def_map)
+        return signature_def_map.signature_def
+
+
+# The dtypes a model's signature expects for its inputs (see `GetModelMetadata`).
+# Inputs are cast to them straight away, rather than `MakeTensorProto` picking
+# the dtype (e.g. scanning int64 arrays for a lossless downcast to int32), and a
+# mismatch (an unknown input, values of another kind, e.g. floats for an int
+# input, or integers out of the range of a narrower one) raises before anything
+# is encoded.
+#
+#   >>> policy = prediction_service.get_dtype_policy(model_spec)
+#   >>> request = PredictRequest(model_spec=model_spec, inputs=..., dtype_policy=policy)
+class DtypePolicy(object):
+    __slots__ = ('input_dtypes',)
+
+    def __init__(self, input_dtypes):
+        self.input_dtypes = {key: dtypes.as_dtype(dtype) for key, dtype in input_dtypes.items()}
+
+    @classmethod
+    def from_signature_def(cls, signature_def):
+        return cls({key: info.dtype for key, info in signature_def.inputs.items()})
+
+    @classmethod
+    def from_metadata(cls, response, signature_name=None):
+        signature_name = signature_name or 'serving_default'
+        signature_def_map = response.parse_signature_def_map()
+        if signature_name not in signature_def_map:
+            raise KeyError('No signature `{}` in the metadata, got {}.'.format(
+                signature_name, sorted(signature_def_map)))
+        return cls.from_signature_def(signature_def_map[signature_name])
+
+    # returns the `_make_tensor_proto` kwargs of input `key`, with the signature's dtype
+    def apply(self, key, kwargs):
+        dtype = self.input_dtypes.get(key)
+        if dtype is None:
+            raise KeyError('`{}` is not an input of the signature, expected one of {}.'.format(
+                key, sorted(self.input_dtypes)))
+        if kwargs.get('dtype') is not None and dtypes.as_dtype(kwargs['dtype']) is not dtype:
+            raise TypeError('`{}` is given the dtype {}, the signature expects {}.'.format(
+                key, kwargs['dtype'], np.dtype(dtype.as_numpy_dtype)))
+        values = kwargs.get('values')
+        examples = kwargs.get('examples')
+        if isinstance(examples, (list, tuple)) and examples:
+            values = examples[0]
+        if isinstance(values, (np.ndarray, np.generic)) and not tensor_util._can_cast(values.dtype, dtype):
+            raise TypeError('`{}` of type {} can\'t be cast to {}, as the signature expects.'.format(
+                key, values.dtype, np.dtype(dtype.as_numpy_dtype)))
+        if isinstance(examples, (list, tuple)):
+            for example in examples:
+                self._check_range(key, example, dtype)
+        else:
+            self._check_range(key, kwargs.get('values'), dtype)
+        return dict(kwargs, dtype=dtype)
+
+    # the cast to a narrower integer type (e.g. int64 to int32) would wrap around
+    # the values out of its range, these are rejected instead
+    @staticmethod
+    def _check_range(key, values, dtype):
+        target = np.dtype(dtype.as_numpy_dtype)
+        if target.kind not in 'iu':
+            return
+        if isinstance(values, (list, tuple)):
+            values = np.asarray(values)
+        if not isinstance(values, (np.ndarray, np.generic)) or values.dtype.kind not in 'iu' or \
+                not values.size or np.can_cast(values.dtype, target):
+            return
+        info = np.iinfo(target)
+        low, high = values.min(), values.max()
+        if low < info.min or high > info.max:
+            raise ValueError('`{}` has values in [{}, {}], out of the range of {}, as the signature '
+                             'expects.'.format(key, low, high, target))
+
+
+# Sends `requests` (`PredictRequest`s, or their bytes as for `predict_bytes`)
+# pipelined, i.e. with up to `max_in_flight` of them in flight at once over
+# `stub.Predict.future`, rather than one round trip at a time. `requests` is
+# consumed as the responses come back, so a generator is never read ahead.
+# Iterating yields the responses in the order of `requests`, or, unless
+# `ordered`, as they complete, as `(index, response)` pairs.
+# `qps` and `mean_in_flight` report the achieved throughput and depth.
+#
+#   >>> pipeline = prediction_service.predict_pipelined(requests, max_in_flight=64)
+#   >>> scores = [response.parse_outputs()['scores'] for response in pipeline]
+#   >>> pipeline.qps, pipeline.mean_in_flight
+class PredictPipeline(object):
+    __slots__ = ('service', 'requests', 'max_in_flight', 'ordered', 'timeout', 'kwargs',
+                 'in_flight', 'completed', 'elapsed', '_sent', '_depth_sum')
+
+    def __init__(self, service, requests, max_in_flight=32, ordered=True, timeout=None, **kwargs):
+        if max_in_flight < 1:
+            raise ValueError('`max_in_flight` must be at least 1, got {}.'.format(max_in_flight))
+        self.service = service
+        self.requests = requests
+        self.max_in_flight = max_in_flight
+        self.ordered = ordered
+        self.timeout = timeout
+        self.kwargs = _call_kwargs(kwargs)
+        self.in_flight = self.completed = self._sent = self._depth_sum = 0
+        self.elapsed = 0.0
+
+    # responses per second, since the first request was sent
     @property
-    def metadata(self):
-        return self._protobuf.metadata
+    def qps(self):
+        return self.completed / self.elapsed if self.elapsed else 0.0
 
-    @metadata.setter
-    def metadata(self, _dict):
-        raise AttributeError("Attribute is read-only, can't be set.")
+    # the average number of requests in flight, right after sending one
+    @property
+    def mean_in_flight(self):
+        return self._depth_sum / self._sent if self._sent else 0.0
+
+    def _send(self, request):
+        if isinstance(request, bytes):
+            future = self.service.raw_stub.Predict.future(request, self.timeout, **self.kwargs)
+        else:
+            future = self.service.stub.Predict.future(Message.unwrap_pb(request), self.timeout,
+                                                      **self.kwargs)
+        self.in_flight += 1
+        self._sent += 1
+        self._depth_sum += self.in_flight
+        return future
+
+    def _receive(self, response, start):
+        self.in_flight -= 1
+        self.completed += 1
+        self.elapsed = time.perf_counter() - start
+        if isinstance(response, bytes):
+            return LazyMessage(response, PredictResponse, predict_pb2.PredictResponse)
+        return PredictResponse.wrap(response)
+
+    def __iter__(self):
+        # ordered: the futures in order; otherwise the pending futures by index,
+        # and `done` gets them as they complete
+        pending = deque() if self.ordered else {}
+        done = queue.SimpleQueue()
+        start = time.perf_counter()
+        try:
+            for index, request in enumerate(self.requests):
+                if self.in_flight == self.max_in_flight:
+                    yield self._next(pending, done, start)
+                future = self._send(request)
+                if self.ordered:
+                    pending.append(future)
+                else:
+                    pending[index] = future
+                    future.add_done_callback(lambda _, index=index: done.put(index))
+            while pending:
+                yield self._next(pending, done, start)
+        finally:
+            # e.g. the iteration was stopped early, or a call failed
+            for future in (pending if self.ordered else pending.values()):
+                future.cancel()
+            self.in_flight = 0
+
+    def _next(self, pending, done, start):
+        if self.ordered:
+            return self._receive(pending.popleft().result(), start)
+        index = done.get()
+        return index, self._receive(pending.pop(index).result(), start)
+
+
+# `PredictPipeline` on `grpc.aio`, iterated with `async for`: each call is a
+# task, and at most `max_in_flight` of them are awaited at once.
+#
+#   >>> async for response in async_prediction_service.predict_pipelined(requests, max_in_flight=64):
+#   ...     scores = response.parse_outputs()['scores']
+class AsyncPredictPipeline(PredictPipeline):
+    __slots__ = ()
+
+    def _send(self, request):
+        if isinstance(request, bytes):
+            call = self.service.raw_stub.Predict(request, timeout=self.timeout, **self.kwargs)
+        else:
+            call = self.service.stub.Predict(Message.unwrap_pb(request), timeout=self.timeout,
+                                             **self.kwargs)
+        self.in_flight += 1
+        self._sent += 1
+        self._depth_sum += self.in_flight
+        return asyncio.ensure_future(call)
+
+    def __iter__(self):
+        raise TypeError('An `AsyncPredictPipeline` is iterated with `async for`.')
+
+    async def __aiter__(self):
+        # ordered: the tasks in order; otherwise the pending tasks, mapped to their index
+        pending = deque() if self.ordered else {}
+        start = time.perf_counter()
+        try:
+            for index, request in enumerate(self.requests):
+                if self.in_flight == self.max_in_flight:
+                    yield await self._next(pending, start)
+                task = self._send(request)
+                if self.ordered:
+                    pending.append(task)
+                else:
+                    pending[task] = index
+            while pending:
+                yield await self._next(pending, start)
+        finally:
+            # cancelling a task cancels its call
+            for task in pending:
+                task.cancel()
+            self.in_flight = 0
+
+    async def _next(self, pending, start):
+        if self.ordered:
+            return self._receive(await pending.popleft(), start)
+        done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+        # the first sent of those completed at once
+        task = min(done, key=pending.get)
+        return pending.pop(task), self._receive(task.result(), start)
 
-    # TODO: Add a method to parse the metadata response
 
-        
 class PredictionService(GRPCService):
-    def __init__(self, server):
-        super().__init__(server)
+    def __init__(self, server, options=None):
+        super().__init__(server, options)
         self.stub = prediction_service_pb2_grpc.PredictionServiceStub(self.channel)
+        self.raw_stub = RawStub(self.channel,
+                                prediction_service_pb2.DESCRIPTOR.services_by_name['PredictionService'])
 
-    @property
-    def predict(self):
-        return self.stub.Predict
-        
-    @property
-    def get_model_metadata(self):
-        return self.stub.GetModelMetadata
+    def predict(self, request, timeout=None, **kwargs):
+        return self.call(self.stub.Predict, request, PredictResponse, timeout, **kwargs)
+
+    # sends an already serialized `PredictRequest`, e.g. from a `PredictRequestTemplate`;
+    # the response is only parsed on first use, its bytes are kept as `data`
+    def predict_bytes(self, request, timeout=None, **kwargs):
+        if not isinstance(request, bytes):
+            request = Message.unwrap_pb(request).SerializeToString()
+        return LazyMessage(self.raw_stub.Predict(request, timeout, **_call_kwargs(kwargs)),
+                           PredictResponse, predict_pb2.PredictResponse)
+
+    # see `PredictPipeline`
+    def predict_pipelined(self, requests, max_in_flight=32, ordered=True, timeout=None, **kwargs):
+        return PredictPipeline(self, requests, max_in_flight, ordered, timeout, **kwargs)
+
+    def get_model_metadata(self, request, timeout=None, **kwargs):
+        return self.call(self.stub.GetModelMetadata, request, GetModelMetadataResponse,
+                         timeout, **kwargs)
+
+    # the `DtypePolicy` of a signature (by default, the one of `model_spec`)
+    def get_dtype_policy(self, model_spec, signature_name=None, timeout=None, **kwargs):
+        request = GetModelMetadataRequest(model_spec=model_spec, metadata_field='signature_def')
+        response = self.get_model_metadata(request, timeout, **kwargs)
+        return DtypePolicy.from_metadata(response, signature_name or request.model_spec.signature_name)
 
 
 class ReloadConfigRequest(Message):
+    __slots__ = ()
+
     def __init__(self, config=None, **kwargs):
         super().__init__(model_management_pb2.ReloadConfigRequest(), 
                          config=config,
                          **kwargs)
     
     # type: message
-    @property
-    def config(self):
-        if not hasattr(self, '_config'):
-            self._config = ModelServerConfig(container=self, descriptor='config')
-        return self._config.copy(self._protobuf.config)
-
-    @config.setter
-    def config(self, _config):
-        self._protobuf.config.CopyFrom(self.unwrap_pb(_config))
-        self.__set_in_parent__()
+    config = MessageField(ModelServerConfig)
 
 
 class ReloadConfigResponse(Message):
+    __slots__ = ()
+
     def __init__(self, status=None, **kwargs):
         super().__init__(model_management_pb2.ReloadConfigResponse(), 
                          status=status,
                          **kwargs)
 
     # type: message
-    @property
-    def status(self):
-        if not hasattr(self, '_status'):
-            self._status = Status(container=self, descriptor='status')
-        return self._status.copy(self._protobuf.status)
-
-    @status.setter
-    def status(self, value):
-        raise AttributeError("Attribute is read-only, can't be set.")
+    status = MessageField(Status, read_only=True)
 
     # TODO: Add method to process status if required; 
     # if it's general enough create a class for status and add to it.
 
 
 class GetModelStatusRequest(Message):
-    def __init__(self, model_spec=None):
+    __slots__ = ()
+
+    def __init__(self, model_spec=None, **kwargs):
         super().__init__(get_model_status_pb2.GetModelStatusRequest(), 
-                         model_spec=model_spec)
+                         model_spec=model_spec,
+                         **kwargs)
     
     # type: message
-    @property
-    def model_spec(self):
-        if not hasattr(self, '_model_spec'):
-            self._model_spec = ModelSpec(container=self, descriptor='model_spec')
-        return self._model_spec.copy(self._protobuf.model_spec)
-
-    @model_spec.setter
-    def model_spec(self, _model_spec):
-        self._protobuf.model_spec.CopyFrom(self.unwrap_pb(_model_spec))
-        self.__set_in_parent__()
+    model_spec = MessageField(ModelSpec)
     
 class GetModelStatusResponse(Message):
-    def __init__(self, model_version_status=None):
+    __slots__ = ()
+
+    def __init__(self, model_version_status=None, **kwargs):
         super().__init__(get_model_status_pb2.GetModelStatusResponse(), 
-                         model_version_status=model_version_status)
+                         model_version_status=model_version_status,
+                         **kwargs)
 
-    # type: message
-    @property
-    def model_version_status(self):
-        if not hasattr(self, '_model_version_status'):
-            self._model_version_status = ModelVersionStatus(container=self, descriptor='model_version_status')
-        return self._model_version_status.copy(self._protobuf.model_version_status)
-
-    @model_version_status.setter
-    def model_version_status(self, _model_version_status):
-        self._protobuf.model_version_status.CopyFrom(self.unwrap_pb(_model_version_status))
-        self.__set_in_parent__()
+    # type: (repeated) message
+    model_version_status = RepeatedMessageField(ModelVersionStatus)
 
 class ModelService(GRPCService):
-    def __init__(self, server):
-        super().__init__(server)
+    def __init__(self, server, options=None):
+        super().__init__(server, options)
         self.stub = model_service_pb2_grpc.ModelServiceStub(self.channel)
 
-    @property
-    def reload_config(self):
-        return self.stub.HandleReloadConfigRequest
-        
-    @property
-    def get_model_status(self):
-        return self.stub.GetModelStatus
+    def reload_config(self, request, timeout=None, **kwargs):
+        return self.call(self.stub.HandleReloadConfigRequest, request, ReloadConfigResponse,
+                         timeout, **kwargs)
+
+    def get_model_status(self, request, timeout=None, **kwargs):
+        return self.call(self.stub.GetModelStatus, request, GetModelStatusResponse,
+                         timeout, **kwargs)
+
+
+# The services on `grpc.aio` (see `AsyncGRPCService`): the same methods, taking
+# and returning the same wrappers, are awaited, e.g. `await service.predict(request)`.
+# Only the methods that do more than `call` are redefined.
+class AsyncPredictionService(AsyncGRPCService, PredictionService):
+    async def predict_bytes(self, request, timeout=None, **kwargs):
+        if not isinstance(request, bytes):
+            request = Message.unwrap_pb(request).SerializeToString()
+        response = await self.raw_stub.Predict(request, timeout=timeout, **_call_kwargs(kwargs))
+        return LazyMessage(response, PredictResponse, predict_pb2.PredictResponse)
+
+    async def get_dtype_policy(self, model_spec, signature_name=None, timeout=None, **kwargs):
+        request = GetModelMetadataRequest(model_spec=model_spec, metadata_field='signature_def')
+        response = await self.get_model_metadata(request, timeout, **kwargs)
+        return DtypePolicy.from_metadata(response, signature_name or request.model_spec.signature_name)
+
+    # see `AsyncPredictPipeline`
+    def predict_pipelined(self, requests, max_in_flight=32, ordered=True, timeout=None, **kwargs):
+        return AsyncPredictPipeline(self, requests, max_in_flight, ordered, timeout, **kwargs)
+
+
+class AsyncModelService(AsyncGRPCService, ModelService):
+    pass
@@ -1,12 +1,61 @@
-import grpc
-from google.protobuf import text_format
+import itertools
+import threading
+from collections import namedtuple
 
+from lazy_loader import LazyLoader
+
+# imported on first use, see `LazyLoader`
+grpc = LazyLoader('grpc', globals(), 'grpc')
+aio = LazyLoader('aio', globals(), 'grpc.aio')
+text_format = LazyLoader('text_format', globals(), 'google.protobuf.text_format')
+
+# NOTE: the wrappers are `__slots__`-based, so every subclass must declare its
+# own `__slots__` (`()` if it adds no attributes, as the field descriptors live
+# on the class): without it, its instances get a `__dict__` back, with its memory
+# cost, and mistyped attributes are silently set instead of raising. Wrappers
+# made by `fields.make_wrapper` already do.
 class Message(object):
+    __slots__ = ('_protobuf', '_container', '_descriptor', '_copy_nested', '_view',
+                 '_dirty', '_dirty_children', '_children')
+
+    # position of each nested message attribute in `_children`, the cache of
+    # their wrappers, which is allocated on first access
+    _child_index = {}
+
     def __init__(self, protobuf, **kwargs):
         self._protobuf = protobuf
         self._container = kwargs.pop('container', None)
         self._descriptor = kwargs.pop('descriptor', None)
+        # nested message attributes alias the live sub-messages of `_protobuf`,
+        # unless `copy_nested` is set, in which case they are mirrored copies
+        self._copy_nested = kwargs.pop('copy_nested', False)
+        self._view = False
+        # pending writes of nested wrappers, synced into `_protobuf` by `flush`
+        self._dirty = False
+        self._dirty_children = None
+        self._children = None
         self.update(**kwargs)
+
+    @classmethod
+    def __register_child__(cls, descriptor):
+        index = cls.__dict__.get('_child_index')
+        if index is None:
+            index = cls._child_index = dict(cls._child_index)
+        return index.setdefault(descriptor, len(index))
+
+    def __cached_child__(self, descriptor):
+        children = self._children
+        if children is None:
+            children = self._children = [None] * len(self._child_index)
+        return children, self._child_index[descriptor]
+
+    @classmethod
+    def _wrap(cls, protobuf, container=None, descriptor=None, view=True):
+        # wraps `protobuf` as is, i.e. without running the derived constructor
+        obj = cls.__new__(cls)
+        Message.__init__(obj, protobuf, container=container, descriptor=descriptor)
+        obj._view = view and container is not None
+        return obj
     
     def update(self, **kwargs):
         if kwargs is None:  
@@ -19,100 +68,521 @@ class Message(object):
                 setattr(self, attr, val)
 
     def __set_in_parent__(self):
-        if self._container:
-            setattr(self._container, self._descriptor, self)
+        # only marks the path to the root as dirty, the actual copy into
+        # the ancestors is deferred until they are flushed
+        container = self._container
+        if container is None or self._dirty:
+            return
+        self._dirty = True
+        if container._dirty_children is None:
+            container._dirty_children = []
+        container._dirty_children.append(self)
+        container.__set_in_parent__()
+
+    def flush(self):
+        children = self._dirty_children
+        if children is None:
+            return self
+        self._dirty_children = None
+        for child in children:
+            child.flush()
+            child._dirty = False
+            # views write straight through, there's nothing to sync
+            if not child._view:
+                getattr(self._protobuf, child._descriptor).CopyFrom(child._protobuf)
+        return self
+
+    def __get_nested__(self, descriptor, wrapper):
+        children, index = self.__cached_child__(descriptor)
+        child = children[index]
+        if self._copy_nested:
+            if child is None:
+                child = wrapper._wrap(type(getattr(self._protobuf, descriptor))(),
+                                      container=self, descriptor=descriptor, view=False)
+                child._copy_nested = True
+                children[index] = child
+            elif child._dirty:
+                # holds writes that haven't been synced to `_protobuf` yet
+                return child
+            return child.copy(getattr(self._protobuf, descriptor))
+
+        protobuf = getattr(self._protobuf, descriptor)
+        # the sub-message is re-created by protobuf on `ClearField`, `CopyFrom`, etc.
+        if child is None or child._protobuf is not protobuf:
+            child = children[index] = wrapper._wrap(protobuf, container=self,
+                                                    descriptor=descriptor)
+        return child
+
+    def __get_repeated__(self, descriptor, wrapper):
+        children, index = self.__cached_child__(descriptor)
+        child = children[index]
+        protobuf = getattr(self._protobuf, descriptor)
+        if child is None or child._protobuf is not protobuf:
+            child = children[index] = MessageList(protobuf, wrapper, container=self,
+                                                  descriptor=descriptor)
+        return child
+
+    def __set_repeated__(self, descriptor, _list):
+        if isinstance(_list, MessageList):
+            _list = list(_list._protobuf)
+        elif not isinstance(_list, (list, tuple)):
+            _list = [_list]
+        _list = [self.unwrap_pb(item) for item in _list]
+        self.flush()
+        self._protobuf.ClearField(descriptor)
+        getattr(self._protobuf, descriptor).extend(_list)
+        self.__set_in_parent__()
+
+    def __set_nested__(self, descriptor, value):
+        value = self.unwrap_pb(value)
+        # pending writes of the nested wrappers land before being overwritten
+        self.flush()
+        getattr(self._protobuf, descriptor).CopyFrom(value)
+        self.__set_in_parent__()
 
     def __str__(self):
-        return str(self._protobuf)
+        return str(self.flush()._protobuf)
 
     def __repr__(self):
-        return repr(self._protobuf)
+        return repr(self.flush()._protobuf)
             
     def from_text(self, path):
         with open(path, 'r+') as f: 
-            text_format.Merge(text=f.read(), message=self._protobuf)           
+            text_format.Merge(text=f.read(), message=self.flush()._protobuf)           
 
     def to_text(self, path):
         with open(path, 'w+') as f:
-            f.write(text_format.MessageToString(message=self._protobuf))
+            f.write(text_format.MessageToString(message=self.flush()._protobuf))
 
     def from_pb(self, path):
         with open(path, 'rb') as f:
-            self._protobuf.ParseFromString(f.read())
+            self.flush()._protobuf.ParseFromString(f.read())
 
     def to_pb(self, path):
         with open(path, 'wb') as f:
-            f.write(self._protobuf.SerializeToString())       
+            f.write(self.flush()._protobuf.SerializeToString())       
 
     def copy(self, obj):
-        self._protobuf.CopyFrom(self.unwrap_pb(obj))
+        obj = self.unwrap_pb(obj)
+        self.flush()._protobuf.CopyFrom(obj)
         return self
 
+    def adopt(self, obj):
+        # takes ownership of `obj`, the counterpart of `copy` without copying;
+        # a nested wrapper can't let go of its parent's `pb` so it still copies
+        obj = self.unwrap_pb(obj)
+        if self._container is not None:
+            return self.copy(obj)
+        if obj.DESCRIPTOR is not self._protobuf.DESCRIPTOR:
+            raise TypeError('Parameter to adopt() must be instance of same class: '
+                            'expected {} got {}.'.format(self._protobuf.DESCRIPTOR.full_name,
+                                                         obj.DESCRIPTOR.full_name))
+        self._protobuf = obj
+        self._dirty_children = None
+        self._children = None
+        return self
+
+    @classmethod
+    def wrap(cls, protobuf):
+        # a new wrapper owning `protobuf`, e.g. a response returned by a stub
+        return cls._wrap(cls.unwrap_pb(protobuf))
+
     def merge(self, obj):
-        self._protobuf.MergeFrom(self.unwrap_pb(obj))
+        obj = self.unwrap_pb(obj)
+        self.flush()._protobuf.MergeFrom(obj)
         return self
 
     @property
     def is_initialized(self):
-        return self._protobuf.IsInitialized()
+        return self.flush()._protobuf.IsInitialized()
     
     @property
     def byte_size(self):
-        return self._protobuf.ByteSize()
+        return self.flush()._protobuf.ByteSize()
 
     @staticmethod
     def unwrap_pb(obj):
         if isinstance(obj, Message):
-            return obj._protobuf
+            return obj.flush()._protobuf
+        if isinstance(obj, LazyMessage):
+            return obj.message._protobuf
         return obj
 
+    @staticmethod
+    def wrap_pb(wrapper, protobuf, **kwargs):
+        # `wrapper` may either be a wrapper class or an instance of one
+        if not isinstance(wrapper, type):
+            wrapper = type(wrapper)
+        return wrapper._wrap(protobuf, **kwargs)
+
+
+# The serialized bytes of a `pb` message (e.g. a response received through a
+# `RawStub`), parsed into a `wrapper` of `protobuf_class` only on first use.
+# Attribute access is forwarded to the parsed message.
+class LazyMessage(object):
+    __slots__ = ('data', '_wrapper', '_protobuf_class', '_message')
+
+    def __init__(self, data, wrapper, protobuf_class):
+        self.data = data
+        self._wrapper = wrapper
+        self._protobuf_class = protobuf_class
+        self._message = None
+
+    @property
+    def is_parsed(self):
+        return self._message is not None
+
+    @property
+    def message(self):
+        if self._message is None:
+            self._message = self._wrapper.wrap(self._protobuf_class.FromString(self.data))
+        return self._message
+
+    def __getattr__(self, name):
+        return getattr(self.message, name)
+
+    def __bytes__(self):
+        return self.data
+
+    def __str__(self):
+        return str(self.message)
+
+    def __repr__(self):
+        return repr(self.message)
+
+
+# A stub for `service` (a `pb` service descriptor) that passes the request and
+# response bytes through as is, i.e. without serializing or parsing anything.
+class RawStub(object):
+    def __init__(self, channel, service):
+        for method in service.methods:
+            setattr(self, method.name, channel.unary_unary(
+                '/{}/{}'.format(service.full_name, method.name)))
+
+
+# The typed fields of `ChannelOptions` and the channel arguments they set.
+# See: https://grpc.github.io/grpc/core/group__grpc__arg__keys.html
+_CHANNEL_ARGS = (
+    # bytes, -1 for unlimited (the default receive limit is 4 MiB)
+    ('max_send_message_length', 'grpc.max_send_message_length'),
+    ('max_receive_message_length', 'grpc.max_receive_message_length'),
+    # keepalive pings, keeping idle connections warm between bursts
+    ('keepalive_time_ms', 'grpc.keepalive_time_ms'),
+    ('keepalive_timeout_ms', 'grpc.keepalive_timeout_ms'),
+    ('keepalive_permit_without_calls', 'grpc.keepalive_permit_without_calls'),
+    ('http2_max_pings_without_data', 'grpc.http2.max_pings_without_data'),
+    # HTTP/2 flow control: BDP probing grows the windows to the bandwidth-delay
+    # product, otherwise a stream's window stays at `stream_window_size` bytes
+    ('bdp_probe', 'grpc.http2.bdp_probe'),
+    ('stream_window_size', 'grpc.http2.lookahead_bytes'),
+    ('max_frame_size', 'grpc.http2.max_frame_size'),
+    ('write_buffer_size', 'grpc.http2.write_buffer_size'),
+)
+
+_COMPRESSION = {None: None, 'none': 0, 'deflate': 1, 'gzip': 2}
+
+
+# `compression` is 'gzip', 'deflate', 'none' or a `grpc.Compression` (or None)
+def compression_algorithm(compression):
+    if compression is None or isinstance(compression, int):
+        return None if compression is None else grpc.Compression(compression)
+    if compression not in _COMPRESSION:
+        raise ValueError('`compression` must be one of {}, got {}.'.format(
+            [name for name in _COMPRESSION if name], compression))
+    return grpc.Compression(_COMPRESSION[compression])
+
+
+# The options of the channels of a service (or a `ChannelPool`), the fields
+# left unset (None) are left to gRPC's defaults, see `_CHANNEL_ARGS`.
+# `compression` is the default of the calls, which can set their own as
+# `compression=...` (see `compression_algorithm`); `extra` are any other
+# channel arguments, as `(key, value)` pairs.
+#
+#   >>> options = ChannelOptions(max_receive_message_length=-1, keepalive_time_ms=10000,
+#   ...                          compression='gzip')
+#   >>> prediction_service = PredictionService('localhost:8500', options)
+class ChannelOptions(namedtuple('ChannelOptions', [name for name, _ in _CHANNEL_ARGS] + ['compression', 'extra'],
+                                defaults=(None,) * (len(_CHANNEL_ARGS) + 2))):
+    __slots__ = ()
+
+    def channel_args(self):
+        args = [(arg, int(value)) for (_, arg), value in zip(_CHANNEL_ARGS, self) if value is not None]
+        return args + list(self.extra or ())
+
+
+# the channel arguments and default compression of `options`, a `ChannelOptions`
+# or a list of raw `(key, value)` channel arguments
+def _channel_options(options):
+    if isinstance(options, ChannelOptions):
+        return options.channel_args(), compression_algorithm(options.compression)
+    return list(options or []), None
+
+
+# a call's kwargs, with `compression` given as in `compression_algorithm`
+def _call_kwargs(kwargs):
+    if kwargs.get('compression') is not None:
+        kwargs = dict(kwargs, compression=compression_algorithm(kwargs['compression']))
+    return kwargs
+
+
+# A multi-callable (see `grpc.Channel.unary_unary`) over each channel of a
+# `ChannelPool`, each call going to the channel the pool picks.
+class _PooledMultiCallable(object):
+    __slots__ = ('_pool', '_callables')
+
+    def __init__(self, pool, callables):
+        self._pool = pool
+        self._callables = callables
+
+    def __call__(self, request, timeout=None, **kwargs):
+        index = self._pool._acquire()
+        try:
+            return self._callables[index](request, timeout, **kwargs)
+        finally:
+            self._pool._release(index)
+
+    def with_call(self, request, timeout=None, **kwargs):
+        index = self._pool._acquire()
+        try:
+            return self._callables[index].with_call(request, timeout, **kwargs)
+        finally:
+            self._pool._release(index)
+
+    def future(self, request, timeout=None, **kwargs):
+        index = self._pool._acquire()
+        try:
+            future = self._callables[index].future(request, timeout, **kwargs)
+        except Exception:
+            self._pool._release(index)
+            raise
+        future.add_done_callback(lambda _: self._pool._release(index))
+        return future
+
+
+# A pool of `size` channels to `server`, each with a connection of its own, to
+# spread the calls over more than one HTTP/2 connection, i.e. past a server's
+# (or a proxy's) limit of concurrent streams per connection, see
+# `tests/benchmark_channel_pool.py`; without one, a single channel multiplexes
+# the calls just as well. Each call goes to the next channel (`round_robin`),
+# or to the one with the fewest calls in flight (`least_loaded`). Pass it to
+# the (blocking) services instead of the address for them to share it:
+#
+#   >>> pool = ChannelPool('localhost:8500', size=4)
+#   >>> prediction_service, model_service = PredictionService(pool), ModelService(pool)
+class ChannelPool(object):
+    POLICIES = ('round_robin', 'least_loaded')
+
+    def __init__(self, server, size=4, policy='round_robin', options=None):
+        if size < 1:
+            raise ValueError('`size` must be at least 1, got {}.'.format(size))
+        if policy not in self.POLICIES:
+            raise ValueError('`policy` must be one of {}, got {}.'.format(self.POLICIES, policy))
+        self.policy = policy
+        # channels to the same target, with the same options, would otherwise
+        # share their connection (the global subchannel pool)
+        args, compression = _channel_options(options)
+        args.append(('grpc.use_local_subchannel_pool', 1))
+        self.channels = [grpc.insecure_channel(server, args, compression) for _ in range(size)]
+        # the calls in flight on each channel
+        self.in_flight = [0] * size
+        self._lock = threading.Lock()
+        self._counter = itertools.count()
+
+    def __len__(self):
+        return len(self.channels)
+
+    def _acquire(self):
+        with self._lock:
+            if self.policy == 'round_robin':
+                index = next(self._counter) % len(self.channels)
+            else:
+                index = self.in_flight.index(min(self.in_flight))
+            self.in_flight[index] += 1
+        return index
+
+    def _release(self, index):
+        with self._lock:
+            self.in_flight[index] -= 1
+
+    # as `grpc.Channel.unary_unary`, for the stubs built on the pool
+    def unary_unary(self, method, request_serializer=None, response_deserializer=None, **kwargs):
+        return _PooledMultiCallable(self, [
+            channel.unary_unary(method, request_serializer, response_deserializer, **kwargs)
+            for channel in self.channels])
+
+    def close(self):
+        for channel in self.channels:
+            channel.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
 
 class GRPCService(object):
-    def __init__(self, server, **kwargs):
-        self.channel = self.create_insecure_channel(server)
+    # `server` is the address of the server, or a `ChannelPool` (which has its own
+    # options); `options` is a `ChannelOptions`, or a list of raw channel arguments
+    def __init__(self, server, options=None, **kwargs):
+        if isinstance(server, ChannelPool):
+            if options is not None:
+                raise ValueError('A `ChannelPool` has its own options, give them to the pool.')
+            self.channel = server
+        else:
+            self.channel = self.create_insecure_channel(server, options)
+
+    def create_insecure_channel(self, server, options=None):
+        return grpc.insecure_channel(server, *_channel_options(options))
+
+    @staticmethod
+    def call(method, request, wrapper, timeout=None, **kwargs):
+        # the response `pb` is adopted by `wrapper`, not copied
+        return wrapper.wrap(method(Message.unwrap_pb(request), timeout, **_call_kwargs(kwargs)))
+
+
+# Same as `GRPCService`, on a `grpc.aio` channel: `call` is a coroutine, so are
+# the methods of the services built on it, e.g. `await service.predict(request)`.
+# NOTE: the channel is bound to the event loop it's used in, create the service
+# in the (running) loop that uses it.
+class AsyncGRPCService(GRPCService):
+    def __init__(self, server, options=None, **kwargs):
+        if isinstance(server, ChannelPool):
+            raise TypeError('A `ChannelPool` holds blocking channels, it can\'t be used on `grpc.aio`.')
+        super().__init__(server, options, **kwargs)
 
-    def create_insecure_channel(self, server):
-        return grpc.insecure_channel(server)
+    def create_insecure_channel(self, server, options=None):
+        return aio.insecure_channel(server, *_channel_options(options))
+
+    @staticmethod
+    async def call(method, request, wrapper, timeout=None, **kwargs):
+        # `grpc.aio` takes the call options as keywords only
+        return wrapper.wrap(await method(Message.unwrap_pb(request), timeout=timeout,
+                                         **_call_kwargs(kwargs)))
+
+    async def close(self, grace=None):
+        await self.channel.close(grace)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
 
 
 # A container class for a list of messages
+# NOTE: repeated fields can't be detached from their parent `pb`, so a
+# `MessageList` always aliases the live repeated container.
 class MessageList(Message):
+    __slots__ = ('_wrapper', '_pool')
+
     def __init__(self, protobuf, wrapper, **kwargs):
         super().__init__(protobuf, **kwargs)
-        self._wrapper = wrapper
+        # `wrapper` may either be a wrapper class or an instance of one
+        self._wrapper = wrapper if isinstance(wrapper, type) else type(wrapper)
+        self._view = self._container is not None
+        # item wrappers, reused for as long as the item at an index doesn't change;
+        # dropped from the first index a removal or a move changes, see `__shifted__`
+        self._pool = []
+
+    def __pooled__(self, index, item):
+        pool = self._pool
+        if index >= len(pool):
+            pool.extend([None] * (index + 1 - len(pool)))
+        wrapped = pool[index]
+        if wrapped is None or wrapped._protobuf is not item:
+            wrapped = pool[index] = self._wrapper._wrap(item, container=self)
+        return wrapped
+
+    # the items from `index` on moved, so their pooled wrappers (which would keep
+    # removed items alive) are dropped
+    def __shifted__(self, index=0):
+        del self._pool[index:]
+        self.__set_in_parent__()
 
     def __len__(self):
         return self._protobuf.__len__()
 
     def __getitem__(self, key):
-        return self.wrap_pb(self._wrapper, self._protobuf.__getitem__(key))
+        if isinstance(key, slice):
+            return MessageListSlice(self, range(len(self._protobuf))[key])
+        if key < 0:
+            key += len(self._protobuf)
+        return self.__pooled__(key, self._protobuf[key])
 
     def __setitem__(self, key, value):
         self._protobuf.__setitem__(key, self.unwrap_pb(value))
         self.__set_in_parent__()
 
     def __delitem__(self, key):
-        return self._protobuf.__delitem__(key)
+        indices = range(len(self._protobuf))[key]
+        self._protobuf.__delitem__(key)
+        if isinstance(indices, range):
+            self.__shifted__(min(indices, default=len(self._pool)))
+        else:
+            self.__shifted__(indices)
 
     def __iter__(self):
-        return iter([self.wrap_pb(self._wrapper, item) for item in self._protobuf])
+        for index, item in enumerate(self._protobuf):
+            yield self.__pooled__(index, item)
 
     def extend(self, _list):
-        # extend works like append for single non-list items
-        if not isinstance(_list, (tuple, list)):
+        # extend works like append for single items
+        if isinstance(_list, Message) and not isinstance(_list, MessageList) or \
+                hasattr(_list, 'DESCRIPTOR'):
             _list = [_list]
-        _list = [self.unwrap_pb(item) for item in _list]
-        self._protobuf.extend(_list)
+        if isinstance(_list, MessageList):
+            # its items aren't wrapped (and pooled) only to be unwrapped
+            _list = _list._protobuf
+        self._protobuf.extend([self.unwrap_pb(item) for item in _list])
+        self.__set_in_parent__()
 
     def insert(self, index, _item):
+        size = len(self._protobuf)
         self._protobuf.insert(index, self.unwrap_pb(_item))
+        # as `list.insert`, out of range indices are clamped
+        self.__shifted__(min(max(index + size if index < 0 else index, 0), size))
 
-    def pop(self, index=None):
-        index = index or -1
-        return self.wrap_pb(self._wrapper, self._protobuf.pop(index))
+    def pop(self, index=-1):
+        index = range(len(self._protobuf))[index]
+        item = self._protobuf.pop(index)
+        self.__shifted__(index)
+        return self.wrap_pb(self._wrapper, item)
 
     def remove(self, value):
-        self._protobuf.remove(value)
+        self._protobuf.remove(self.unwrap_pb(value))
+        self.__shifted__()
 
-    def sort(self):
-        self._protobuf.sort()
+    def sort(self, **kwargs):
+        self._protobuf.sort(**kwargs)
+        self.__shifted__()
+
+    def clear(self):
+        del self._protobuf[:]
+        self.__shifted__()
+
+
+# A view over a range of items of a `MessageList`, returned on slicing.
+# NOTE: the range is fixed at slicing time; the items are looked up lazily.
+class MessageListSlice(object):
+    __slots__ = ('_list', '_range')
+
+    def __init__(self, message_list, _range):
+        self._list = message_list
+        self._range = _range
+
+    def __len__(self):
+        return len(self._range)
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            return MessageListSlice(self._list, self._range[key])
+        return self._list[self._range[key]]
+
+    def __iter__(self):
+        message_list = self._list
+        for index in self._range:
+            yield message_list[index]
+
+    def __repr__(self):
+        return repr([message._protobuf for message in self])
@@ -0,0 +1,266 @@
+'''Client-side micro-batching of `Predict` calls.
+
+Concurrent calls for the same model (`model_spec`, `output_filter`, and
+inputs of the same keys, dtypes and example shapes) are queued, their
+inputs concatenated along the batch (first) dimension, and sent as a
+single request once `max_batch_size` examples are queued or the first one
+has waited `batch_timeout_micros`, as the server's `BatchingParameters`
+do. The outputs are split back along the batch dimension, each caller
+getting a `PredictResponse` of its own examples.
+
+    >>> batcher = PredictBatcher(prediction_service, max_batch_size=32, batch_timeout_micros=2000)
+    >>> response = batcher.predict(request)  # from any number of threads
+    >>> future = batcher.submit(request)     # or, without blocking
+    >>> batcher.close()
+
+Outputs that aren't batched (i.e. whose first dimension isn't the batch
+size) are given to every caller as is.
+'''
+import queue
+import threading
+import time
+from concurrent import futures
+
+from base import Message, _call_kwargs
+from lazy_loader import LazyLoader
+
+# imported on first use, see `LazyLoader`
+np = LazyLoader('np', globals(), 'numpy')
+predict_pb2 = LazyLoader('predict_pb2', globals(), 'tensorflow_serving.apis.predict_pb2')
+tensor_pb2 = LazyLoader('tensor_pb2', globals(), 'tensorflow.core.framework.tensor_pb2')
+tf_utils = LazyLoader('tf_utils', globals(), 'tf_utils')
+apis = LazyLoader('apis', globals(), 'apis')
+
+# stops the dispatcher, see `PredictBatcher.close`
+_CLOSE = object()
+
+
+# A queued call: its request (`pb`), batch size and future.
+class _Call(object):
+    __slots__ = ('request', 'batch_size', 'future')
+
+    def __init__(self, request, batch_size):
+        self.request = request
+        self.batch_size = batch_size
+        self.future = futures.Future()
+
+
+# The calls queued for one model, sent together, see `PredictBatcher`.
+class _Batch(object):
+    __slots__ = ('calls', 'batch_size', 'deadline')
+
+    def __init__(self, deadline):
+        self.calls = []
+        self.batch_size = 0
+        self.deadline = deadline
+
+
+# `service` is a (blocking) `PredictionService`, see the module's docstring.
+class PredictBatcher(object):
+    def __init__(self, service, max_batch_size=32, batch_timeout_micros=1000, timeout=None, **kwargs):
+        if max_batch_size < 1:
+            raise ValueError('`max_batch_size` must be at least 1, got {}.'.format(max_batch_size))
+        self.service = service
+        self.max_batch_size = max_batch_size
+        self.batch_timeout_micros = batch_timeout_micros
+        # of the batched `Predict` calls
+        self.timeout = timeout
+        self.kwargs = _call_kwargs(kwargs)
+        self._queue = queue.SimpleQueue()
+        # `_closed` and the exception the dispatcher died of (`_error`), if any, are
+        # set, and checked on `submit`, under `_lock`, so no call is queued after
+        # `_CLOSE`, or after the queue is failed
+        self._closed = False
+        self._error = None
+        self._lock = threading.Lock()
+        self._dispatcher = threading.Thread(target=self._dispatch, name='PredictBatcher', daemon=True)
+        self._dispatcher.start()
+
+    # same limits as the server's `BatchingParameters` (a `session_bundle_config_pb2` message)
+    @classmethod
+    def from_batching_parameters(cls, service, batching_parameters, timeout=None, **kwargs):
+        max_batch_size = batching_parameters.max_batch_size.value or 32
+        batch_timeout_micros = batching_parameters.batch_timeout_micros.value or 1000
+        return cls(service, max_batch_size, batch_timeout_micros, timeout, **kwargs)
+
+    def submit(self, request):
+        '''Queues `request`, returns a `concurrent.futures.Future` of its `PredictResponse`.'''
+        request = Message.unwrap_pb(request)
+        batch_sizes = {tensor.tensor_shape.dim[0].size if tensor.tensor_shape.dim else None
+                       for tensor in request.inputs.values()}
+        if len(batch_sizes) != 1 or None in batch_sizes:
+            raise ValueError('The inputs must have the same batch (first) dimension, got {}.'.format(
+                {key: [dim.size for dim in tensor.tensor_shape.dim] for key, tensor in request.inputs.items()}))
+        call = _Call(request, batch_sizes.pop())
+        with self._lock:
+            if self._closed:
+                raise RuntimeError('Can\'t submit to a closed `PredictBatcher`.')
+            if self._error is not None:
+                raise RuntimeError('The `PredictBatcher` dispatcher failed.') from self._error
+            self._queue.put(call)
+        return call.future
+
+    def predict(self, request, timeout=None):
+        return self.submit(request).result(timeout)
+
+    # sends what is queued, and stops the dispatcher
+    def close(self):
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._queue.put(_CLOSE)
+        self._dispatcher.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _dispatch(self):
+        batches = {}
+        call = None
+        try:
+            while True:
+                timeout = None
+                if batches:
+                    deadline = min(batch.deadline for batch in batches.values())
+                    timeout = max(deadline - time.perf_counter(), 0)
+                try:
+                    call = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    call = None
+                if call is _CLOSE:
+                    for batch in batches.values():
+                        self._send(batch)
+                    # nothing is queued after `_CLOSE`, but no call is left pending either way
+                    self._fail(RuntimeError('The `PredictBatcher` was closed.'), [])
+                    return
+                if call is not None:
+                    self._add(batches, call)
+                now = time.perf_counter()
+                for key in [key for key, batch in batches.items() if batch.deadline <= now]:
+                    self._send(batches.pop(key))
+        except BaseException as e:
+            self._fail(e, [call] + [call for batch in batches.values() for call in batch.calls])
+
+    # the calls not sent yet, and those queued, fail with the dispatcher's exception `e`
+    def _fail(self, e, calls):
+        with self._lock:
+            self._error = e
+        while True:
+            try:
+                calls.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        for call in calls:
+            # those sent get their outcome from their batch
+            if isinstance(call, _Call) and not (call.future.running() or call.future.done()) and \
+                    call.future.set_running_or_notify_cancel():
+                call.future.set_exception(e)
+
+    def _add(self, batches, call):
+        key = _batch_key(call.request)
+        batch = batches.get(key)
+        if batch is not None and batch.batch_size + call.batch_size > self.max_batch_size:
+            self._send(batches.pop(key))
+            batch = None
+        if batch is None:
+            batch = batches[key] = _Batch(time.perf_counter() + self.batch_timeout_micros / 1e6)
+        batch.calls.append(call)
+        batch.batch_size += call.batch_size
+        if batch.batch_size >= self.max_batch_size:
+            self._send(batches.pop(key))
+
+    def _send(self, batch):
+        # calls cancelled while queued are dropped
+        calls = [call for call in batch.calls if call.future.set_running_or_notify_cancel()]
+        if not calls:
+            return
+        try:
+            request = _merge_requests([call.request for call in calls])
+            future = self.service.stub.Predict.future(request, self.timeout, **self.kwargs)
+        except Exception as e:
+            for call in calls:
+                call.future.set_exception(e)
+            return
+        future.add_done_callback(lambda future: _split_response(future, calls))
+
+
+# calls are batched together if their requests only differ in the examples
+def _batch_key(request):
+    inputs = tuple(sorted((key, tensor.dtype, tuple(dim.size for dim in tensor.tensor_shape.dim[1:]))
+                          for key, tensor in request.inputs.items()))
+    return request.model_spec.SerializeToString(), tuple(request.output_filter), inputs
+
+
+def _merge_requests(requests):
+    merged = predict_pb2.PredictRequest()
+    merged.model_spec.CopyFrom(requests[0].model_spec)
+    merged.output_filter.extend(requests[0].output_filter)
+    for key in requests[0].inputs:
+        merged.inputs[key].CopyFrom(_concatenate([request.inputs[key] for request in requests]))
+    return merged
+
+
+def _concatenate(tensors):
+    if len(tensors) == 1:
+        return tensors[0]
+    # read once, on the C++ protobuf backends each read copies it
+    contents = [tensor.tensor_content for tensor in tensors]
+    if all(contents):
+        # the examples are laid out one after the other, their bytes are joined as is
+        merged = tensor_pb2.TensorProto(dtype=tensors[0].dtype, tensor_content=b''.join(contents))
+        merged.tensor_shape.CopyFrom(tensors[0].tensor_shape)
+        merged.tensor_shape.dim[0].size = sum(tensor.tensor_shape.dim[0].size for tensor in tensors)
+        return merged
+    # e.g. strings, or single values (in the typed fields)
+    return tf_utils._make_tensor_proto(np.concatenate([tf_utils._make_ndarray(tensor) for tensor in tensors]),
+                                       tensors[0].dtype)
+
+
+def _split_response(future, calls):
+    try:
+        response = future.result()
+        total = sum(call.batch_size for call in calls)
+        outputs = {key: _split(tensor, [call.batch_size for call in calls], total)
+                   for key, tensor in response.outputs.items()}
+        parts = []
+        for i in range(len(calls)):
+            part = predict_pb2.PredictResponse()
+            part.model_spec.CopyFrom(response.model_spec)
+            for key, tensors in outputs.items():
+                part.outputs[key].CopyFrom(tensors[i])
+            parts.append(apis.PredictResponse.wrap(part))
+    except Exception as e:
+        for call in calls:
+            call.future.set_exception(e)
+        return
+    for call, part in zip(calls, parts):
+        call.future.set_result(part)
+
+
+# `tensor` split along its first dimension, into parts of `batch_sizes`
+def _split(tensor, batch_sizes, total):
+    dims = tensor.tensor_shape.dim
+    if not dims or dims[0].size != total:
+        # not batched
+        return [tensor] * len(batch_sizes)
+    if len(batch_sizes) == 1:
+        return [tensor]
+    content = tensor.tensor_content
+    if content:
+        example_size = len(content) // total
+        parts, start = [], 0
+        for batch_size in batch_sizes:
+            part = tensor_pb2.TensorProto(dtype=tensor.dtype, tensor_shape=tensor.tensor_shape,
+                                          tensor_content=content[
+                                              start * example_size:(start + batch_size) * example_size])
+            part.tensor_shape.dim[0].size = batch_size
+            parts.append(part)
+            start += batch_size
+        return parts
+    values = tf_utils._make_ndarray(tensor)
+    return [tf_utils._make_tensor_proto(part, tensor.dtype)
+            for part in np.split(values, np.cumsum(batch_sizes)[:-1])]
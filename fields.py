@@ -0,0 +1,214 @@
+from operator import attrgetter
+
+from base import Message
+from lazy_loader import LazyLoader
+
+# imported on first use, see `LazyLoader`
+_descriptor = LazyLoader('_descriptor', globals(), 'google.protobuf.descriptor')
+symbol_database = LazyLoader('symbol_database', globals(), 'google.protobuf.symbol_database')
+
+# Well-known wrapper messages, exposed through their `value` (see `ModelSpec.version`)
+_VALUE_TYPES = frozenset([
+    'google.protobuf.DoubleValue', 'google.protobuf.FloatValue',
+    'google.protobuf.Int64Value', 'google.protobuf.UInt64Value',
+    'google.protobuf.Int32Value', 'google.protobuf.UInt32Value',
+    'google.protobuf.BoolValue', 'google.protobuf.StringValue',
+    'google.protobuf.BytesValue',
+])
+
+# Generated wrapper classes, keyed by the full name of the `pb` message and `read_only`
+_WRAPPERS = {}
+
+
+# Maps a wrapper attribute onto the field `name` of the internal `pb`.
+# `name` defaults to the name of the attribute the field is assigned to.
+# The accessors are plain `property` getters and setters built once per field,
+# scalar getters being `attrgetter`s that never enter python code.
+class Field(property):
+    def __init__(self, name=None, read_only=False):
+        self.name = name
+        self.read_only = read_only
+        if name is not None:
+            self._bind(name)
+
+    def __set_name__(self, owner, name):
+        if self.name is None:
+            self.name = name
+            self._bind(name)
+
+    def _bind(self, name):
+        fset = _read_only if self.read_only else self._make_setter(name)
+        property.__init__(self, self._make_getter(name), fset)
+
+    def _make_getter(self, name):
+        return attrgetter('_protobuf.' + name)
+
+    # a plain `Field` is read-only, the subclasses set their type of field
+    def _make_setter(self, name):
+        return _read_only
+
+
+def _read_only(obj, value):
+    raise AttributeError("Attribute is read-only, can't be set.")
+
+
+# type: scalar, string, bytes or enum
+class ScalarField(Field):
+    def _make_setter(self, name):
+        def fset(obj, value):
+            setattr(obj._protobuf, name, value)
+            obj.__set_in_parent__()
+        return fset
+
+
+# type: (Int64Wrapper, StringWrapper, etc.) message
+class ValueField(Field):
+    def _make_getter(self, name):
+        return attrgetter('_protobuf.{}.value'.format(name))
+
+    def _make_setter(self, name):
+        def fset(obj, value):
+            getattr(obj._protobuf, name).value = value
+            obj.__set_in_parent__()
+        return fset
+
+
+# type: message
+# `wrapper` is either a `Message` class or the descriptor of the nested `pb`
+# message, in which case the wrapper is generated on first use.
+class MessageField(Field):
+    def __init__(self, wrapper, name=None, read_only=False):
+        self._wrapper = wrapper
+        super().__init__(name, read_only)
+
+    def __set_name__(self, owner, name):
+        super().__set_name__(owner, name)
+        owner.__register_child__(self.name)
+
+    @property
+    def wrapper(self):
+        if not isinstance(self._wrapper, type):
+            self._wrapper = wrapper_for(self._wrapper, self.read_only)
+        return self._wrapper
+
+    def _make_getter(self, name):
+        def fget(obj):
+            return obj.__get_nested__(name, self.wrapper)
+        return fget
+
+    def _make_setter(self, name):
+        def fset(obj, value):
+            obj.__set_nested__(name, value)
+        return fset
+
+
+# type: (repeated) scalar
+class RepeatedScalarField(Field):
+    def _make_setter(self, name):
+        def fset(obj, _list):
+            if not isinstance(_list, (list, tuple)):
+                _list = [_list]
+            obj._protobuf.ClearField(name)
+            getattr(obj._protobuf, name).extend(_list)
+            obj.__set_in_parent__()
+        return fset
+
+
+# type: (repeated) message
+class RepeatedMessageField(MessageField):
+    def _make_getter(self, name):
+        def fget(obj):
+            return obj.__get_repeated__(name, self.wrapper)
+        return fget
+
+    def _make_setter(self, name):
+        def fset(obj, _list):
+            obj.__set_repeated__(name, _list)
+        return fset
+
+
+# type: (map) key : scalar or message
+# NOTE: setting a map updates the given keys, the others are left as is.
+class MapField(Field):
+    def __init__(self, name=None, read_only=False, message_values=False):
+        self.message_values = message_values
+        super().__init__(name, read_only)
+
+    def _make_setter(self, name):
+        message_values = self.message_values
+
+        def fset(obj, _dict):
+            _map = getattr(obj._protobuf, name)
+            for key, value in _dict.items():
+                if message_values:
+                    _map[key].CopyFrom(Message.unwrap_pb(value))
+                else:
+                    _map[key] = value
+            obj.__set_in_parent__()
+        return fset
+
+
+def field_for(field_descriptor, read_only=False):
+    '''Returns the `Field` accessor matching a `pb` field descriptor.'''
+    name = field_descriptor.name
+    message_type = field_descriptor.message_type
+    if field_descriptor.label == _descriptor.FieldDescriptor.LABEL_REPEATED:
+        if message_type is not None and message_type.GetOptions().map_entry:
+            value_type = message_type.fields_by_name['value'].message_type
+            return MapField(name, read_only, message_values=value_type is not None)
+        if message_type is not None:
+            return RepeatedMessageField(message_type, name, read_only)
+        return RepeatedScalarField(name, read_only)
+    if message_type is not None:
+        if message_type.full_name in _VALUE_TYPES:
+            return ValueField(name, read_only)
+        return MessageField(message_type, name, read_only)
+    return ScalarField(name, read_only)
+
+
+def fields_from_descriptor(descriptor, read_only=False):
+    '''Returns a dict of `Field` accessors for each field of a `pb` message descriptor.
+
+    Fields shadowing an attribute of `Message` (e.g. `copy`) are skipped.
+    '''
+    return {field.name: field_for(field, read_only) for field in descriptor.fields
+            if not hasattr(Message, field.name)}
+
+
+def _protobuf_class(descriptor):
+    try:
+        from google.protobuf.message_factory import GetMessageClass
+    except ImportError:
+        return symbol_database.Default().GetPrototype(descriptor)
+    return GetMessageClass(descriptor)
+
+
+def _init_wrapper(self, **kwargs):
+    Message.__init__(self, self._protobuf_class(), **kwargs)
+
+
+def make_wrapper(protobuf_class, read_only=False):
+    '''Returns a `Message` wrapper class for `protobuf_class` (i.e. any `_pb2` message).
+
+    The accessors are generated once from the message `DESCRIPTOR`, and the
+    class is cached, so repeated calls return the same class.
+
+        >>> TensorShapeProto = make_wrapper(tensor_shape_pb2.TensorShapeProto)
+        >>> shape = TensorShapeProto(unknown_rank=True)
+    '''
+    descriptor = protobuf_class.DESCRIPTOR
+    key = (descriptor.full_name, read_only)
+    wrapper = _WRAPPERS.get(key)
+    if wrapper is None:
+        namespace = fields_from_descriptor(descriptor, read_only)
+        namespace.update(__slots__=(), _protobuf_class=protobuf_class, __init__=_init_wrapper)
+        wrapper = _WRAPPERS[key] = type(descriptor.name, (Message,), namespace)
+    return wrapper
+
+
+def wrapper_for(descriptor, read_only=False):
+    '''Same as `make_wrapper`, but looks up the `pb` message class from its descriptor.'''
+    wrapper = _WRAPPERS.get((descriptor.full_name, read_only))
+    if wrapper is None:
+        wrapper = make_wrapper(_protobuf_class(descriptor), read_only)
+    return wrapper
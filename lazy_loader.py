@@ -0,0 +1,29 @@
+import importlib
+import types
+
+
+# A module that is only imported on first attribute access, after which it
+# replaces itself with the real module in the namespace it was assigned to
+# (adapted from `tensorflow/python/util/lazy_loader.py`).
+# Keeps heavy imports (`grpc`, `numpy`, the `_pb2` modules) off the import of
+# the client modules, until a message or a service is actually used.
+#
+#     >>> np = LazyLoader('np', globals(), 'numpy')
+class LazyLoader(types.ModuleType):
+    def __init__(self, local_name, parent_module_globals, name):
+        self._local_name = local_name
+        self._parent_module_globals = parent_module_globals
+        super().__init__(name)
+
+    def _load(self):
+        module = importlib.import_module(self.__name__)
+        self._parent_module_globals[self._local_name] = module
+        # later lookups through this object (e.g. if it was re-exported) skip `__getattr__`
+        self.__dict__.update(module.__dict__)
+        return module
+
+    def __getattr__(self, item):
+        return getattr(self._load(), item)
+
+    def __dir__(self):
+        return dir(self._load())
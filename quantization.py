@@ -0,0 +1,123 @@
+'''Client-side (affine) quantization of float inputs to the quantized tensor types,
+and dequantization of quantized outputs.
+
+    q = round(x / scale) + zero_point, clipped to the range of the type
+    x = (q - zero_point) * scale
+
+with a single `scale` and `zero_point` per tensor, or one per channel along
+`axis`. The model must accept the quantized type; how it gets the parameters
+(e.g. as extra inputs, or fixed at export) is up to the model.
+
+    >>> tensor, params = make_quantized_tensor_proto(images, 'quint8', axis=-1)
+    >>> request = PredictRequest(model_spec=model_spec, inputs={'images': {'values': tensor}})
+    ...
+    >>> scores = dequantize(response.parse_outputs()['scores'], output_params)
+'''
+from collections import namedtuple
+
+import numpy as np
+
+from tensorflow.python.framework import dtypes
+
+from tf_utils import _make_tensor_proto
+
+
+# Per-channel values are expanded over the trailing dimensions of the array,
+# from `axis` on, and further to the left up to this many elements; numpy
+# broadcasts a contiguous block much faster than along a short (e.g. RGB) axis.
+_BLOCK_SIZE = 4096
+
+
+def _block_start(shape, axis):
+    start = axis
+    while start > 0 and np.prod(shape[start:]) < _BLOCK_SIZE:
+        start -= 1
+    return start
+
+
+class QuantizationParams(namedtuple('QuantizationParams', ['scale', 'zero_point', 'axis'])):
+    '''`scale` and `zero_point` are scalars, or 1-D arrays (one value per channel along `axis`).'''
+    __slots__ = ()
+
+    def broadcast(self, shape):
+        '''Returns `scale` and `zero_point`, expanded to broadcast against an array of `shape`.'''
+        if self.axis is None:
+            return self.scale, self.zero_point
+        axis = self.axis % len(shape)
+        start = _block_start(shape, axis)
+        param_shape = [1] * (len(shape) - start)
+        param_shape[axis - start] = -1
+        return tuple(np.ascontiguousarray(np.broadcast_to(np.reshape(param, param_shape), shape[start:]))
+                     for param in (self.scale, self.zero_point))
+
+
+def _storage_type(dtype):
+    dtype = dtypes.as_dtype(dtype)
+    if dtype not in dtypes._QUANTIZED_DTYPES_NO_REF:
+        raise TypeError('Expected a quantized type, got {}.'.format(dtype.as_numpy_dtype))
+    # quantized types are structured numpy types around a single field
+    return np.dtype(dtype.as_numpy_dtype), np.dtype(dtype.as_numpy_dtype)[0]
+
+
+def quantization_params(values, dtype=dtypes.quint8, axis=None):
+    '''Returns the `QuantizationParams` mapping the range of `values` (extended to 0) onto `dtype`.'''
+    _, storage = _storage_type(dtype)
+    info = np.iinfo(storage)
+    values = np.asarray(values)
+    if axis is None:
+        low, high = values.min(), values.max()
+    else:
+        axis = axis % values.ndim
+        # reduced over a (contiguous) block first, see `_block_start`
+        start = _block_start(values.shape, axis)
+        block = values.reshape((-1,) + values.shape[start:])
+        reduce_axes = tuple(i for i in range(values.ndim - start) if i != axis - start)
+        low = block.min(axis=0).min(axis=reduce_axes)
+        high = block.max(axis=0).max(axis=reduce_axes)
+    low = np.minimum(low, 0).astype(np.float64)
+    high = np.maximum(high, 0).astype(np.float64)
+    scale = (high - low) / (float(info.max) - info.min)
+    # all zeros (e.g. a blank channel)
+    scale = np.where(scale > 0, scale, 1.0)
+    zero_point = np.clip(np.rint(info.min - low / scale), info.min, info.max).astype(np.int64)
+    if axis is None:
+        return QuantizationParams(float(scale), int(zero_point), None)
+    return QuantizationParams(scale.astype(np.float32), zero_point, axis)
+
+
+def quantize(values, dtype=dtypes.quint8, axis=None, params=None):
+    '''Quantizes a float array to `dtype`, returns the quantized array and its `QuantizationParams`.
+
+    The parameters are computed from `values` (per channel along `axis`), unless given.
+    '''
+    np_dtype, storage = _storage_type(dtype)
+    info = np.iinfo(storage)
+    values = np.asarray(values)
+    if params is None:
+        params = quantization_params(values, dtype, axis)
+    scale, zero_point = params.broadcast(values.shape)
+    # float32 can't represent all of the (q)int32 values
+    work_type = np.float32 if storage.itemsize <= 2 else np.float64
+    quantized = np.divide(values, scale, dtype=work_type)
+    np.rint(quantized, out=quantized)
+    quantized += zero_point
+    np.clip(quantized, info.min, info.max, out=quantized)
+    return quantized.astype(storage).view(np_dtype), params
+
+
+def dequantize(values, params):
+    '''Maps quantized values (a quantized or plain integer array) back to float32.'''
+    values = np.asarray(values)
+    if values.dtype.fields:
+        values = values.view(values.dtype[0])
+    scale, zero_point = params.broadcast(values.shape)
+    dequantized = values.astype(np.float32)
+    dequantized -= np.asarray(zero_point, dtype=np.float32)
+    dequantized *= np.asarray(scale, dtype=np.float32)
+    return dequantized
+
+
+def make_quantized_tensor_proto(values, dtype=dtypes.quint8, axis=None, params=None):
+    '''Same as `quantize`, but returns the quantized `tensor_proto` and its `QuantizationParams`.'''
+    quantized, params = quantize(values, dtype, axis, params)
+    return _make_tensor_proto(quantized, dtypes.as_dtype(dtype)), params
@@ -1,12 +1,18 @@
-from tensorflow_serving.sources.storage_path import file_system_storage_path_source_pb2
-
 from base import Message
+from lazy_loader import LazyLoader
+
+# imported on first use, see `LazyLoader`
+file_system_storage_path_source_pb2 = LazyLoader(
+    'file_system_storage_path_source_pb2', globals(),
+    'tensorflow_serving.sources.storage_path.file_system_storage_path_source_pb2')
 
 class ServableVersionPolicy(Message):
     '''
     TODO: A cleaner implementation for setting the one-of values exclusively, 
     while preserving input definition in the constructor.
     '''
+    __slots__ = ()
+
     def __init__(self, latest=None, specific=None, _all=None, **kwargs):
         super().__init__(file_system_storage_path_source_pb2.FileSystemStoragePathSourceConfig.ServableVersionPolicy(),
                         latest=latest, 
@@ -22,9 +22,8 @@ from six.moves import builtins
 from tensorflow.core.framework import types_pb2
 # from tensorflow.python import pywrap_tensorflow
 
-# Comment out _np_bfloat16 
-# Can't seem to backtrack the definition in pywrap_tensorflow
-# _np_bfloat16 = pywrap_tensorflow.TF_bfloat16_type()
+# NOTE: `_np_bfloat16` (see below) is a storage type, unlike the numpy type
+# defined in pywrap_tensorflow, which can't be backtracked.
 
 
 class DType(object):
@@ -112,7 +111,7 @@ quint16 = DType(types_pb2.DT_QUINT16)
 qint32 = DType(types_pb2.DT_QINT32)
 resource_ref = DType(types_pb2.DT_RESOURCE_REF)
 variant_ref = DType(types_pb2.DT_VARIANT_REF)
-# bfloat16 = DType(types_pb2.DT_BFLOAT16)
+bfloat16 = DType(types_pb2.DT_BFLOAT16)
 float16_ref = DType(types_pb2.DT_HALF_REF)
 half_ref = float16_ref
 float32_ref = DType(types_pb2.DT_FLOAT_REF)
@@ -135,7 +134,7 @@ quint8_ref = DType(types_pb2.DT_QUINT8_REF)
 qint16_ref = DType(types_pb2.DT_QINT16_REF)
 quint16_ref = DType(types_pb2.DT_QUINT16_REF)
 qint32_ref = DType(types_pb2.DT_QINT32_REF)
-# bfloat16_ref = DType(types_pb2.DT_BFLOAT16_REF)
+bfloat16_ref = DType(types_pb2.DT_BFLOAT16_REF)
 
 _NUMPY_INCOMPATIBLE = frozenset([
     types_pb2.DT_VARIANT, types_pb2.DT_VARIANT_REF, types_pb2.DT_RESOURCE,
@@ -165,7 +164,7 @@ _INTERN_TABLE = {
     types_pb2.DT_QINT16: qint16,
     types_pb2.DT_QUINT16: quint16,
     types_pb2.DT_QINT32: qint32,
-    #types_pb2.DT_BFLOAT16: bfloat16,
+    types_pb2.DT_BFLOAT16: bfloat16,
     types_pb2.DT_RESOURCE: resource,
     types_pb2.DT_VARIANT: variant,
     types_pb2.DT_HALF_REF: float16_ref,
@@ -188,7 +187,7 @@ _INTERN_TABLE = {
     types_pb2.DT_QINT16_REF: qint16_ref,
     types_pb2.DT_QUINT16_REF: quint16_ref,
     types_pb2.DT_QINT32_REF: qint32_ref,
-    # types_pb2.DT_BFLOAT16_REF: bfloat16_ref,
+    types_pb2.DT_BFLOAT16_REF: bfloat16_ref,
     types_pb2.DT_RESOURCE_REF: resource_ref,
     types_pb2.DT_VARIANT_REF: variant_ref,
 }
@@ -215,7 +214,7 @@ _TYPE_TO_STRING = {
     types_pb2.DT_QINT16: "qint16",
     types_pb2.DT_QUINT16: "quint16",
     types_pb2.DT_QINT32: "qint32",
-    # types_pb2.DT_BFLOAT16: "bfloat16",
+    types_pb2.DT_BFLOAT16: "bfloat16",
     types_pb2.DT_RESOURCE: "resource",
     types_pb2.DT_VARIANT: "variant",
     types_pb2.DT_HALF_REF: "float16_ref",
@@ -238,7 +237,7 @@ _TYPE_TO_STRING = {
     types_pb2.DT_QINT16_REF: "qint16_ref",
     types_pb2.DT_QUINT16_REF: "quint16_ref",
     types_pb2.DT_QINT32_REF: "qint32_ref",
-    # types_pb2.DT_BFLOAT16_REF: "bfloat16_ref",
+    types_pb2.DT_BFLOAT16_REF: "bfloat16_ref",
     types_pb2.DT_RESOURCE_REF: "resource_ref",
     types_pb2.DT_VARIANT_REF: "variant_ref",
 }
@@ -265,7 +264,9 @@ _np_qint16 = np.dtype([("qint16", np.int16)])
 _np_quint16 = np.dtype([("quint16", np.uint16)])
 _np_qint32 = np.dtype([("qint32", np.int32)])
 
-# _np_bfloat16 is defined by a module import.
+# The bits of a bfloat16, i.e. the upper half of a float32; numpy has no
+# bfloat16 type, see `tensor_util` for the conversions from and to float32.
+_np_bfloat16 = np.dtype([("bfloat16", np.uint16)])
 
 # Custom struct dtype for directly-fed ResourceHandles of supported type(s).
 np_resource = np.dtype([("resource", np.ubyte)])
@@ -294,7 +295,7 @@ _NP_TO_TF = {
     _np_qint16: qint16,
     _np_quint16: quint16,
     _np_qint32: qint32,
-    # _np_bfloat16: bfloat16,
+    _np_bfloat16: bfloat16,
 }
 
 # Map (some) NumPy platform dtypes to TF ones using their fixed-width
@@ -359,8 +360,8 @@ _TF_TO_NP = {
         _np_quint16,
     types_pb2.DT_QINT32:
         _np_qint32,
-    # types_pb2.DT_BFLOAT16:
-        # _np_bfloat16,
+    types_pb2.DT_BFLOAT16:
+        _np_bfloat16,
 
     # Ref types
     types_pb2.DT_HALF_REF:
@@ -403,8 +404,8 @@ _TF_TO_NP = {
         _np_quint16,
     types_pb2.DT_QINT32_REF:
         _np_qint32,
-    # types_pb2.DT_BFLOAT16_REF:
-        # _np_bfloat16,
+    types_pb2.DT_BFLOAT16_REF:
+        _np_bfloat16,
 }
 
 _QUANTIZED_DTYPES_NO_REF = frozenset([qint8, quint8, qint16, quint16, qint32])
@@ -429,9 +430,32 @@ assert len(_ANY_TO_TF) == sum(
     len(d) for d in [_INTERN_TABLE, _STRING_TO_TF, _PYTHON_TO_TF, _NP_TO_TF])
 
 
+# `as_dtype` results, keyed by the converted value (e.g. a `np.dtype`, an enum
+# or a name); cleared when full, as strings like `np.dtype('S5')` are unbounded.
+_DTYPE_CACHE = {}
+_DTYPE_CACHE_SIZE = 256
+
+
 def as_dtype(type_value):
   """Converts the given `type_value` to a `DType`.
   """
+  # fast path, a single lookup for the values seen before
+  try:
+    return _DTYPE_CACHE[type_value]
+  except (KeyError, TypeError):
+    pass
+  dtype = _as_dtype(type_value)
+  if len(_DTYPE_CACHE) >= _DTYPE_CACHE_SIZE:
+    _DTYPE_CACHE.clear()
+  try:
+    _DTYPE_CACHE[type_value] = dtype
+  except TypeError:
+    # unhashable, converted but not cached
+    pass
+  return dtype
+
+
+def _as_dtype(type_value):
   if isinstance(type_value, DType):
     return type_value
 
@@ -141,3 +141,20 @@ def as_shape(shape):
 		return shape
 	else:
 		return TensorShape(shape)
+
+# Pre-built `TensorShapeProto`s, keyed by the shape tuple; cleared when full.
+_SHAPE_PROTO_CACHE = {}
+_SHAPE_PROTO_CACHE_SIZE = 1024
+
+def as_shape_proto(shape):
+	"""Returns the `TensorShapeProto` of a shape tuple, from the cache.
+
+	NOTE: the proto is shared, it must be copied (e.g. given to a constructor or
+	`CopyFrom`), never modified.
+	"""
+	proto = _SHAPE_PROTO_CACHE.get(shape)
+	if proto is None:
+		if len(_SHAPE_PROTO_CACHE) >= _SHAPE_PROTO_CACHE_SIZE:
+			_SHAPE_PROTO_CACHE.clear()
+		proto = _SHAPE_PROTO_CACHE[shape] = as_shape(shape).as_proto()
+	return proto
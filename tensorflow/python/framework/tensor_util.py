@@ -25,16 +25,141 @@ from tensorflow.python.framework import tensor_shape
 _TENSOR_CONTENT_TYPES = frozenset([
 	dtypes.float32, dtypes.float64, dtypes.int32, dtypes.uint8, dtypes.int16,
 	dtypes.int8, dtypes.int64, dtypes.qint8, dtypes.quint8, dtypes.qint16,
-	dtypes.quint16, dtypes.qint32, dtypes.uint32, dtypes.uint64
+	dtypes.quint16, dtypes.qint32, dtypes.uint32, dtypes.uint64,
+	dtypes.float16, dtypes.bfloat16
 ])
 
-def MakeTensorProto(values, dtype=None):
-	"""Expects only np.ndarrya object or tensor_proto as inputs."""
+_INT32_MIN, _INT32_MAX = np.iinfo(np.int32).min, np.iinfo(np.int32).max
+
+# Half precision types, which can also be stored (as their bits) in `half_val`
+_HALF_TYPES = frozenset([dtypes.float16, dtypes.bfloat16])
+
+# The typed repeated field holding the values of a tensor (when not in
+# `tensor_content`), and the numpy dtype of the field's values.
+_TYPED_FIELDS = {
+	dtypes.float16: ("half_val", np.uint16),
+	dtypes.bfloat16: ("half_val", np.uint16),
+	dtypes.float32: ("float_val", np.float32),
+	dtypes.float64: ("double_val", np.float64),
+	dtypes.int8: ("int_val", np.int8),
+	dtypes.int16: ("int_val", np.int16),
+	dtypes.int32: ("int_val", np.int32),
+	dtypes.uint8: ("int_val", np.uint8),
+	dtypes.uint16: ("int_val", np.uint16),
+	dtypes.qint8: ("int_val", np.int8),
+	dtypes.quint8: ("int_val", np.uint8),
+	dtypes.qint16: ("int_val", np.int16),
+	dtypes.quint16: ("int_val", np.uint16),
+	dtypes.qint32: ("int_val", np.int32),
+	dtypes.int64: ("int64_val", np.int64),
+	dtypes.uint32: ("uint32_val", np.uint32),
+	dtypes.uint64: ("uint64_val", np.uint64),
+	dtypes.complex64: ("scomplex_val", np.float32),
+	dtypes.complex128: ("dcomplex_val", np.float64),
+	dtypes.bool: ("bool_val", np.bool_),
+}
+
+def float32_to_bfloat16(values):
+	"""Rounds (to nearest even) float values to bfloat16, returns an array of `_np_bfloat16`."""
+	bits = np.asarray(values, dtype=np.float32).view(np.uint32)
+	rounded = ((bits + (0x7fff + ((bits >> 16) & 1))) >> 16).astype(np.uint16)
+	# the rounding would turn some NaNs into infinities, hence the quiet NaN
+	rounded[np.isnan(values)] = 0x7fc0
+	return rounded.view(dtypes._np_bfloat16)
+
+def bfloat16_to_float32(values):
+	"""Widens an array of `_np_bfloat16` (or of its bits as `np.uint16`) to float32."""
+	bits = np.asarray(values).view(np.uint16).astype(np.uint32)
+	bits <<= 16
+	return bits.view(np.float32)
+
+def _repeated_to_ndarray(values, dtype):
+	"""Converts a repeated scalar field to a 1-D array in bulk, rather than per element."""
+	# The python backend keeps the values in a list (used as is), the others
+	# copy them out into a list on slicing, which is still a single call.
+	values = getattr(values, "_values", None) or values[:]
+	return np.array(values, dtype=dtype)
+
+def _fill_string_val(tensor_proto, nparray):
+	"""Fills `string_val` with the (flattened) values of a bytes, unicode or object array in bulk."""
+	values = nparray.ravel().tolist()
+	if nparray.dtype.kind == "U":
+		# faster than `np.char.encode`, which goes through the same `str.encode` calls
+		tensor_proto.string_val.extend([v.encode("utf-8") for v in values])
+		return
+	try:
+		tensor_proto.string_val.extend(values)
+	except TypeError:
+		# `str` objects, in an object array
+		tensor_proto.string_val.extend(
+			[v.encode("utf-8") if isinstance(v, str) else v for v in values])
+
+def _fill_typed_field(tensor_proto, dtype, nparray):
+	"""Fills the typed repeated field of `dtype` (e.g. `float_val`) with the values of `nparray` in bulk."""
+	field = _TYPED_FIELDS.get(dtype)
+	if field is None:
+		raise TypeError("Unsupported tensor type: %s" % nparray.dtype)
+	field_name, field_dtype = field
+	values = nparray.ravel()
+	if values.dtype != field_dtype:
+		# complex numbers as (real, imag) pairs, half types as their bits and
+		# quantized types as their storage type
+		values = values.view(field_dtype)
+	getattr(tensor_proto, field_name).extend(values.tolist())
+
+# The kinds of values (see `np.dtype.kind`) that can be given for a tensor of
+# each kind, e.g. ints for a float tensor, but not floats for an int tensor.
+_CASTABLE_KINDS = {"b": "b", "i": "biu", "u": "biu", "f": "biuf", "c": "biufc", "O": "SUO"}
+
+def _can_cast(np_dtype, dtype):
+	"""Whether values of `np_dtype` can be given (i.e. cast) as a tensor of `dtype`."""
+	target = np.dtype(dtype.as_numpy_dtype)
+	if np_dtype == target:
+		return True
+	if dtype == dtypes.bfloat16:
+		kind = "f"
+	else:
+		# quantized types are structured numpy types around a single field
+		kind = target[0].kind if target.fields else target.kind
+	return np_dtype.kind in _CASTABLE_KINDS.get(kind, "")
+
+def _to_ndarray(values, dtype):
+	"""Converts a python scalar or a (nested) list to an array, of `dtype` if given."""
+	if values is None:
+		raise ValueError("None values not supported.")
+	nparray = np.array(values)
+	if nparray.dtype.kind in "SUO":
+		# an object array keeps the values as is, a bytes array strips trailing null bytes
+		nparray = np.array(values, dtype=object)
+		if not all(isinstance(v, (bytes, str)) for v in nparray.flat):
+			raise ValueError("Argument must be a dense tensor: %s" % (values,))
+	if dtype is None or dtype == dtypes.string:
+		return nparray
+	if nparray.size and not _can_cast(nparray.dtype, dtype):
+		raise TypeError("Expected %s, got %s of type '%s' instead." %
+						(np.dtype(dtype.as_numpy_dtype), values, nparray.dtype))
+	if dtype == dtypes.bfloat16:
+		return float32_to_bfloat16(nparray)
+	return nparray.astype(dtype.as_numpy_dtype)
+
+def MakeTensorProto(values, dtype=None, shape=None, verify_shape=False, allow_broadcast=False,
+					use_half_val=False):
+	"""Create a tensor_proto from a numpy array, a python scalar or a (nested) list.
+
+	Same as TensorFlow's `make_tensor_proto`: with `shape`, fewer values than
+	the shape's size fill the tensor, the last one repeated (a single value
+	is broadcast with `allow_broadcast`), and `verify_shape` requires the shape
+	of the values to match. Float values are float32 and int values int32
+	(when lossless) unless a `dtype` is given.
+
+	NOTE: strings can also be given as a list (or tuple) of `bytes` or `str`.
+
+	Float values given with `dtype` float16 or bfloat16 are rounded to it. With
+	`use_half_val`, these are stored in `half_val` instead of `tensor_content`.
+	"""
 	
 	if isinstance(values, tensor_pb2.TensorProto):
 		return values
-	if not isinstance(values, (np.ndarray, np.generic)):
-		raise ValueError('`values` expected to be of type %s but is of type %s'% (np.ndarray, type(values)))
 
 	if dtype:
 		dtype = dtypes.as_dtype(dtype)
@@ -46,8 +171,12 @@ def MakeTensorProto(values, dtype=None):
 		])
 
 	# Convert nparray.dtype to a compatible DType instance; otherwise doesn't force it
-	if dtype and dtype.is_numpy_compatible:
-		nparray = values.astype(dtype.as_numpy_dtype)
+	if not isinstance(values, (np.ndarray, np.generic)):
+		nparray = _to_ndarray(values, dtype)
+	elif dtype == dtypes.bfloat16 and values.dtype != dtypes._np_bfloat16:
+		nparray = float32_to_bfloat16(values)
+	elif dtype and dtype.is_numpy_compatible and dtype != dtypes.string:
+		nparray = values.astype(dtype.as_numpy_dtype, copy=False)
 	else:
 		nparray = values
 
@@ -55,11 +184,11 @@ def MakeTensorProto(values, dtype=None):
 	if (nparray.dtype == np.float64) and dtype is None:
 		nparray = nparray.astype(np.float32)
 	# python/numpy default int type is int64. We prefer int32 instead.
+	# NOTE: pass the `dtype` (e.g. from the model's signature) to skip the range check.
 	elif (nparray.dtype == np.int64) and dtype is None:
-		downcasted_array = nparray.astype(np.int32)
 		# Do not down cast if it leads to precision loss.
-		if np.array_equal(downcasted_array, nparray):
-			nparray = downcasted_array
+		if nparray.size == 0 or (nparray.min() >= _INT32_MIN and nparray.max() <= _INT32_MAX):
+			nparray = nparray.astype(np.int32)
 
 	# If dtype is provided, it must be compatible with what numpy
 	# conversion says.
@@ -77,74 +206,178 @@ def MakeTensorProto(values, dtype=None):
 			raise TypeError("Incompatible types: %s vs. %s. Value is %s" %
 							(dtype, nparray.dtype, values))
 
-	# Get the shape from the numpy array.
-	shape = nparray.shape
+	# Get the shape from the numpy array, unless given.
+	if shape is None:
+		shape = nparray.shape
+		is_same_size = True
+		shape_size = nparray.size
+	else:
+		shape = tuple(int(dim) for dim in shape)
+		shape_size = int(np.prod(shape, dtype=np.int64))
+		is_same_size = shape_size == nparray.size
+
+		if allow_broadcast:
+			if nparray.shape != (1,) and nparray.shape != () and not is_same_size:
+				raise TypeError("Expected Tensor's shape: %s, got %s." % (shape, nparray.shape))
+		else:
+			if verify_shape and nparray.shape != shape:
+				raise TypeError("Expected Tensor's shape: %s, got %s." % (shape, nparray.shape))
+			if nparray.size > shape_size:
+				raise ValueError("Too many elements provided. Needed at most %d, but received %d" %
+								 (shape_size, nparray.size))
 
 	# Set dtype and shape for `tensor_proto`
 	tensor_proto = tensor_pb2.TensorProto(
 		dtype=numpy_dtype.as_datatype_enum,
-		tensor_shape=tensor_shape.as_shape(shape).as_proto())
+		tensor_shape=tensor_shape.as_shape_proto(shape))
 
-	if numpy_dtype in _TENSOR_CONTENT_TYPES:
+	# As in TensorFlow, single values and partial (i.e. padded) tensors are
+	# stored in the typed fields, e.g. `float_val`.
+	if (is_same_size and shape_size > 1 and numpy_dtype in _TENSOR_CONTENT_TYPES
+			and not (use_half_val and numpy_dtype in _HALF_TYPES)):
 		if nparray.size * nparray.itemsize >= (1 << 31):
 			raise ValueError(
 				"Cannot create a tensor proto whose content is larger than 2GB.")
 		tensor_proto.tensor_content = nparray.tostring()
 		return tensor_proto
-	raise ValueError('`tensor_proto` could not be generated.')
+	if numpy_dtype == dtypes.string:
+		_fill_string_val(tensor_proto, nparray)
+		return tensor_proto
+	_fill_typed_field(tensor_proto, numpy_dtype, nparray)
+	return tensor_proto
 
-def MakeNdarray(tensor):
-	"""Create a numpy ndarray from a tensor."""
+def _example_content(example, dtype, np_dtype, example_shape, example_size):
+	"""Returns the contents of an example, as a (contiguous) buffer of `np_dtype`."""
+	if isinstance(example, np.ndarray):
+		if example.shape != example_shape:
+			raise ValueError("Expected an example of shape %s, got %s" % (example_shape, example.shape))
+		if example.dtype != np_dtype:
+			if dtype == dtypes.bfloat16:
+				example = float32_to_bfloat16(example)
+			else:
+				example = example.astype(np_dtype)
+		return np.ascontiguousarray(example)
+	if memoryview(example).nbytes != example_size:
+		raise ValueError("Expected a buffer of %d bytes, got %d" % (example_size, memoryview(example).nbytes))
+	return example
+
+def MakeBatchTensorProto(examples, dtype=None, example_shape=None):
+	"""Create a tensor_proto of a batch, from an iterable of per-example arrays.
+
+	The examples are copied once, straight into the `tensor_content` bytes,
+	rather than stacked into a batch, then copied out of it. Examples can also
+	be raw buffers (e.g. `bytes`) laid out as an example of `example_shape` and
+	`dtype`, which must be given then.
+
+	The dtype and shape of the examples are taken from the first one (unless
+	given) and checked against the others; only arrays of another dtype are
+	converted. As in `MakeTensorProto`, float64 defaults to float32.
+	"""
+	examples = examples if isinstance(examples, (list, tuple)) else list(examples)
+	if not examples:
+		raise ValueError("Expected at least one example.")
+
+	if dtype:
+		dtype = dtypes.as_dtype(dtype)
+	first = examples[0]
+	if isinstance(first, np.ndarray):
+		if example_shape is None:
+			example_shape = first.shape
+		if dtype is None:
+			dtype = dtypes.float32 if first.dtype == np.float64 else dtypes.as_dtype(first.dtype)
+	elif dtype is None or example_shape is None:
+		raise ValueError("`dtype` and `example_shape` are required for raw buffers.")
+	if dtype not in _TENSOR_CONTENT_TYPES:
+		raise TypeError("Unsupported batch type: %s" % dtype.as_numpy_dtype)
+
+	np_dtype = np.dtype(dtype.as_numpy_dtype)
+	example_shape = tuple(example_shape)
+	example_size = int(np.prod(example_shape, dtype=np.int64)) * np_dtype.itemsize
+	if example_size * len(examples) >= (1 << 31):
+		raise ValueError(
+			"Cannot create a tensor proto whose content is larger than 2GB.")
+
+	tensor_proto = tensor_pb2.TensorProto(
+		dtype=dtype.as_datatype_enum,
+		tensor_shape=tensor_shape.as_shape_proto((len(examples),) + example_shape))
+	# `bytes.join` sizes the result once and copies each buffer into it
+	tensor_proto.tensor_content = b"".join([
+		_example_content(example, dtype, np_dtype, example_shape, example_size)
+		for example in examples])
+	return tensor_proto
+
+def MakeNdarray(tensor, copy=True, out=None):
+	"""Create a numpy ndarray from a tensor.
+
+	With `copy=False`, a tensor stored in `tensor_content` is returned as a
+	read-only view over the (immutable) bytes object of the field, instead of a
+	copy. The view holds a reference to those bytes, so it stays valid after the
+	tensor is modified or released; use `copy=True` to get a writable array.
+	Other tensors are always decoded into a new array.
+
+	With `out`, the tensor is decoded into that preallocated array, which must
+	be of the tensor's shape, and `out` is returned.
+
+	NOTE: numpy has no bfloat16 type, bfloat16 tensors are widened to float32.
+	"""
 
 	shape = [d.size for d in tensor.tensor_shape.dim]
 	num_elements = np.prod(shape, dtype=np.int64)
 	tensor_dtype = dtypes.as_dtype(tensor.dtype)
 	dtype = tensor_dtype.as_numpy_dtype
 
-	if tensor.tensor_content:
-		return (np.frombuffer(tensor.tensor_content,
-							dtype=dtype).copy().reshape(shape))
+	# read once, on the C++ protobuf backends each read copies it
+	content = tensor.tensor_content
+
+	if out is not None:
+		if list(out.shape) != shape:
+			raise ValueError("`out` is of shape %s, expected %s" % (out.shape, shape))
+		if content and tensor_dtype != dtypes.bfloat16:
+			# straight from a view over the bytes of the field
+			values = np.frombuffer(content, dtype=dtype).reshape(shape)
+		else:
+			values = MakeNdarray(tensor, copy=False)
+		np.copyto(out, values, casting="same_kind")
+		return out
+
+	if content:
+		values = np.frombuffer(content, dtype=dtype).reshape(shape)
+		if tensor_dtype == dtypes.bfloat16:
+			return bfloat16_to_float32(values)
+		return values.copy() if copy else values
 
 	if tensor_dtype == dtypes.string:
-		# np.pad throws error on these arrays of type np.object.
-		values = list(tensor.string_val)
-		padding = num_elements - len(values)
-		if padding > 0:
-			last = values[-1] if values else ""
-			values.extend([last] * padding)
-		return np.array(values, dtype=dtype).reshape(shape)
-
-	if tensor_dtype == dtypes.float16 or tensor_dtype == dtypes.bfloat16:
-		# the half_val field of the TensorProto stores the binary representation
-		# of the fp16: we need to reinterpret this as a proper float16
-		values = np.fromiter(tensor.half_val, dtype=np.uint16)
-		values.dtype = tensor_dtype.as_numpy_dtype
-	elif tensor_dtype == dtypes.float32:
-		values = np.fromiter(tensor.float_val, dtype=dtype)
-	elif tensor_dtype == dtypes.float64:
-		values = np.fromiter(tensor.double_val, dtype=dtype)
-	elif tensor_dtype in [
-		dtypes.int32, dtypes.uint8, dtypes.uint16, dtypes.int16, dtypes.int8,
-		dtypes.qint32, dtypes.quint8, dtypes.qint8, dtypes.qint16, dtypes.quint16
-	]:
-		values = np.fromiter(tensor.int_val, dtype=dtype)
-	elif tensor_dtype == dtypes.int64:
-		values = np.fromiter(tensor.int64_val, dtype=dtype)
-	elif tensor_dtype == dtypes.complex64:
-		it = iter(tensor.scomplex_val)
-		values = np.array([complex(x[0], x[1]) for x in zip(it, it)], dtype=dtype)
-	elif tensor_dtype == dtypes.complex128:
-		it = iter(tensor.dcomplex_val)
-		values = np.array([complex(x[0], x[1]) for x in zip(it, it)], dtype=dtype)
-	elif tensor_dtype == dtypes.bool:
-		values = np.fromiter(tensor.bool_val, dtype=dtype)
-	else:
+		# np.pad throws error on these arrays of type np.object, hence the
+		# padding by hand; filling an object array from the list is a single call.
+		values = np.empty(num_elements, dtype=dtype)
+		string_val = getattr(tensor.string_val, "_values", None) or tensor.string_val[:]
+		size = min(len(string_val), num_elements)
+		values[:size] = string_val[:size]
+		values[size:] = string_val[-1] if string_val else b""
+		return values.reshape(shape)
+
+	field = _TYPED_FIELDS.get(tensor_dtype)
+	if field is None:
 		raise TypeError("Unsupported tensor type: %s" % tensor.dtype)
+	field_name, field_dtype = field
+	values = _repeated_to_ndarray(getattr(tensor, field_name), field_dtype)
+	if tensor_dtype in (dtypes.complex64, dtypes.complex128):
+		# (real, imag) pairs, reinterpreted as complex numbers
+		values = values[:values.size & ~1].view(dtype)
 
 	if values.size == 0:
+		if tensor_dtype == dtypes.bfloat16:
+			return np.zeros(shape, np.float32)
 		return np.zeros(shape, dtype)
 
 	if values.size != num_elements:
 		values = np.pad(values, (0, num_elements - values.size), "edge")
 
+	if values.dtype != dtype:
+		# quantized types (stored in `int_val`) and float16 (stored as its bits in `half_val`)
+		values = values.view(dtype)
+
+	if tensor_dtype == dtypes.bfloat16:
+		values = bfloat16_to_float32(values)
+
 	return values.reshape(shape)
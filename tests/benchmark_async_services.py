@@ -0,0 +1,61 @@
+'''Concurrent `Predict` throughput from asyncio: `AsyncPredictionService` on
+`grpc.aio` vs. the blocking `PredictionService` in a thread executor, with
+a number of requests in flight against the stand-in server.
+
+Run: python tests/benchmark_async_services.py
+'''
+import asyncio
+import time
+from concurrent import futures
+
+import numpy as np
+
+from benchmark_utils import report
+import stand_in_server
+
+from apis import AsyncPredictionService, ModelSpec, PredictionService, PredictRequest
+
+REQUESTS = 2000
+# emulated compute time of the model (s)
+DELAY = 0.002
+
+
+async def in_executor(address, request, concurrency):
+    service = PredictionService(address)
+    loop = asyncio.get_running_loop()
+    with futures.ThreadPoolExecutor(max_workers=concurrency) as executor:
+        start = time.perf_counter()
+        await asyncio.gather(*(loop.run_in_executor(executor, service.predict, request)
+                               for _ in range(REQUESTS)))
+        return REQUESTS / (time.perf_counter() - start)
+
+
+async def on_aio(address, request, concurrency):
+    async with AsyncPredictionService(address) as service:
+        in_flight = asyncio.Semaphore(concurrency)
+
+        async def predict():
+            async with in_flight:
+                return await service.predict(request)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(predict() for _ in range(REQUESTS)))
+        return REQUESTS / (time.perf_counter() - start)
+
+
+def main():
+    server, address = stand_in_server.serve(delay=DELAY, max_workers=256)
+    request = PredictRequest(model_spec=ModelSpec(name='model'),
+                             inputs={'images': {'values': np.random.rand(1, 28, 28).astype(np.float32)}})
+    try:
+        for concurrency in (1, 16, 64, 256):
+            report('{} requests, {} in flight'.format(REQUESTS, concurrency), [
+                ('thread executor', asyncio.run(in_executor(address, request, concurrency))),
+                ('grpc.aio', asyncio.run(on_aio(address, request, concurrency))),
+            ], 'req/s')
+    finally:
+        server.stop(None)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,50 @@
+'''Assembling a batch input from per-example arrays: `np.stack` + `MakeTensorProto`
+vs. `MakeBatchTensorProto` (and template rendering), timed and with the peak
+memory allocated (i.e. the copies of the batch held at once) per batch.
+
+Run: python tests/benchmark_batch_assembly.py
+'''
+import tracemalloc
+
+import numpy as np
+
+from benchmark_utils import time_per_call, report
+
+from tensorflow.python.framework.tensor_util import MakeTensorProto, MakeBatchTensorProto
+
+from apis import ModelSpec, PredictRequest, PredictRequestTemplate
+
+
+def peak_bytes(func):
+    tracemalloc.start()
+    result = func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return peak
+
+
+def main():
+    model_spec = ModelSpec(name='model')
+    for batch_size in (8, 64, 256):
+        examples = [np.random.rand(64, 64, 3).astype(np.float32) for _ in range(batch_size)]
+        template = PredictRequestTemplate(PredictRequest(
+            model_spec=model_spec, inputs={'images': {'values': np.stack(examples)}}))
+        funcs = [
+            ('np.stack + MakeTensorProto', lambda: MakeTensorProto(np.stack(examples))),
+            ('MakeBatchTensorProto', lambda: MakeBatchTensorProto(examples)),
+            ('np.stack + MakeTensorProto, to float16', lambda: MakeTensorProto(np.stack(examples), 'float16')),
+            ('MakeBatchTensorProto, to float16', lambda: MakeBatchTensorProto(examples, 'float16')),
+            ('request bytes, np.stack + template', lambda: template.render(images=np.stack(examples))),
+            ('request bytes, template of examples', lambda: template.render(images=examples)),
+        ]
+        number = max(5, 2000 // batch_size)
+        batch_bytes = batch_size * examples[0].nbytes
+        report('batch of {} x 64 x 64 x 3, time'.format(batch_size),
+               [(label, time_per_call(func, number)) for label, func in funcs])
+        report('batch of {} x 64 x 64 x 3, peak memory (in batches)'.format(batch_size),
+               [(label, peak_bytes(func) / batch_bytes) for label, func in funcs], unit='x')
+
+
+if __name__ == '__main__':
+    main()
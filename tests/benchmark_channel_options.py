@@ -0,0 +1,53 @@
+'''`Predict` latency of large tensors under each of a few `ChannelOptions`:
+message size limits, HTTP/2 flow control (BDP probing, stream window size)
+and compression, against the stand-in server. On loopback the bandwidth is
+never the bottleneck, so compression only shows its (CPU) cost here.
+
+Run: python tests/benchmark_channel_options.py
+'''
+import grpc
+import numpy as np
+
+from benchmark_utils import time_per_call, report
+import stand_in_server
+
+from apis import ChannelOptions, ModelSpec, PredictionService, PredictRequest
+
+UNLIMITED = dict(max_send_message_length=-1, max_receive_message_length=-1)
+
+SETTINGS = [
+    ('defaults', None),
+    ('unlimited message size', ChannelOptions(**UNLIMITED)),
+    ('+ keepalive 10 s', ChannelOptions(keepalive_time_ms=10000, keepalive_permit_without_calls=True,
+                                        **UNLIMITED)),
+    ('+ no BDP probe, 64 KiB window', ChannelOptions(bdp_probe=False, stream_window_size=64 * 1024,
+                                                     **UNLIMITED)),
+    ('+ no BDP probe, 16 MiB window', ChannelOptions(bdp_probe=False, stream_window_size=16 * 2 ** 20,
+                                                     **UNLIMITED)),
+    ('+ gzip', ChannelOptions(compression='gzip', **UNLIMITED)),
+    ('+ deflate', ChannelOptions(compression='deflate', **UNLIMITED)),
+]
+
+
+def main():
+    server, address = stand_in_server.serve(options=[('grpc.max_receive_message_length', -1)])
+    try:
+        for batch_size in (1, 8, 32):
+            # pixel values, as images usually are (random floats wouldn't compress at all)
+            images = np.random.randint(0, 256, (batch_size, 224, 224, 3)).astype(np.float32)
+            request = PredictRequest(model_spec=ModelSpec(name='model'), inputs={'images': {'values': images}})
+            rows = []
+            for label, options in SETTINGS:
+                service = PredictionService(address, options)
+                try:
+                    rows.append((label, time_per_call(lambda: service.predict(request), 5, 2) / 1000))
+                except grpc.RpcError as e:
+                    print('  {:<48} {}'.format(label, e.code()))
+                service.channel.close()
+            report('Predict, {:.1f} MiB request'.format(request.byte_size / 2 ** 20), rows, 'ms')
+    finally:
+        server.stop(None)
+
+
+if __name__ == '__main__':
+    main()
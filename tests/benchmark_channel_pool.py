@@ -0,0 +1,79 @@
+'''`Predict` throughput from many threads over a `ChannelPool` of 1 to 8
+channels, round-robin and least-loaded, against the stand-in server, where
+a single HTTP/2 connection is the bottleneck: the server handles at most
+`STREAMS_PER_CONNECTION` calls at once per connection (as a server's, or a
+proxy's, `max_concurrent_streams` does), each taking `DELAY`.
+
+Checks that the pool opens as many connections as channels (counting the
+peers the server sees), and reports the speedup over a single channel;
+exits with status 1 if the connections aren't distinct, or 8 channels
+don't at least double the throughput.
+
+Run: python tests/benchmark_channel_pool.py
+'''
+import sys
+import threading
+import time
+
+import numpy as np
+
+from benchmark_utils import report
+import stand_in_server
+
+from apis import ChannelPool, ModelSpec, PredictionService, PredictRequest
+
+THREADS = 64
+CALLS_PER_THREAD = 20
+STREAMS_PER_CONNECTION = 4
+# emulated compute time of the model (s)
+DELAY = 0.01
+SIZES = (1, 2, 4, 8)
+
+
+def qps(service, request):
+    def work():
+        for _ in range(CALLS_PER_THREAD):
+            service.predict(request)
+
+    threads = [threading.Thread(target=work) for _ in range(THREADS)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return THREADS * CALLS_PER_THREAD / (time.perf_counter() - start)
+
+
+def main():
+    peers = set()
+    server, address = stand_in_server.serve(delay=DELAY, max_workers=THREADS, peers=peers,
+                                            streams_per_connection=STREAMS_PER_CONNECTION)
+    request = PredictRequest(model_spec=ModelSpec(name='model'),
+                             inputs={'images': {'values': np.random.rand(1, 28, 28).astype(np.float32)}})
+    failures = []
+    try:
+        for policy in ChannelPool.POLICIES:
+            rows, connections = [], []
+            for size in SIZES:
+                peers.clear()
+                with ChannelPool(address, size, policy) as pool:
+                    rows.append(('{} channel(s)'.format(size), qps(PredictionService(pool), request)))
+                connections.append(('{} channel(s)'.format(size), len(peers)))
+                if len(peers) != size:
+                    failures.append('{} {} channel(s) used {} connection(s)'.format(policy, size, len(peers)))
+            speedup = rows[-1][1] / rows[0][1]
+            if speedup < 2:
+                failures.append('{} {} channels only sped up {:.2f}x'.format(policy, SIZES[-1], speedup))
+            report('{} threads, {}, {} streams per connection, {:.0f} ms per call'.format(
+                THREADS, policy, STREAMS_PER_CONNECTION, DELAY * 1000), rows, 'req/s')
+            report('  connections', connections, '')
+            report('  speedup of {} channels'.format(SIZES[-1]), [('', speedup)], 'x')
+    finally:
+        server.stop(None)
+    for failure in failures:
+        print('FAILED: ' + failure)
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
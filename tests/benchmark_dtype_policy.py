@@ -0,0 +1,41 @@
+'''Encoding a large int64 ID tensor: the dtype picked by `MakeTensorProto`
+(the former int32 copy + `np.array_equal` scan, and the current range check)
+vs. the dtype set by the signature's `DtypePolicy`.
+
+Run: python tests/benchmark_dtype_policy.py
+'''
+import numpy as np
+
+from benchmark_utils import time_per_call, report
+
+from tensorflow.core.framework import types_pb2
+from tensorflow.python.framework.tensor_util import MakeTensorProto
+
+from apis import DtypePolicy, PredictRequest
+
+
+def equality_scan(ids):
+    downcasted = ids.astype(np.int32)
+    return MakeTensorProto(downcasted if np.array_equal(downcasted, ids) else ids)
+
+
+def main():
+    int64_policy = DtypePolicy({'ids': types_pb2.DT_INT64})
+    int32_policy = DtypePolicy({'ids': types_pb2.DT_INT32})
+    for size in (1000, 100000, 1000000):
+        ids = np.random.randint(0, 1 << 20, size=size).astype(np.int64)
+        number = max(10, 100000 // size)
+        report('{} int64 ids'.format(size), [
+            ('MakeTensorProto, former equality scan', time_per_call(lambda: equality_scan(ids), number)),
+            ('MakeTensorProto, range check', time_per_call(lambda: MakeTensorProto(ids), number)),
+            ('PredictRequest, policy int64', time_per_call(lambda: PredictRequest(
+                inputs={'ids': {'values': ids}}, dtype_policy=int64_policy), number)),
+            ('PredictRequest, policy int32', time_per_call(lambda: PredictRequest(
+                inputs={'ids': {'values': ids}}, dtype_policy=int32_policy), number)),
+            ('PredictRequest, no policy', time_per_call(lambda: PredictRequest(
+                inputs={'ids': {'values': ids}}), number)),
+        ])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+'''The conversion engines (see `tf_utils.use_engine`): the internal codec vs.
+the TensorFlow library, throughput and peak memory of encoding and decoding
+tensors of a few dtypes and shapes. TensorFlow's rows are skipped if it isn't
+installed.
+
+Run: python tests/benchmark_engines.py
+'''
+import tracemalloc
+
+import numpy as np
+
+from benchmark_utils import time_per_call, report
+
+import tf_utils
+
+CASES = [
+    ('float32 (1, 10)', np.random.rand(1, 10).astype(np.float32)),
+    ('float32 (32, 224, 224, 3)', np.random.rand(32, 224, 224, 3).astype(np.float32)),
+    ('int64 (64, 128)', np.random.randint(0, 30000, (64, 128)).astype(np.int64)),
+    ('string (32, 128)', np.array([[b'token'] * 128] * 32, dtype=object)),
+    ('float list (1000,)', np.random.rand(1000).tolist()),
+]
+
+
+def peak_memory(func):
+    '''Returns the peak memory (MiB) allocated while calling `func`.'''
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1] / 2 ** 20
+    finally:
+        tracemalloc.stop()
+
+
+def main():
+    engines = []
+    for engine in tf_utils.ENGINES:
+        try:
+            tf_utils.use_engine(engine)
+        except ImportError:
+            print('{} engine unavailable, skipped'.format(engine))
+            continue
+        engines.append(engine)
+
+    for label, values in CASES:
+        number = 10 if getattr(values, 'nbytes', 0) > 2 ** 20 else 1000
+        timings, memory = [], []
+        for engine in engines:
+            tf_utils.use_engine(engine)
+            tensor = tf_utils._make_tensor_proto(values)
+            encode = lambda: tf_utils._make_tensor_proto(values)
+            decode = lambda: tf_utils._make_ndarray(tensor)
+            timings += [(engine + ', encode', time_per_call(encode, number, 3)),
+                        (engine + ', decode', time_per_call(decode, number, 3))]
+            memory += [(engine + ', encode', peak_memory(encode)),
+                       (engine + ', decode', peak_memory(decode))]
+        report(label, timings)
+        report(label + ', peak memory', memory, 'MiB')
+    tf_utils.use_engine('internal')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+'''Attribute access through generated `Field` accessors vs. hand-written `property` pairs.
+
+Run: python tests/benchmark_field_access.py
+'''
+from benchmark_utils import time_per_call, report
+
+from tensorflow_serving.apis import model_pb2
+
+from base import Message
+from apis import ModelSpec
+from fields import make_wrapper
+
+
+# The former hand-written implementation, kept here as the baseline
+class PropertyModelSpec(Message):
+    def __init__(self, **kwargs):
+        super().__init__(model_pb2.ModelSpec(), **kwargs)
+
+    @property
+    def name(self):
+        return self._protobuf.name
+
+    @name.setter
+    def name(self, _name):
+        self._protobuf.name = _name
+        self.__set_in_parent__()
+
+    @property
+    def version(self):
+        return self._protobuf.version.value
+
+    @version.setter
+    def version(self, _version):
+        self._protobuf.version.value = _version
+        self.__set_in_parent__()
+
+
+def main():
+    raw = model_pb2.ModelSpec(name='mnist')
+    raw.version.value = 1
+    wrappers = [
+        ('hand-written property', PropertyModelSpec(name='mnist', version=1)),
+        ('declared Field (apis.ModelSpec)', ModelSpec(name='mnist', version=1)),
+        ('generated (make_wrapper)', make_wrapper(model_pb2.ModelSpec)(name='mnist')),
+    ]
+    wrappers[-1][1].version = 1
+
+    def set_raw_name():
+        raw.name = 'mnist'
+
+    def set_raw_version():
+        raw.version.value = 1
+
+    report('get `name`', [('raw protobuf', time_per_call(lambda: raw.name, 100000))] +
+           [(label, time_per_call(lambda: spec.name, 100000)) for label, spec in wrappers])
+    report('set `name`', [('raw protobuf', time_per_call(set_raw_name, 100000))] +
+           [(label, time_per_call(lambda: setattr(spec, 'name', 'mnist'), 100000))
+            for label, spec in wrappers])
+    report('get `version`', [('raw protobuf', time_per_call(lambda: raw.version.value, 100000))] +
+           [(label, time_per_call(lambda: spec.version, 100000)) for label, spec in wrappers])
+    report('set `version`', [('raw protobuf', time_per_call(set_raw_version, 100000))] +
+           [(label, time_per_call(lambda: setattr(spec, 'version', 1), 100000))
+            for label, spec in wrappers])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,46 @@
+'''Half precision inputs: bytes on the wire and `Predict` latency against the
+stand-in server, float32 vs. float16 and bfloat16 (`PredictRequest.float_dtype`).
+
+Over loopback the transport is nearly free, so the latency mostly shows the
+cost of rounding: float16 is slower end to end than float32 (numpy's float32
+to float16 cast costs more than sending the extra bytes), bfloat16 about the
+same. The half precision types trade CPU for wire size, the savings only
+show on a network slow enough, in proportion to the size.
+
+Run: python tests/benchmark_half_precision.py
+'''
+import numpy as np
+
+from benchmark_utils import time_per_call, report
+from stand_in_server import serve
+
+from apis import ModelSpec, PredictRequest, PredictionService
+
+
+def main():
+    server, address = serve(options=[('grpc.max_receive_message_length', -1)])
+    service = PredictionService(address)
+    model_spec = ModelSpec(name='model')
+    for batch_size in (1, 8, 32, 64, 128, 256):
+        batch = np.random.rand(batch_size, 64, 64, 3).astype(np.float32)
+        sizes, latencies = [], []
+        for float_dtype in (None, 'float16', 'bfloat16'):
+            label = float_dtype or 'float32'
+
+            def predict():
+                request = PredictRequest(model_spec=model_spec, inputs={'images': {'values': batch}},
+                                         float_dtype=float_dtype)
+                return service.predict(request, 60)
+
+            request = PredictRequest(model_spec=model_spec, inputs={'images': {'values': batch}},
+                                     float_dtype=float_dtype)
+            sizes.append((label, request.byte_size / 1024))
+            latencies.append((label + ' (encode + Predict)',
+                              time_per_call(predict, max(3, 64 // batch_size), repeat=3) / 1000))
+        report('batch of {} x 64 x 64 x 3, request size'.format(batch_size), sizes, unit='KB')
+        report('batch of {} x 64 x 64 x 3, latency'.format(batch_size), latencies, unit='ms')
+    server.stop(None)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+'''Cold import time of the client modules, from `python -X importtime`, which
+must stay under a budget: exits with status 1 if it doesn't, or if importing
+prints anything or eagerly loads one of the heavy modules (see `LazyLoader`).
+
+Run: python tests/benchmark_import_time.py [budget in ms, default 100]
+'''
+import os
+import subprocess
+import sys
+
+from benchmark_utils import report
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+MODULES = ['apis', 'config', 'util']
+
+# only imported once a message or a service is used
+DEFERRED = ['asyncio', 'grpc', 'numpy', 'google.protobuf.text_format', 'tensorflow_serving.apis.predict_pb2',
+            'tensorflow.python.framework.tensor_util']
+
+
+def import_time(module, repeat=5):
+    '''Returns the best cumulative import time of `module` (ms), and the slowest of its imports.'''
+    best = None
+    for _ in range(repeat):
+        process = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import ' + module],
+                                 cwd=ROOT, capture_output=True, text=True, check=True)
+        timings = []
+        # "import time: self [us] | cumulative | imported package", the imports
+        # of a module are listed (indented) right before it
+        for line in process.stderr.splitlines():
+            if line.startswith('import time:') and not line.endswith('imported package'):
+                _, cumulative, name = line[len('import time:'):].split('|')
+                timings.append((name.strip(), int(cumulative) / 1000))
+                if not name[1:].startswith(' ') and name.strip() != module:
+                    # a top-level import of the interpreter (e.g. `site`)
+                    timings = []
+        total = timings[-1][1]
+        if best is None or total < best[0]:
+            best = total, sorted(timings[:-1], key=lambda timing: -timing[1])[:5], process.stdout
+    return best
+
+
+def deferred_imports(module):
+    '''Returns the modules of `DEFERRED` that importing `module` loads.'''
+    code = 'import sys, {}; print(" ".join(m for m in {!r} if m in sys.modules))'.format(module, DEFERRED)
+    process = subprocess.run([sys.executable, '-c', code], cwd=ROOT, capture_output=True,
+                             text=True, check=True)
+    return process.stdout.split()
+
+
+def main(budget=100.0):
+    failures = []
+    for module in MODULES:
+        total, slowest, stdout = import_time(module)
+        report('import {} (budget {:.0f} ms)'.format(module, budget),
+               [('total', total)] + [('  ' + name, ms) for name, ms in slowest], 'ms')
+        if total > budget:
+            failures.append('importing {} took {:.1f} ms, over the {:.0f} ms budget'.format(
+                module, total, budget))
+        if stdout:
+            failures.append('importing {} printed {!r}'.format(module, stdout))
+        loaded = deferred_imports(module)
+        if loaded:
+            failures.append('importing {} loaded {}'.format(module, ', '.join(loaded)))
+    for failure in failures:
+        print('FAILED: ' + failure)
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(*map(float, sys.argv[1:])))
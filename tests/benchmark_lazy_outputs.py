@@ -0,0 +1,33 @@
+'''Reading only `scores` from a multi-head `PredictResponse` (with a large `embeddings` output).
+
+Run: python tests/benchmark_lazy_outputs.py
+'''
+import numpy as np
+
+from benchmark_utils import time_per_call, report
+from stand_in_server import predict_response
+
+from tensorflow_serving.apis import predict_pb2
+
+from apis import PredictResponse
+
+
+def main():
+    for batch_size in (1, 32, 256):
+        data = predict_response({
+            'scores': np.random.rand(batch_size, 10).astype(np.float32),
+            'embeddings': np.random.rand(batch_size, 1024).astype(np.float32),
+        })
+        parse = lambda: PredictResponse.wrap(predict_pb2.PredictResponse.FromString(data))
+        report('scores of a response with a batch of {}'.format(batch_size), [
+            ('parse + parse_outputs()', time_per_call(
+                lambda: parse().parse_outputs()['scores'], 1000)),
+            ('parse + parse_outputs(lazy=True)', time_per_call(
+                lambda: parse().parse_outputs(lazy=True)['scores'], 1000)),
+            ('parse_outputs_from_bytes(keys=[scores])', time_per_call(
+                lambda: PredictResponse.parse_outputs_from_bytes(data, ['scores'])['scores'], 1000)),
+        ])
+
+
+if __name__ == '__main__':
+    main()
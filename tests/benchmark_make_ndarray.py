@@ -0,0 +1,25 @@
+'''Decoding a `tensor_content` tensor: copy vs. read-only view vs. preallocated `out`.
+
+Run: python tests/benchmark_make_ndarray.py
+'''
+import numpy as np
+
+from benchmark_utils import time_per_call, report
+
+from tf_utils import _make_tensor_proto, _make_ndarray
+
+
+def main():
+    for shape in ((32, 10), (256, 1024), (64, 224, 224, 3)):
+        tensor = _make_tensor_proto(np.random.rand(*shape).astype(np.float32))
+        out = np.empty(shape, np.float32)
+        number = 10000 if len(shape) == 2 else 20
+        report('_make_ndarray, output of shape {}'.format(shape), [
+            ('copy=True', time_per_call(lambda: _make_ndarray(tensor), number)),
+            ('copy=False', time_per_call(lambda: _make_ndarray(tensor, copy=False), number)),
+            ('out=', time_per_call(lambda: _make_ndarray(tensor, out=out), number)),
+        ])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,40 @@
+'''`MakeTensorProto` on small tensors, where building the shape proto and
+resolving the dtype dominate: with the shape/dtype caches vs. missing them.
+
+Run: python tests/benchmark_make_tensor_proto.py
+'''
+import numpy as np
+
+from benchmark_utils import time_per_call, report
+
+from tensorflow.python.framework import dtypes, tensor_shape
+from tensorflow.python.framework.tensor_util import MakeTensorProto
+
+
+def clear_caches():
+    tensor_shape._SHAPE_PROTO_CACHE.clear()
+    dtypes._DTYPE_CACHE.clear()
+
+
+def main():
+    for shape in ((1,), (1, 10), (8, 32, 32)):
+        values = np.random.rand(*shape).astype(np.float32)
+        report('MakeTensorProto, tensor of shape {}'.format(shape), [
+            ('cache misses', time_per_call(lambda: clear_caches() or MakeTensorProto(values))),
+            ('cache hits', time_per_call(lambda: MakeTensorProto(values))),
+        ])
+    report('shape proto of (1, 10)', [
+        ('as_shape().as_proto()', time_per_call(lambda: tensor_shape.as_shape((1, 10)).as_proto())),
+        ('as_shape_proto()', time_per_call(lambda: tensor_shape.as_shape_proto((1, 10)), 100000)),
+    ])
+    np_dtype = np.dtype(np.float32)
+    report('as_dtype', [
+        ('np.dtype, uncached', time_per_call(lambda: dtypes._as_dtype(np_dtype), 100000)),
+        ('np.dtype, cached', time_per_call(lambda: dtypes.as_dtype(np_dtype), 100000)),
+        ('name, uncached', time_per_call(lambda: dtypes._as_dtype('float32'), 100000)),
+        ('name, cached', time_per_call(lambda: dtypes.as_dtype('float32'), 100000)),
+    ])
+
+
+if __name__ == '__main__':
+    main()
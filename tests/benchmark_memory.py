@@ -0,0 +1,70 @@
+'''Memory held per wrapped request/response, measured with `tracemalloc`.
+
+Run: python tests/benchmark_memory.py
+'''
+import gc
+import tracemalloc
+
+from benchmark_utils import report
+
+from tensorflow_serving.apis import predict_pb2
+
+from apis import ModelSpec, PredictRequest, PredictResponse
+
+
+# `__dict__`-based instances, with the child wrappers attached as attributes,
+# i.e. the layout before `Message` was made `__slots__`-based
+class DictPredictResponse(PredictResponse):
+    def __init__(self, *args, **kwargs):
+        self.__dict__['_model_spec'] = None
+        super().__init__(*args, **kwargs)
+
+
+class DictPredictRequest(PredictRequest):
+    def __init__(self, *args, **kwargs):
+        self.__dict__['_model_spec'] = None
+        super().__init__(*args, **kwargs)
+
+
+def bytes_per_object(factory, number=10000):
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    objects = [factory(i) for i in range(number)]
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    size = sum(stat.size_diff for stat in after.compare_to(before, 'filename'))
+    del objects
+    return size / number
+
+
+def main():
+    responses = [predict_pb2.PredictResponse() for _ in range(10000)]
+    for response in responses:
+        response.model_spec.name = 'mnist'
+
+    def wrap(wrapper):
+        def factory(i):
+            obj = wrapper._wrap(responses[i])
+            obj.model_spec
+            return obj
+        return factory
+
+    report('wrapper overhead per PredictResponse (model_spec accessed)', [
+        ('__dict__ layout', bytes_per_object(wrap(DictPredictResponse))),
+        ('__slots__ layout', bytes_per_object(wrap(PredictResponse))),
+    ], unit='bytes')
+
+    def build(wrapper):
+        def factory(i):
+            return wrapper(model_spec=ModelSpec(name='mnist', version=1), output_filter='scores')
+        return factory
+
+    report('PredictRequest incl. protobuf', [
+        ('__dict__ layout', bytes_per_object(build(DictPredictRequest))),
+        ('__slots__ layout', bytes_per_object(build(PredictRequest))),
+    ], unit='bytes')
+
+
+if __name__ == '__main__':
+    main()
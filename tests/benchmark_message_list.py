@@ -0,0 +1,50 @@
+'''`MessageList` iteration, indexing and `extend` on large repeated message fields.
+
+`extend` is reported for reference only, its cost is copying the items into
+the container, however they're given.
+
+Run: python tests/benchmark_message_list.py
+'''
+from itertools import islice
+
+from benchmark_utils import time_per_call, report
+
+from base import Message
+from config import ModelConfig, ModelConfigList
+
+
+def eager_iter(message_list):
+    # the former `__iter__`, which wrapped every item before iterating
+    return iter([Message.wrap_pb(message_list._wrapper, item, container=message_list)
+                 for item in message_list._protobuf])
+
+
+def main():
+    for num_models in (100, 1000, 10000):
+        model_config_list = ModelConfigList(config=[
+            ModelConfig(name='model_{}'.format(i), base_path='/models/model_{}'.format(i))
+            for i in range(num_models)])
+        configs = model_config_list.config
+        number = max(1, 10000 // num_models)
+        report('ModelConfigList.config ({} models)'.format(num_models), [
+            ('iterate all, eagerly wrapped', time_per_call(lambda: list(eager_iter(configs)), number)),
+            ('iterate all, lazy + pooled', time_per_call(lambda: list(configs), number)),
+            ('first 10, eagerly wrapped', time_per_call(
+                lambda: list(islice(eager_iter(configs), 10)), number)),
+            ('first 10, lazy + pooled', time_per_call(lambda: list(islice(configs, 10)), number)),
+            ('slice [::10], eagerly wrapped', time_per_call(
+                lambda: list(eager_iter(configs))[::10], number)),
+            ('slice [::10], view', time_per_call(lambda: list(configs[::10]), number)),
+        ])
+
+        source = list(configs)
+        report('extend by {} wrapped models'.format(num_models), [
+            ('extend(list of wrappers)', time_per_call(
+                lambda: ModelConfigList().config.extend(source), number)),
+            ('extend(MessageList)', time_per_call(
+                lambda: ModelConfigList().config.extend(configs), number)),
+        ])
+
+
+if __name__ == '__main__':
+    main()
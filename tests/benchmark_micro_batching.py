@@ -0,0 +1,69 @@
+'''Single-example `Predict` calls from many threads: sent one RPC each vs.
+coalesced by a `PredictBatcher`, against the stand-in server with a fixed
+cost per RPC (as with the server's batching, a batch costs about as much as
+a single example).
+
+Run: python tests/benchmark_micro_batching.py
+'''
+import threading
+import time
+
+import numpy as np
+
+from benchmark_utils import report
+import stand_in_server
+
+from apis import ModelSpec, PredictionService, PredictRequest
+from batching import PredictBatcher
+
+THREADS = 64
+CALLS_PER_THREAD = 50
+# emulated compute time of the model per RPC (s)
+DELAY = 0.002
+
+
+def qps(predict, request):
+    def work():
+        for _ in range(CALLS_PER_THREAD):
+            predict(request)
+
+    threads = [threading.Thread(target=work) for _ in range(THREADS)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return THREADS * CALLS_PER_THREAD / (time.perf_counter() - start)
+
+
+def main():
+    canned = stand_in_server.predict_response()
+    rpcs = []
+
+    def count(data):
+        rpcs.append(None)
+        return canned
+
+    server, address = stand_in_server.serve(count, delay=DELAY, max_workers=THREADS)
+    service = PredictionService(address)
+    request = PredictRequest(model_spec=ModelSpec(name='model'),
+                             inputs={'images': {'values': np.random.rand(1, 28, 28).astype(np.float32)}})
+    calls = THREADS * CALLS_PER_THREAD
+    try:
+        rows = [('one RPC per call', qps(service.predict, request))]
+        batch_sizes = []
+        for max_batch_size, batch_timeout_micros in ((8, 1000), (32, 1000), (64, 2000)):
+            label = 'batcher, max_batch_size={}, timeout={} us'.format(max_batch_size, batch_timeout_micros)
+            del rpcs[:]
+            with PredictBatcher(service, max_batch_size, batch_timeout_micros) as batcher:
+                rows.append((label, qps(batcher.predict, request)))
+            batch_sizes.append((label, calls / len(rpcs)))
+        report('{} threads x {} single-example calls, {:.0f} ms per RPC'.format(
+            THREADS, CALLS_PER_THREAD, DELAY * 1000), rows, 'req/s')
+        report('mean batch size', batch_sizes, 'examples')
+    finally:
+        server.stop(None)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,39 @@
+'''Per-access cost of nested message attributes: live views vs. mirrored copies.
+
+Run: python tests/benchmark_nested_access.py
+'''
+from benchmark_utils import time_per_call, report
+
+from apis import ModelSpec, PredictRequest, ReloadConfigRequest
+from config import ModelConfig, ModelConfigList, ModelServerConfig
+
+
+def model_server_config(num_models):
+    configs = [ModelConfig(name='model_{}'.format(i),
+                           base_path='/models/model_{}'.format(i),
+                           model_platform='tensorflow') for i in range(num_models)]
+    return ModelServerConfig(model_config_list=ModelConfigList(config=configs))
+
+
+def main():
+    model_spec = ModelSpec(name='mnist', version=1, signature_name='predict_images')
+    view_request = PredictRequest(model_spec=model_spec)
+    copy_request = PredictRequest(model_spec=model_spec, copy_nested=True)
+    report('PredictRequest.model_spec', [
+        ('view (default)', time_per_call(lambda: view_request.model_spec)),
+        ('copy (copy_nested=True)', time_per_call(lambda: copy_request.model_spec)),
+    ])
+
+    for num_models in (10, 100, 1000):
+        config = model_server_config(num_models)
+        view_request = ReloadConfigRequest(config=config)
+        copy_request = ReloadConfigRequest(config=config, copy_nested=True)
+        number = 100000 // num_models
+        report('ReloadConfigRequest.config ({} models)'.format(num_models), [
+            ('view (default)', time_per_call(lambda: view_request.config, number)),
+            ('copy (copy_nested=True)', time_per_call(lambda: copy_request.config, number)),
+        ])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+'''Cost of writes to nested wrappers: deferred (dirty-tracked) sync vs. eager sync.
+
+Run: python tests/benchmark_nested_writes.py
+'''
+from benchmark_utils import time_per_call, report
+
+from apis import ModelSpec, PredictRequest, ReloadConfigRequest
+from config import ModelConfig, ModelConfigList, ModelServerConfig
+
+
+def set_model_spec(model_spec):
+    model_spec.name = 'mnist'
+    model_spec.version = 2
+    model_spec.signature_name = 'predict_images'
+
+
+def set_model_spec_eagerly(request, model_spec):
+    # emulates the former behaviour, i.e. syncing the ancestors on every write
+    model_spec.name = 'mnist'
+    request.flush()
+    model_spec.version = 2
+    request.flush()
+    model_spec.signature_name = 'predict_images'
+    request.flush()
+
+
+def main():
+    view_request = PredictRequest(model_spec=ModelSpec(name='mnist'))
+    copy_request = PredictRequest(model_spec=ModelSpec(name='mnist'), copy_nested=True)
+    model_spec = copy_request.model_spec
+    report('3 writes to PredictRequest.model_spec', [
+        ('view (default)', time_per_call(lambda: set_model_spec(view_request.model_spec))),
+        ('copy, deferred sync', time_per_call(lambda: set_model_spec(model_spec))),
+        ('copy, deferred sync + flush', time_per_call(
+            lambda: (set_model_spec(model_spec), copy_request.flush()))),
+        ('copy, eager sync', time_per_call(
+            lambda: set_model_spec_eagerly(copy_request, model_spec))),
+    ])
+
+    configs = [ModelConfig(name='model_{}'.format(i), base_path='/models/model_{}'.format(i))
+               for i in range(100)]
+    config = ModelServerConfig(model_config_list=ModelConfigList(config=configs))
+    copy_request = ReloadConfigRequest(config=config, copy_nested=True)
+    model_config = copy_request.config.model_config_list.config[0]
+
+    def rename_eagerly():
+        for i in range(10):
+            model_config.name = 'model_{}'.format(i)
+            copy_request.flush()
+
+    def rename():
+        for i in range(10):
+            model_config.name = 'model_{}'.format(i)
+        copy_request.flush()
+
+    report('10 writes to a ModelConfig inside ReloadConfigRequest (100 models)', [
+        ('copy, deferred sync + flush', time_per_call(rename, number=1000)),
+        ('copy, eager sync', time_per_call(rename_eagerly, number=1000)),
+    ])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,53 @@
+'''Throughput of `predict_pipelined` (see `PredictPipeline`) vs. serial
+`predict` calls (as in the notebooks' `time_for_grpc_requests`), which are
+capped at one request per round trip, against the stand-in server.
+
+Run: python tests/benchmark_pipelined_predict.py
+'''
+import time
+
+import numpy as np
+
+from benchmark_utils import report
+import stand_in_server
+
+from apis import ModelSpec, PredictionService, PredictRequest
+
+REQUESTS = 1000
+# emulated compute time of the model (s)
+DELAY = 0.002
+
+
+def serial_qps(service, requests):
+    start = time.perf_counter()
+    for request in requests:
+        service.predict(request)
+    return len(requests) / (time.perf_counter() - start)
+
+
+def main():
+    server, address = stand_in_server.serve(delay=DELAY, max_workers=128)
+    service = PredictionService(address)
+    requests = [PredictRequest(model_spec=ModelSpec(name='model'),
+                               inputs={'images': {'values': np.random.rand(1, 28, 28).astype(np.float32)}})
+                for _ in range(REQUESTS)]
+    try:
+        rows = [('serial predict', serial_qps(service, requests))]
+        depths = []
+        for ordered in (True, False):
+            for max_in_flight in (1, 4, 16, 64):
+                pipeline = service.predict_pipelined(requests, max_in_flight, ordered)
+                for _ in pipeline:
+                    pass
+                label = '{}, max_in_flight={}'.format('ordered' if ordered else 'as completed',
+                                                      max_in_flight)
+                rows.append((label, pipeline.qps))
+                depths.append((label, pipeline.mean_in_flight))
+        report('{} requests, {:.0f} ms of model time'.format(REQUESTS, DELAY * 1000), rows, 'req/s')
+        report('mean in-flight depth', depths, 'requests')
+    finally:
+        server.stop(None)
+
+
+if __name__ == '__main__':
+    main()
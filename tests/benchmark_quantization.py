@@ -0,0 +1,44 @@
+'''Quantized (quint8) vs. float32 image inputs: request size and encoding time,
+per tensor and per channel.
+
+Run: python tests/benchmark_quantization.py
+'''
+import numpy as np
+
+from benchmark_utils import time_per_call, report
+
+from apis import ModelSpec, PredictRequest
+from quantization import make_quantized_tensor_proto, dequantize
+from tf_utils import _make_tensor_proto, _make_ndarray
+
+
+def request_size(tensor):
+    return PredictRequest(model_spec=ModelSpec(name='model'),
+                          inputs={'images': {'values': tensor}}).byte_size
+
+
+def main():
+    for batch_size in (1, 32, 256):
+        batch = np.random.rand(batch_size, 64, 64, 3).astype(np.float32)
+        tensor, params = make_quantized_tensor_proto(batch, 'quint8')
+        channel_tensor, channel_params = make_quantized_tensor_proto(batch, 'quint8', axis=-1)
+        number = max(5, 1000 // batch_size)
+        report('batch of {} x 64 x 64 x 3, request size'.format(batch_size), [
+            ('float32', request_size(_make_tensor_proto(batch)) / 1024),
+            ('quint8', request_size(tensor) / 1024),
+        ], unit='KB')
+        report('batch of {} x 64 x 64 x 3, encoding'.format(batch_size), [
+            ('float32 tensor_proto', time_per_call(lambda: _make_tensor_proto(batch), number)),
+            ('quint8 tensor_proto, per tensor', time_per_call(
+                lambda: make_quantized_tensor_proto(batch, 'quint8'), number)),
+            ('quint8 tensor_proto, per channel', time_per_call(
+                lambda: make_quantized_tensor_proto(batch, 'quint8', axis=-1), number)),
+            ('quint8 tensor_proto, given params', time_per_call(
+                lambda: make_quantized_tensor_proto(batch, 'quint8', params=params), number)),
+            ('dequantize, per channel', time_per_call(
+                lambda: dequantize(_make_ndarray(channel_tensor), channel_params), number)),
+        ])
+
+
+if __name__ == '__main__':
+    main()
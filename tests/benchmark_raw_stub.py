@@ -0,0 +1,38 @@
+'''`Predict` round trips against the stand-in server: the generated stub vs. the raw-bytes stub.
+
+The generated stub serializes the request and parses the response on every
+call; the raw stub sends ready-made bytes and returns the response bytes, which
+`predict_bytes` only parses on first use.
+
+Run: python tests/benchmark_raw_stub.py
+'''
+import numpy as np
+
+from benchmark_utils import time_per_call, report
+from stand_in_server import serve, predict_response
+
+from apis import ModelSpec, PredictRequest, PredictionService
+
+
+def main():
+    for shape in ((1, 784), (32, 784), (256, 784)):
+        outputs = {'scores': np.random.rand(shape[0], 10).astype(np.float32)}
+        canned = predict_response(outputs)
+        server, address = serve(lambda request: canned)
+        service = PredictionService(address)
+        batch = np.random.rand(*shape).astype(np.float32)
+        request = PredictRequest(model_spec=ModelSpec(name='mnist'), inputs={'images': {'values': batch}})
+        pb = request._protobuf
+        data = pb.SerializeToString()
+        report('Predict round trip, input of shape {}'.format(shape), [
+            ('stub.Predict(pb)', time_per_call(lambda: service.stub.Predict(pb, 10), 500)),
+            ('raw_stub.Predict(bytes)', time_per_call(lambda: service.raw_stub.Predict(data, 10), 500)),
+            ('predict_bytes(bytes), unparsed', time_per_call(lambda: service.predict_bytes(data, 10), 500)),
+            ('predict_bytes(bytes).outputs', time_per_call(lambda: service.predict_bytes(data, 10).outputs, 500)),
+        ])
+        service.channel.close()
+        server.stop(None)
+
+
+if __name__ == '__main__':
+    main()
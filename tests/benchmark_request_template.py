@@ -0,0 +1,39 @@
+'''Producing the wire bytes of a `PredictRequest`: template splicing vs. building the `pb`.
+
+Run: python tests/benchmark_request_template.py
+'''
+import numpy as np
+
+from benchmark_utils import time_per_call, report
+
+from tensorflow_serving.apis import predict_pb2
+from tensorflow.python.framework.tensor_util import MakeTensorProto
+
+from apis import ModelSpec, PredictRequest, PredictRequestTemplate
+
+
+def serialize_pb(model_spec, batch):
+    request = predict_pb2.PredictRequest()
+    request.model_spec.CopyFrom(model_spec)
+    request.inputs['images'].CopyFrom(MakeTensorProto(batch))
+    return request.SerializeToString()
+
+
+def main():
+    model_spec = ModelSpec(name='mnist', version=1, signature_name='predict_images')
+    for shape in ((1, 784), (32, 784), (256, 784), (8, 224, 224, 3)):
+        batch = np.random.rand(*shape).astype(np.float32)
+        request = PredictRequest(model_spec=model_spec, inputs={'images': {'values': batch}})
+        template = PredictRequestTemplate(request)
+        assert template.render(images=batch) == request._protobuf.SerializeToString()
+        number = 2000 if batch.nbytes < 1 << 20 else 100
+        report('PredictRequest bytes, input of shape {}'.format(shape), [
+            ('MakeTensorProto + SerializeToString', time_per_call(
+                lambda: serialize_pb(model_spec._protobuf, batch), number)),
+            ('PredictRequestTemplate.render', time_per_call(
+                lambda: template.render(images=batch), number)),
+        ])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,55 @@
+'''Sparse inputs of a high-cardinality feature: sent as their indices, values
+and dense shape vs. densified, the time to build the `PredictRequest` and its
+size on the wire. Uses a SciPy CSR matrix if SciPy is installed, an
+`(indices, values, dense_shape)` tuple otherwise.
+
+Run: python tests/benchmark_sparse_inputs.py
+'''
+import numpy as np
+
+from benchmark_utils import time_per_call, report
+
+from apis import PredictRequest
+
+BATCH_SIZE = 64
+VOCABULARY_SIZE = 100000
+NNZ_PER_ROW = 50
+
+
+def sparse_batch():
+    rows = np.repeat(np.arange(BATCH_SIZE), NNZ_PER_ROW)
+    cols = np.random.randint(0, VOCABULARY_SIZE, rows.size)
+    values = np.random.rand(rows.size).astype(np.float32)
+    try:
+        from scipy import sparse
+    except ImportError:
+        print('SciPy unavailable, using an (indices, values, dense_shape) tuple')
+        return (np.stack([rows, cols], axis=1), values, (BATCH_SIZE, VOCABULARY_SIZE)), rows, cols, values
+    matrix = sparse.csr_matrix((values, (rows, cols)), shape=(BATCH_SIZE, VOCABULARY_SIZE))
+    return matrix, rows, cols, values
+
+
+def main():
+    batch, rows, cols, values = sparse_batch()
+
+    def densified():
+        dense = np.zeros((BATCH_SIZE, VOCABULARY_SIZE), dtype=np.float32)
+        dense[rows, cols] = values
+        return PredictRequest(inputs={'ids': {'values': dense}})
+
+    def sparse():
+        return PredictRequest(inputs={'ids': {'sparse': batch}})
+
+    report('PredictRequest, {} x {} with {} non-zeros per row'.format(
+        BATCH_SIZE, VOCABULARY_SIZE, NNZ_PER_ROW), [
+        ('densified', time_per_call(densified, 10, 3)),
+        ('sparse', time_per_call(sparse, 100, 3)),
+    ])
+    report('request size', [
+        ('densified', densified().byte_size / 1024),
+        ('sparse', sparse().byte_size / 1024),
+    ], 'KiB')
+
+
+if __name__ == '__main__':
+    main()
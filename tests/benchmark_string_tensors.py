@@ -0,0 +1,48 @@
+'''Encoding and decoding `DT_STRING` tensors (e.g. a batch of encoded JPEGs):
+bulk (`MakeTensorProto`/`MakeNdarray`) vs. per element.
+
+Run: python tests/benchmark_string_tensors.py
+'''
+import os
+
+import numpy as np
+
+from benchmark_utils import time_per_call, report
+
+from tensorflow.core.framework import tensor_pb2
+from tensorflow.python.framework.tensor_util import MakeTensorProto, MakeNdarray
+
+
+def encode_per_element(images):
+    tensor = tensor_pb2.TensorProto(dtype=7)
+    tensor.tensor_shape.dim.add(size=len(images))
+    for image in images:
+        tensor.string_val.append(image)
+    return tensor
+
+
+def decode_per_element(tensor):
+    return np.array(list(tensor.string_val), dtype=object)
+
+
+def main():
+    for batch_size in (1, 32, 256):
+        images = [os.urandom(20000) for _ in range(batch_size)]
+        batch = np.array(images, dtype=object)
+        tensor = MakeTensorProto(batch)
+        number = max(10, 10000 // batch_size)
+        report('{} images of 20KB'.format(batch_size), [
+            ('encode per element', time_per_call(lambda: encode_per_element(images), number)),
+            ('MakeTensorProto(object array)', time_per_call(lambda: MakeTensorProto(batch), number)),
+            ('MakeTensorProto(list of bytes)', time_per_call(lambda: MakeTensorProto(images), number)),
+            ('decode per element', time_per_call(lambda: decode_per_element(tensor), number)),
+            ('MakeNdarray', time_per_call(lambda: MakeNdarray(tensor), number)),
+        ])
+    tokens = np.array([['token{}'.format(i) for i in range(128)]] * 32)
+    report('32 x 128 unicode tokens', [
+        ('MakeTensorProto', time_per_call(lambda: MakeTensorProto(tokens), 200)),
+    ])
+
+
+if __name__ == '__main__':
+    main()
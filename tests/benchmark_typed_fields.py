@@ -0,0 +1,64 @@
+'''Decoding tensors sent in typed repeated fields (`float_val`, `int_val`, ...), per dtype:
+the former per-element conversion vs. the bulk conversion used by `MakeNdarray`
+(also timed whole, i.e. with the shape and dtype handling).
+
+Run: python tests/benchmark_typed_fields.py
+'''
+import numpy as np
+
+from benchmark_utils import time_per_call, report
+
+from tensorflow.core.framework import tensor_pb2
+from tensorflow.python.framework import dtypes
+from tensorflow.python.framework.tensor_util import MakeNdarray, _TYPED_FIELDS, _repeated_to_ndarray
+
+
+def per_element(tensor):
+    tensor_dtype = dtypes.as_dtype(tensor.dtype)
+    field_name, field_dtype = _TYPED_FIELDS[tensor_dtype]
+    values = getattr(tensor, field_name)
+    if tensor_dtype in (dtypes.complex64, dtypes.complex128):
+        it = iter(values)
+        return np.array([complex(x[0], x[1]) for x in zip(it, it)], dtype=tensor_dtype.as_numpy_dtype)
+    return np.fromiter(values, dtype=field_dtype)
+
+
+def bulk(tensor):
+    tensor_dtype = dtypes.as_dtype(tensor.dtype)
+    field_name, field_dtype = _TYPED_FIELDS[tensor_dtype]
+    values = _repeated_to_ndarray(getattr(tensor, field_name), field_dtype)
+    if tensor_dtype in (dtypes.complex64, dtypes.complex128):
+        return values.view(tensor_dtype.as_numpy_dtype)
+    return values
+
+
+def typed_tensor(tensor_dtype, size):
+    field_name, field_dtype = _TYPED_FIELDS[tensor_dtype]
+    tensor = tensor_pb2.TensorProto(dtype=tensor_dtype.as_datatype_enum)
+    if tensor_dtype in (dtypes.complex64, dtypes.complex128):
+        tensor.tensor_shape.dim.add(size=size // 2)
+    else:
+        tensor.tensor_shape.dim.add(size=size)
+    values = np.random.rand(size) * 100
+    getattr(tensor, field_name).extend(values.astype(field_dtype).tolist())
+    return tensor
+
+
+def main():
+    for size in (10, 1000, 100000):
+        number = max(10, 100000 // size)
+        rows = []
+        for tensor_dtype in (dtypes.float32, dtypes.float64, dtypes.int32, dtypes.int64,
+                             dtypes.bool, dtypes.float16, dtypes.complex64):
+            tensor = typed_tensor(tensor_dtype, size)
+            assert np.array_equal(MakeNdarray(tensor).view(np.uint8), per_element(tensor).view(np.uint8)) \
+                or tensor_dtype == dtypes.float16
+            name = _TYPED_FIELDS[tensor_dtype][0]
+            rows.append(('{} per element'.format(name), time_per_call(lambda: per_element(tensor), number)))
+            rows.append(('{} bulk'.format(name), time_per_call(lambda: bulk(tensor), number)))
+            rows.append(('{} MakeNdarray'.format(name), time_per_call(lambda: MakeNdarray(tensor), number)))
+        report('MakeNdarray of {} typed values'.format(size), rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,17 @@
+import os
+import sys
+import timeit
+
+# the client modules live at the top-level of the repo (see the notebooks)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+
+def time_per_call(func, number=10000, repeat=5):
+    '''Returns the best per-call time of `func` in microseconds.'''
+    return min(timeit.repeat(func, number=number, repeat=repeat)) / number * 1e6
+
+
+def report(title, rows, unit='us'):
+    print(title)
+    for label, value in rows:
+        print('  {:<48} {:>12.3f} {}'.format(label, value, unit))
@@ -0,0 +1,35 @@
+'''Wrapping a `PredictResponse` returned by a stub: `copy` vs. `wrap`/`adopt`.
+
+Run: python tests/benchmark_wrap_response.py
+'''
+import numpy as np
+
+from benchmark_utils import time_per_call, report
+
+from tensorflow_serving.apis import predict_pb2
+
+from apis import PredictResponse
+from tf_utils import _make_tensor_proto
+
+
+def response(batch_size, num_features):
+    pb = predict_pb2.PredictResponse()
+    pb.model_spec.name = 'model'
+    outputs = np.random.rand(batch_size, num_features).astype(np.float32)
+    pb.outputs['scores'].CopyFrom(_make_tensor_proto(outputs))
+    return pb
+
+
+def main():
+    for batch_size, num_features in ((1, 10), (100, 1000), (100, 224 * 224)):
+        pb = response(batch_size, num_features)
+        number = 1000 if batch_size == 1 else 50
+        report('PredictResponse, outputs of shape ({}, {})'.format(batch_size, num_features), [
+            ('PredictResponse().copy(pb)', time_per_call(lambda: PredictResponse().copy(pb), number)),
+            ('PredictResponse().adopt(pb)', time_per_call(lambda: PredictResponse().adopt(pb), number)),
+            ('PredictResponse.wrap(pb)', time_per_call(lambda: PredictResponse.wrap(pb), number)),
+        ])
+
+
+if __name__ == '__main__':
+    main()
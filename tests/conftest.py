@@ -0,0 +1,8 @@
+# The tests import the helpers next to them (e.g. `stand_in_server`) and the
+# client modules, at the top-level of the repo, as the benchmarks do.
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import benchmark_utils  # noqa: E402,F401 (puts the client modules on the path)
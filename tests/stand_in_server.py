@@ -0,0 +1,122 @@
+'''An in-process stand-in for `tensorflow_model_server`, for the gRPC benchmarks.
+
+`Predict` requests aren't parsed, by default they're answered with a canned
+response, so the measurements are dominated by the client and the transport.
+'''
+import collections
+import multiprocessing
+import threading
+import time
+from concurrent import futures
+
+import grpc
+import numpy as np
+
+import benchmark_utils  # puts the client modules on the path
+from tensorflow_serving.apis import get_model_metadata_pb2, predict_pb2
+
+from tf_utils import _make_tensor_proto
+
+
+def predict_response(outputs=None, model_name='model'):
+    response = predict_pb2.PredictResponse()
+    response.model_spec.name = model_name
+    if outputs is None:
+        outputs = {'scores': np.random.rand(1, 10).astype(np.float32)}
+    for key, value in outputs.items():
+        response.outputs[key].CopyFrom(_make_tensor_proto(value))
+    return response.SerializeToString()
+
+
+def metadata_response(inputs, signature_name='serving_default', model_name='model'):
+    '''`inputs` maps the input keys of the signature to their dtype (enum).'''
+    signature_def_map = get_model_metadata_pb2.SignatureDefMap()
+    signature_def = signature_def_map.signature_def[signature_name]
+    for key, dtype in inputs.items():
+        signature_def.inputs[key].dtype = dtype
+    response = get_model_metadata_pb2.GetModelMetadataResponse()
+    response.model_spec.name = model_name
+    response.metadata['signature_def'].Pack(signature_def_map)
+    return response.SerializeToString()
+
+
+def serve(handler=None, delay=0.0, max_workers=16, options=None, metadata=None, peers=None,
+          streams_per_connection=None):
+    '''Starts the server on a free local port and returns `(server, address)`.
+
+    `handler` maps the raw `Predict` request bytes to the raw response bytes;
+    `delay` (seconds) emulates the model's compute time. `metadata` is the raw
+    `GetModelMetadata` response, if any (see `metadata_response`). The address
+    of the client's end of each connection a `Predict` call came through is
+    added to `peers` (a set), if given.
+
+    `streams_per_connection` emulates a limit on the calls handled at once per
+    (HTTP/2) connection, as a server's `max_concurrent_streams` (or a proxy's)
+    sets, the others waiting their turn; the limit of gRPC itself refuses the
+    streams over it, failing the calls, rather than queueing them.
+    '''
+    if handler is None:
+        canned = predict_response()
+        handler = lambda request: canned
+
+    if streams_per_connection is not None:
+        lock = threading.Lock()
+        streams = collections.defaultdict(lambda: threading.BoundedSemaphore(streams_per_connection))
+
+    def predict(request, context):
+        if peers is not None:
+            peers.add(context.peer())
+        if streams_per_connection is None:
+            return respond(request)
+        with lock:
+            stream = streams[context.peer()]
+        with stream:
+            return respond(request)
+
+    def respond(request):
+        if delay:
+            time.sleep(delay)
+        return handler(request)
+
+    methods = {'Predict': grpc.unary_unary_rpc_method_handler(predict)}
+    if metadata is not None:
+        methods['GetModelMetadata'] = grpc.unary_unary_rpc_method_handler(
+            lambda request, context: metadata)
+
+    server = grpc.server(futures.ThreadPoolExecutor(max_workers=max_workers),
+                         options=options or [])
+    server.add_generic_rpc_handlers([grpc.method_handlers_generic_handler(
+        'tensorflow.serving.PredictionService', methods)])
+    port = server.add_insecure_port('127.0.0.1:0')
+    server.start()
+    return server, '127.0.0.1:{}'.format(port)
+
+
+def _serve_forever(connection, kwargs):
+    server, address = serve(**kwargs)
+    connection.send(address)
+    # until `stop`
+    connection.recv()
+    server.stop(None)
+
+
+# A server in a child process, see `serve_process`.
+class ServerProcess(object):
+    def __init__(self, process, connection):
+        self.process = process
+        self.connection = connection
+
+    def stop(self, grace=None):
+        self.connection.send(None)
+        self.process.join()
+
+
+def serve_process(**kwargs):
+    '''Same as `serve` (with the default handler), but in a child process, so that
+    the server doesn't share the GIL with the client; returns `(server, address)`.
+    '''
+    context = multiprocessing.get_context('spawn')
+    connection, child_connection = context.Pipe()
+    process = context.Process(target=_serve_forever, args=(child_connection, kwargs), daemon=True)
+    process.start()
+    return ServerProcess(process, connection), connection.recv()
@@ -0,0 +1,197 @@
+import threading
+
+import numpy as np
+import pytest
+
+import stand_in_server
+from tensorflow_serving.apis import predict_pb2
+
+import batching
+from apis import ModelSpec, PredictionService, PredictRequest
+from batching import PredictBatcher, _merge_requests, _split
+from tf_utils import _make_ndarray, _make_tensor_proto
+
+BIAS = np.arange(5, dtype=np.float32)
+
+
+# answers with `y` = the input `x`, and `bias`, not batched
+def echo(data):
+    request = predict_pb2.PredictRequest.FromString(data)
+    response = predict_pb2.PredictResponse()
+    response.model_spec.name = request.model_spec.name
+    response.outputs['y'].CopyFrom(request.inputs['x'])
+    response.outputs['bias'].CopyFrom(_make_tensor_proto(BIAS))
+    return response.SerializeToString()
+
+
+@pytest.fixture(scope='module')
+def server():
+    rpcs = []
+
+    def handler(data):
+        rpcs.append(predict_pb2.PredictRequest.FromString(data))
+        return echo(data)
+
+    server, address = stand_in_server.serve(handler)
+    yield PredictionService(address), rpcs
+    server.stop(None)
+
+
+def request(x):
+    return PredictRequest(model_spec=ModelSpec(name='model'), inputs={'x': {'values': x}})
+
+
+# `x` in the typed field (`float_val`), rather than `tensor_content`
+def typed_request(x):
+    request = predict_pb2.PredictRequest()
+    request.model_spec.name = 'model'
+    tensor = request.inputs['x']
+    tensor.dtype = 1  # DT_FLOAT
+    for size in x.shape:
+        tensor.tensor_shape.dim.add().size = size
+    tensor.float_val.extend(x.ravel().tolist())
+    return request
+
+
+def outputs(future):
+    return future.result(5).parse_outputs()
+
+
+def test_batched_and_split(server):
+    service, rpcs = server
+    xs = [np.full((size, 2), i, np.float32) for i, size in enumerate((1, 3, 2))]
+    del rpcs[:]
+    with PredictBatcher(service, max_batch_size=6, batch_timeout_micros=10 ** 6) as batcher:
+        responses = [batcher.submit(request(x)) for x in xs]
+        results = [outputs(response) for response in responses]
+    # one RPC, sent as soon as `max_batch_size` is reached
+    assert len(rpcs) == 1
+    assert [dim.size for dim in rpcs[0].inputs['x'].tensor_shape.dim] == [6, 2]
+    for x, result in zip(xs, results):
+        np.testing.assert_array_equal(result['y'], x)
+        # not batched, given to every caller as is
+        np.testing.assert_array_equal(result['bias'], BIAS)
+
+
+def test_mixed_typed_fields_and_tensor_content(server):
+    service, rpcs = server
+    xs = [np.random.rand(2, 3).astype(np.float32), np.random.rand(1, 3).astype(np.float32)]
+    del rpcs[:]
+    with PredictBatcher(service, max_batch_size=3, batch_timeout_micros=10 ** 6) as batcher:
+        responses = [batcher.submit(typed_request(xs[0])), batcher.submit(request(xs[1]))]
+        results = [outputs(response) for response in responses]
+    assert len(rpcs) == 1
+    for x, result in zip(xs, results):
+        np.testing.assert_array_equal(result['y'], x)
+
+
+def test_merge_requests():
+    xs = [np.random.rand(1, 3).astype(np.float32), np.random.rand(2, 3).astype(np.float32)]
+    contents = [PredictRequest.unwrap_pb(request(x)) for x in xs]
+    merged = _merge_requests(contents)
+    assert merged.inputs['x'].tensor_content
+    np.testing.assert_array_equal(_make_ndarray(merged.inputs['x']), np.concatenate(xs))
+    merged = _merge_requests([typed_request(xs[0]), contents[1]])
+    np.testing.assert_array_equal(_make_ndarray(merged.inputs['x']), np.concatenate(xs))
+
+
+@pytest.mark.parametrize('values', [
+    np.arange(12, dtype=np.int32).reshape(6, 2),
+    np.array([b'a', b'bb', b'c', b'', b'e', b'f'], dtype=object),
+])
+def test_split(values):
+    parts = _split(_make_tensor_proto(values), [1, 3, 2], 6)
+    for part, expected in zip(parts, np.split(values, [1, 4])):
+        np.testing.assert_array_equal(_make_ndarray(part), expected)
+
+
+def test_split_not_batched():
+    tensor = _make_tensor_proto(BIAS)
+    assert _split(tensor, [2, 1], 3) == [tensor, tensor]
+    scalar = _make_tensor_proto(np.float32(1))
+    assert _split(scalar, [1, 1], 2) == [scalar, scalar]
+
+
+def test_cancelled_calls_are_dropped(server):
+    service, rpcs = server
+    del rpcs[:]
+    with PredictBatcher(service, max_batch_size=8, batch_timeout_micros=10 ** 5) as batcher:
+        cancelled = batcher.submit(request(np.zeros((2, 2), np.float32)))
+        assert cancelled.cancel()
+        kept = batcher.submit(request(np.ones((1, 2), np.float32)))
+        np.testing.assert_array_equal(outputs(kept)['y'], np.ones((1, 2)))
+    assert [dim.size for dim in rpcs[0].inputs['x'].tensor_shape.dim] == [1, 2]
+
+
+def test_from_many_threads(server):
+    service, _ = server
+    results = {}
+    with PredictBatcher(service, max_batch_size=16, batch_timeout_micros=2000) as batcher:
+        def work(i):
+            x = np.full((1, 2), i, np.float32)
+            results[i] = (x, batcher.predict(request(x), 5).parse_outputs()['y'])
+
+        threads = [threading.Thread(target=work, args=(i,)) for i in range(32)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    assert len(results) == 32
+    for x, y in results.values():
+        np.testing.assert_array_equal(y, x)
+
+
+def test_invalid_requests(server):
+    service, _ = server
+    with PredictBatcher(service) as batcher:
+        with pytest.raises(ValueError):
+            batcher.submit(PredictRequest(inputs={'a': {'values': np.zeros((1, 2))},
+                                                  'b': {'values': np.zeros((2, 2))}}))
+    with pytest.raises(RuntimeError):
+        batcher.submit(request(np.zeros((1, 2), np.float32)))
+
+
+def test_dispatcher_failure(server, monkeypatch):
+    service, _ = server
+    error = ValueError('dispatcher bug')
+
+    def fail(request):
+        raise error
+
+    monkeypatch.setattr(batching, '_batch_key', fail)
+    with PredictBatcher(service, batch_timeout_micros=10 ** 6) as batcher:
+        future = batcher.submit(request(np.zeros((1, 2), np.float32)))
+        # the queued calls fail with the dispatcher's exception...
+        with pytest.raises(ValueError):
+            future.result(5)
+        # ...and so do the calls submitted after it died
+        with pytest.raises(RuntimeError) as raised:
+            batcher.submit(request(np.zeros((1, 2), np.float32)))
+        assert raised.value.__cause__ is error
+
+
+# a call is either queued before `_CLOSE`, and sent, or refused: none is left pending
+def test_submit_racing_close(server):
+    service, _ = server
+    for _ in range(20):
+        batcher = PredictBatcher(service, batch_timeout_micros=10 ** 6)
+        futures = []
+        start = threading.Barrier(5)
+
+        def work():
+            start.wait()
+            for _ in range(10):
+                try:
+                    futures.append(batcher.submit(request(np.zeros((1, 2), np.float32))))
+                except RuntimeError:
+                    break
+
+        threads = [threading.Thread(target=work) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        start.wait()
+        batcher.close()
+        for thread in threads:
+            thread.join()
+        for future in futures:
+            np.testing.assert_array_equal(outputs(future)['y'], np.zeros((1, 2)))
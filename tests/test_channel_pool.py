@@ -0,0 +1,108 @@
+import threading
+import time
+
+import grpc
+import numpy as np
+import pytest
+
+import stand_in_server
+
+from apis import ChannelOptions, ChannelPool, ModelSpec, PredictionService, PredictRequest
+from base import compression_algorithm
+
+
+@pytest.fixture
+def server():
+    peers = set()
+    # one call at a time per connection, a single connection is the bottleneck
+    server, address = stand_in_server.serve(delay=0.05, max_workers=32, peers=peers, streams_per_connection=1)
+    yield address, peers
+    server.stop(None)
+
+
+def request():
+    return PredictRequest(model_spec=ModelSpec(name='model'),
+                          inputs={'x': {'values': np.zeros((1, 4), np.float32)}})
+
+
+def elapsed(service, threads=8):
+    workers = [threading.Thread(target=service.predict, args=(request(),)) for _ in range(threads)]
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return time.perf_counter() - start
+
+
+@pytest.mark.parametrize('policy', ChannelPool.POLICIES)
+def test_distinct_connections(server, policy):
+    address, peers = server
+    with ChannelPool(address, 4, policy) as pool:
+        elapsed(PredictionService(pool))
+    assert len(peers) == 4
+
+
+@pytest.mark.parametrize('policy', ChannelPool.POLICIES)
+def test_scales_with_connections(server, policy):
+    address, _ = server
+    with ChannelPool(address, 1, policy) as pool:
+        single = elapsed(PredictionService(pool))
+    with ChannelPool(address, 4, policy) as pool:
+        pooled = elapsed(PredictionService(pool))
+    # 8 calls of 50 ms: ~400 ms over 1 connection, ~100 ms over 4
+    assert pooled < single / 2
+
+
+def test_least_loaded_spreads_calls(server):
+    address, peers = server
+    with ChannelPool(address, 2, 'least_loaded') as pool:
+        elapsed(PredictionService(pool), threads=2)
+    assert len(peers) == 2
+
+
+def test_invalid_policy():
+    with pytest.raises(ValueError):
+        ChannelPool('localhost:1', 2, 'random')
+
+
+def test_pool_options_given_to_service():
+    with ChannelPool('localhost:1', 2) as pool:
+        with pytest.raises(ValueError):
+            PredictionService(pool, ChannelOptions(keepalive_time_ms=1000))
+
+
+def test_channel_args():
+    options = ChannelOptions(max_receive_message_length=-1, keepalive_time_ms=10000, bdp_probe=False,
+                             stream_window_size=1 << 20, compression='gzip',
+                             extra=[('grpc.lb_policy_name', 'pick_first')])
+    assert options.channel_args() == [
+        ('grpc.max_receive_message_length', -1),
+        ('grpc.keepalive_time_ms', 10000),
+        ('grpc.http2.bdp_probe', 0),
+        ('grpc.http2.lookahead_bytes', 1 << 20),
+        ('grpc.lb_policy_name', 'pick_first'),
+    ]
+    # unset fields are left to gRPC's defaults
+    assert ChannelOptions().channel_args() == []
+    assert ChannelOptions(extra=[('grpc.primary_user_agent', 'client')]).channel_args() == [
+        ('grpc.primary_user_agent', 'client')]
+
+
+@pytest.mark.parametrize('compression, algorithm', [
+    (None, None),
+    ('none', grpc.Compression.NoCompression),
+    ('deflate', grpc.Compression.Deflate),
+    ('gzip', grpc.Compression.Gzip),
+    (grpc.Compression.Gzip, grpc.Compression.Gzip),
+    (1, grpc.Compression.Deflate),
+])
+def test_compression_algorithm(compression, algorithm):
+    assert compression_algorithm(compression) is algorithm
+
+
+def test_invalid_compression():
+    with pytest.raises(ValueError):
+        compression_algorithm('brotli')
+    with pytest.raises(ValueError):
+        PredictionService('localhost:1', ChannelOptions(compression='zstd'))
@@ -0,0 +1,79 @@
+import numpy as np
+import pytest
+
+import stand_in_server
+from tensorflow.core.framework import types_pb2
+from tensorflow_serving.apis import get_model_metadata_pb2
+
+from apis import DtypePolicy, GetModelMetadataResponse, PredictRequest
+from tensorflow.python.framework import dtypes
+
+
+@pytest.fixture
+def policy():
+    return DtypePolicy({'ids': types_pb2.DT_INT32, 'mask': types_pb2.DT_UINT8,
+                        'images': types_pb2.DT_FLOAT})
+
+
+def metadata():
+    data = stand_in_server.metadata_response({'ids': types_pb2.DT_INT64, 'images': types_pb2.DT_HALF})
+    return GetModelMetadataResponse.wrap(get_model_metadata_pb2.GetModelMetadataResponse.FromString(data))
+
+
+def test_parse_signature_def_map():
+    signature_def_map = metadata().parse_signature_def_map()
+    assert list(signature_def_map) == ['serving_default']
+    inputs = signature_def_map['serving_default'].inputs
+    assert {key: info.dtype for key, info in inputs.items()} == {
+        'ids': types_pb2.DT_INT64, 'images': types_pb2.DT_HALF}
+    assert not GetModelMetadataResponse().parse_signature_def_map()
+
+
+def test_from_metadata():
+    policy = DtypePolicy.from_metadata(metadata())
+    assert policy.input_dtypes == {'ids': dtypes.int64, 'images': dtypes.float16}
+    with pytest.raises(KeyError):
+        DtypePolicy.from_metadata(metadata(), 'other')
+
+
+def test_apply(policy):
+    assert policy.apply('ids', {'values': np.arange(3)})['dtype'] is dtypes.int32
+    assert policy.apply('images', {'values': np.zeros(2, np.float64)})['dtype'] is dtypes.float32
+    with pytest.raises(KeyError):
+        policy.apply('other', {'values': np.arange(3)})
+    with pytest.raises(TypeError):
+        policy.apply('ids', {'values': np.zeros(3, np.float32)})
+    with pytest.raises(TypeError):
+        policy.apply('ids', {'values': np.arange(3), 'dtype': 'int64'})
+
+
+@pytest.mark.parametrize('key, kwargs', [
+    ('ids', {'values': np.array([1, 2 ** 31], np.int64)}),
+    ('ids', {'values': np.array([-2 ** 31 - 1], np.int64)}),
+    ('ids', {'values': [1, 2 ** 40]}),
+    ('ids', {'examples': [np.array([1]), np.array([2 ** 33])]}),
+    ('mask', {'values': np.array([-1, 1])}),
+    ('mask', {'values': np.array([256])}),
+])
+def test_apply_out_of_range(policy, key, kwargs):
+    with pytest.raises(ValueError):
+        policy.apply(key, kwargs)
+
+
+@pytest.mark.parametrize('key, kwargs', [
+    ('ids', {'values': np.array([-2 ** 31, 2 ** 31 - 1], np.int64)}),
+    ('ids', {'values': np.array([], np.int64)}),
+    ('ids', {'values': np.array([2 ** 14], np.int16)}),
+    ('mask', {'values': np.array([0, 255])}),
+    ('mask', {'examples': [np.array([1]), np.array([2])]}),
+])
+def test_apply_in_range(policy, key, kwargs):
+    policy.apply(key, kwargs)
+
+
+def test_request(policy):
+    ids = np.array([1, 2, 3], np.int64)
+    request = PredictRequest(inputs={'ids': {'values': ids}}, dtype_policy=policy)
+    assert request.inputs['ids'].dtype == types_pb2.DT_INT32
+    with pytest.raises(ValueError):
+        PredictRequest(inputs={'ids': {'values': ids * 2 ** 32}}, dtype_policy=policy)
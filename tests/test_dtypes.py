@@ -0,0 +1,36 @@
+import numpy as np
+import pytest
+
+from tensorflow.core.framework import types_pb2
+from tensorflow.python.framework import dtypes
+
+
+@pytest.mark.parametrize('value', [np.float32, np.dtype('float32'), 'float32', types_pb2.DT_FLOAT,
+                                   dtypes.float32])
+def test_as_dtype(value):
+    assert dtypes.as_dtype(value) is dtypes.float32
+    # from the cache
+    assert dtypes.as_dtype(value) is dtypes.float32
+
+
+def test_as_dtype_invalid():
+    for value in ('no_such_type', 1000, [1]):
+        with pytest.raises(TypeError):
+            dtypes.as_dtype(value)
+
+
+# a `DType` that can't be hashed (e.g. a mutable subclass), converted as is
+class Unhashable(dtypes.DType):
+    __hash__ = None
+
+
+def test_as_dtype_unhashable():
+    value = Unhashable(types_pb2.DT_INT32)
+    assert dtypes.as_dtype(value) is value
+    assert dtypes.as_dtype(value) is value
+
+
+def test_cache_is_bounded():
+    for size in range(1, 2 * dtypes._DTYPE_CACHE_SIZE):
+        assert dtypes.as_dtype(np.dtype('S{}'.format(size))) is dtypes.string
+    assert len(dtypes._DTYPE_CACHE) <= dtypes._DTYPE_CACHE_SIZE
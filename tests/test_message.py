@@ -0,0 +1,158 @@
+import inspect
+
+import pytest
+
+import apis
+import config
+import util
+from base import Message
+from fields import Field, make_wrapper
+from tensorflow.core.framework import tensor_shape_pb2
+from tensorflow_serving.apis import predict_pb2
+
+
+def wrappers():
+    for module in (apis, config, util):
+        for name, cls in sorted(vars(module).items()):
+            if inspect.isclass(cls) and issubclass(cls, Message) and cls.__module__ == module.__name__:
+                yield cls
+
+
+@pytest.mark.parametrize('cls', list(wrappers()) + [make_wrapper(tensor_shape_pb2.TensorShapeProto)],
+                         ids=lambda cls: cls.__name__)
+def test_wrappers_declare_slots(cls):
+    # see the NOTE on `Message`
+    assert '__slots__' in cls.__dict__
+    assert not hasattr(cls(), '__dict__')
+    with pytest.raises(AttributeError):
+        cls().no_such_field = 1
+
+
+def test_nested_view():
+    request = apis.PredictRequest(model_spec=apis.ModelSpec(name='a'))
+    model_spec = request.model_spec
+    # the same wrapper, over the live sub-message
+    assert request.model_spec is model_spec
+    assert model_spec._protobuf is request._protobuf.model_spec
+    model_spec.name = 'b'
+    model_spec.version = 2
+    assert request._protobuf.model_spec.name == 'b'
+    assert request._protobuf.model_spec.version.value == 2
+    # re-created by protobuf, e.g. on `ClearField`
+    request._protobuf.ClearField('model_spec')
+    assert request.model_spec is not model_spec and request.model_spec.name == ''
+
+
+def server_config():
+    return config.ModelServerConfig(model_config_list=config.ModelConfigList(config=[
+        config.ModelConfig(name='model_{}'.format(i)) for i in range(3)]))
+
+
+def test_nested_view_deep():
+    server = server_config()
+    request = apis.ReloadConfigRequest(config=server)
+    request.config.model_config_list.config[1].name = 'renamed'
+    assert request._protobuf.config.model_config_list.config[1].name == 'renamed'
+    # the constructor copies its arguments
+    assert server.model_config_list.config[1].name == 'model_1'
+
+
+def test_copy_nested_defers_the_sync():
+    request = apis.PredictRequest(model_spec=apis.ModelSpec(name='a'), copy_nested=True)
+    model_spec = request.model_spec
+    assert model_spec._protobuf is not request._protobuf.model_spec
+    model_spec.name = 'b'
+    # marked dirty, not synced yet
+    assert request._dirty_children == [model_spec]
+    assert request._protobuf.model_spec.name == 'a'
+    # holding the pending write
+    assert request.model_spec.name == 'b'
+    request.flush()
+    assert request._protobuf.model_spec.name == 'b'
+    assert request._dirty_children is None and not model_spec._dirty
+
+
+@pytest.mark.parametrize('read', [
+    lambda request: apis.PredictRequest.unwrap_pb(request).model_spec.name,
+    lambda request: repr(request) and request._protobuf.model_spec.name,
+    lambda request: str(request) and request._protobuf.model_spec.name,
+    lambda request: request.byte_size and request._protobuf.model_spec.name,
+    lambda request: apis.PredictRequest().copy(request)._protobuf.model_spec.name,
+])
+def test_reads_of_the_whole_message_flush(read):
+    request = apis.PredictRequest(model_spec=apis.ModelSpec(name='a'), copy_nested=True)
+    request.model_spec.name = 'b'
+    assert read(request) == 'b'
+
+
+def test_copy_nested_deep_writes():
+    request = apis.ReloadConfigRequest(config=server_config(), copy_nested=True)
+    model_config = request.config.model_config_list.config[0]
+    for i in range(3):
+        model_config.name = 'renamed_{}'.format(i)
+    assert request._protobuf.config.model_config_list.config[0].name == 'model_0'
+    assert request.flush()._protobuf.config.model_config_list.config[0].name == 'renamed_2'
+
+
+def test_nested_setter_lands_pending_writes_first():
+    request = apis.PredictRequest(model_spec=apis.ModelSpec(name='a'), copy_nested=True)
+    request.model_spec.signature_name = 'pending'
+    request.model_spec = apis.ModelSpec(name='b')
+    assert request.flush()._protobuf.model_spec.name == 'b'
+    assert request._protobuf.model_spec.signature_name == ''
+
+
+def test_wrap_aliases():
+    pb = predict_pb2.PredictResponse()
+    pb.model_spec.name = 'a'
+    response = apis.PredictResponse.wrap(pb)
+    assert apis.PredictResponse.unwrap_pb(response) is pb
+    pb.model_spec.name = 'b'
+    assert response.model_spec.name == 'b'
+
+
+def test_adopt_aliases():
+    response = apis.PredictResponse()
+    stale = response.model_spec
+    pb = predict_pb2.PredictResponse()
+    pb.model_spec.name = 'a'
+    assert response.adopt(pb) is response
+    assert response._protobuf is pb
+    # the cached nested wrappers are of the former `pb`
+    assert response.model_spec is not stale and response.model_spec.name == 'a'
+
+
+def test_adopt_checks_the_type():
+    with pytest.raises(TypeError):
+        apis.PredictResponse().adopt(predict_pb2.PredictRequest())
+
+
+def test_adopt_on_nested_copies():
+    request = apis.PredictRequest(model_spec=apis.ModelSpec(name='a'))
+    pb = apis.ModelSpec.unwrap_pb(apis.ModelSpec(name='b'))
+    request.model_spec.adopt(pb)
+    # the parent's sub-message can't be swapped, it's copied into
+    assert request._protobuf.model_spec is not pb
+    assert request._protobuf.model_spec.name == 'b'
+
+
+def test_copy_and_merge():
+    pb = predict_pb2.PredictResponse()
+    pb.model_spec.name = 'a'
+    response = apis.PredictResponse().copy(pb)
+    assert response._protobuf is not pb and response.model_spec.name == 'a'
+    request = apis.PredictRequest(model_spec=apis.ModelSpec(name='a'))
+    request.merge(apis.PredictRequest(model_spec=apis.ModelSpec(signature_name='s')))
+    assert (request.model_spec.name, request.model_spec.signature_name) == ('a', 's')
+
+
+# a plain `Field` reads the field, and is read-only
+def test_plain_field():
+    class Spec(Message):
+        __slots__ = ()
+        name = Field()
+
+    spec = Spec._wrap(apis.model_pb2.ModelSpec(name='a'))
+    assert spec.name == 'a'
+    with pytest.raises(AttributeError):
+        spec.name = 'b'
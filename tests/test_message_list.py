@@ -0,0 +1,62 @@
+import pytest
+
+from config import ModelConfig, ModelConfigList
+
+
+@pytest.fixture
+def configs():
+    return ModelConfigList(config=[ModelConfig(name=str(i)) for i in range(10)]).config
+
+
+def names(message_list):
+    return [config.name for config in message_list]
+
+
+def test_iteration_is_pooled(configs):
+    first = list(configs)
+    assert all(a is b for a, b in zip(first, configs))
+    assert configs[-1] is first[-1]
+    assert names(configs[2:8:3]) == ['2', '5']
+
+
+@pytest.mark.parametrize('remove, kept, expected', [
+    (lambda configs: configs.__delitem__(3), 3, ['0', '1', '2', '4', '5', '6', '7', '8', '9']),
+    (lambda configs: configs.__delitem__(slice(None, None, 3)), 0, ['1', '2', '4', '5', '7', '8']),
+    (lambda configs: configs.pop(), 9, [str(i) for i in range(9)]),
+    (lambda configs: configs.pop(-10), 0, [str(i) for i in range(1, 10)]),
+    (lambda configs: configs.remove(configs[5]), 0, ['0', '1', '2', '3', '4', '6', '7', '8', '9']),
+    (lambda configs: configs.clear(), 0, []),
+])
+def test_removal_drops_pooled_wrappers(configs, remove, kept, expected):
+    list(configs)
+    remove(configs)
+    # the wrappers of the removed (or moved) items aren't kept alive
+    assert len(configs._pool) == kept
+    assert names(configs) == expected
+
+
+@pytest.mark.parametrize('index, kept, position', [(0, 0, 0), (-3, 7, 7), (-100, 0, 0), (100, 10, 10)])
+def test_insert(configs, index, kept, position):
+    list(configs)
+    configs.insert(index, ModelConfig(name='new'))
+    assert len(configs._pool) == kept
+    assert names(configs).index('new') == position
+    assert len(configs) == 11
+
+
+def test_pop_returns_the_item(configs):
+    assert configs.pop(0).name == '0'
+    assert configs.pop().name == '9'
+
+
+def test_extend(configs):
+    other = ModelConfigList(config=[ModelConfig(name='a'), ModelConfig(name='b')]).config
+    configs.clear()
+    configs.extend(ModelConfig(name='single'))
+    configs.extend(other)
+    configs.extend(ModelConfig(name=name) for name in 'cd')
+    assert names(configs) == ['single', 'a', 'b', 'c', 'd']
+    # copies, the source isn't wrapped item by item
+    assert not other._pool
+    configs[1].name = 'changed'
+    assert names(other) == ['a', 'b']
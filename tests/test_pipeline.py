@@ -0,0 +1,191 @@
+import asyncio
+import time
+
+import grpc
+import numpy as np
+import pytest
+
+import stand_in_server
+from tensorflow_serving.apis import predict_pb2
+
+from apis import AsyncPredictionService, ModelSpec, PredictionService, PredictRequest
+from base import Message
+from tf_utils import _make_ndarray, _make_tensor_proto
+
+
+# answers with `y` = the input `x`, after `x` * 10 ms; fails on `x` == -1
+def echo(data):
+    request = predict_pb2.PredictRequest.FromString(data)
+    x = _make_ndarray(request.inputs['x'])
+    if x.item() == -1:
+        raise ValueError('failed')
+    time.sleep(x.item() * 0.01)
+    response = predict_pb2.PredictResponse()
+    response.outputs['y'].CopyFrom(_make_tensor_proto(x))
+    return response.SerializeToString()
+
+
+@pytest.fixture(scope='module')
+def address():
+    server, address = stand_in_server.serve(echo, max_workers=32)
+    yield address
+    server.stop(None)
+
+
+def request(x):
+    return PredictRequest(model_spec=ModelSpec(name='model'),
+                          inputs={'x': {'values': np.array([x], np.int32)}})
+
+
+def y(response):
+    return response.parse_outputs()['y'].item()
+
+
+def test_ordered(address):
+    xs = [5, 0, 3, 1, 4, 2] * 3
+    pipeline = PredictionService(address).predict_pipelined(map(request, xs), max_in_flight=4)
+    assert [y(response) for response in pipeline] == xs
+    assert pipeline.completed == len(xs) and pipeline.in_flight == 0
+    assert 1 <= pipeline.mean_in_flight <= 4
+    assert pipeline.qps > 0
+
+
+def test_unordered(address):
+    pipeline = PredictionService(address).predict_pipelined([request(x) for x in (8, 0, 4)],
+                                                             ordered=False)
+    # as they complete, each with its index
+    assert [(index, y(response)) for index, response in pipeline] == [(1, 0), (2, 4), (0, 8)]
+
+
+def test_bytes(address):
+    requests = [Message.unwrap_pb(request(x)).SerializeToString() for x in (1, 2)]
+    responses = list(PredictionService(address).predict_pipelined(requests))
+    # parsed on first use
+    assert not any(response.is_parsed for response in responses)
+    assert [y(response) for response in responses] == [1, 2]
+
+
+def test_bounded(address):
+    sent = []
+
+    def requests():
+        for x in range(10):
+            sent.append(x)
+            yield request(0)
+
+    pipeline = PredictionService(address).predict_pipelined(requests(), max_in_flight=3)
+    for _ in pipeline:
+        # never read ahead of the responses by more than `max_in_flight`
+        assert len(sent) - pipeline.completed <= 3
+    assert pipeline.completed == 10
+
+
+@pytest.mark.parametrize('ordered', [True, False])
+def test_exception(address, ordered):
+    pipeline = PredictionService(address).predict_pipelined(map(request, [0, -1, 30, 30]),
+                                                            max_in_flight=4, ordered=ordered)
+    responses = []
+    start = time.perf_counter()
+    with pytest.raises(grpc.RpcError):
+        for response in pipeline:
+            responses.append(response)
+    # the calls still in flight are cancelled, not waited for
+    assert time.perf_counter() - start < 0.25
+    # unordered, the failed call may complete first
+    assert len(responses) == 1 if ordered else len(responses) <= 1
+    assert pipeline.in_flight == 0
+
+
+def test_stopped_early(address):
+    pipeline = PredictionService(address).predict_pipelined(map(request, [0, 30, 30]))
+    iterator = iter(pipeline)
+    assert y(next(iterator)) == 0
+    iterator.close()
+    assert pipeline.in_flight == 0
+
+
+def test_invalid_depth(address):
+    with pytest.raises(ValueError):
+        PredictionService(address).predict_pipelined([], max_in_flight=0)
+
+
+def run_async(address, consume):
+    async def main():
+        async with AsyncPredictionService(address) as service:
+            return await consume(service)
+    return asyncio.run(main())
+
+
+def test_async_ordered(address):
+    xs = [5, 0, 3, 1, 4, 2] * 3
+
+    async def consume(service):
+        pipeline = service.predict_pipelined(map(request, xs), max_in_flight=4)
+        responses = [y(response) async for response in pipeline]
+        return responses, pipeline
+
+    responses, pipeline = run_async(address, consume)
+    assert responses == xs
+    assert pipeline.completed == len(xs)
+    assert 1 <= pipeline.mean_in_flight <= 4
+    assert pipeline.in_flight == 0
+
+
+def test_async_unordered(address):
+    xs = [8, 0, 4]
+
+    async def consume(service):
+        pipeline = service.predict_pipelined([request(x) for x in xs], ordered=False)
+        return [(index, y(response)) async for index, response in pipeline]
+
+    # as they complete, each with its index
+    assert run_async(address, consume) == [(1, 0), (2, 4), (0, 8)]
+
+
+def test_async_bytes(address):
+    async def consume(service):
+        pipeline = service.predict_pipelined([Message.unwrap_pb(request(x)).SerializeToString()
+                                                for x in (1, 2)])
+        return [y(response) async for response in pipeline]
+
+    assert run_async(address, consume) == [1, 2]
+
+
+def test_async_bounded(address):
+    sent = []
+
+    def requests():
+        for x in range(10):
+            sent.append(x)
+            yield request(0)
+
+    async def consume(service):
+        pipeline = service.predict_pipelined(requests(), max_in_flight=3)
+        async for _ in pipeline:
+            # never read ahead of the responses by more than `max_in_flight`
+            assert len(sent) - pipeline.completed <= 3
+        return pipeline
+
+    assert run_async(address, consume).completed == 10
+
+
+def test_async_exception(address):
+    async def consume(service):
+        pipeline = service.predict_pipelined(map(request, [0, -1, 5, 5]), max_in_flight=4)
+        responses = []
+        with pytest.raises(grpc.RpcError):
+            async for response in pipeline:
+                responses.append(y(response))
+        return responses, pipeline
+
+    responses, pipeline = run_async(address, consume)
+    assert responses == [0]
+    assert pipeline.in_flight == 0
+
+
+def test_async_not_iterable(address):
+    async def consume(service):
+        with pytest.raises(TypeError):
+            iter(service.predict_pipelined([]))
+
+    run_async(address, consume)
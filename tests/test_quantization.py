@@ -0,0 +1,85 @@
+import numpy as np
+import pytest
+
+from tensorflow.core.framework import types_pb2
+from tensorflow.python.framework import dtypes, tensor_util
+
+from quantization import QuantizationParams, dequantize, make_quantized_tensor_proto, quantize
+
+QUANTIZED_TYPES = [
+    ('qint8', types_pb2.DT_QINT8),
+    ('quint8', types_pb2.DT_QUINT8),
+    ('qint16', types_pb2.DT_QINT16),
+    ('quint16', types_pb2.DT_QUINT16),
+    ('qint32', types_pb2.DT_QINT32),
+]
+
+
+def assert_round_trip(values, dtype, axis=None):
+    quantized, params = quantize(values, dtype, axis)
+    scale, _ = params.broadcast(values.shape)
+    error = np.abs(dequantize(quantized, params) - values)
+    # half a step, and the float32 rounding of the dequantized values
+    assert (error <= np.asarray(scale) / 2 + 1e-6 * (1 + np.abs(values))).all()
+    return params
+
+
+@pytest.mark.parametrize('dtype', [name for name, _ in QUANTIZED_TYPES])
+def test_round_trip_per_tensor(dtype):
+    values = np.random.RandomState(0).uniform(-3, 5, (8, 16)).astype(np.float32)
+    params = assert_round_trip(values, dtype)
+    assert params.axis is None
+
+
+@pytest.mark.parametrize('shape, axis', [((4, 5, 3), -1), ((2, 3, 4, 5), 1), ((2, 3, 64, 64), 1)])
+def test_round_trip_per_channel(shape, axis):
+    values = np.random.RandomState(1).uniform(-1, 1, shape).astype(np.float32)
+    # channels of very different ranges
+    values *= np.reshape(10.0 ** np.arange(shape[axis]), [-1 if i == axis % len(shape) else 1
+                                                          for i in range(len(shape))])
+    params = assert_round_trip(values, 'quint8', axis)
+    assert params.scale.shape == params.zero_point.shape == (shape[axis],)
+
+
+def test_all_zeros():
+    values = np.zeros((3, 4), np.float32)
+    quantized, params = quantize(values, 'quint8')
+    assert params == QuantizationParams(1.0, 0, None)
+    np.testing.assert_array_equal(dequantize(quantized, params), values)
+    # a blank channel among others
+    values[:, 1] = [1, 2, 3]
+    quantized, params = quantize(values, 'qint8', axis=1)
+    assert params.scale[0] == 1.0
+    np.testing.assert_allclose(dequantize(quantized, params), values, atol=params.scale.max() / 2)
+
+
+@pytest.mark.parametrize('dtype', ['qint8', 'quint8'])
+def test_negative_only(dtype):
+    values = -np.linspace(0.5, 4, 12, dtype=np.float32).reshape(3, 4)
+    params = assert_round_trip(values, dtype)
+    # the range is extended to 0, which maps to the top of the type
+    assert params.zero_point == np.iinfo(np.dtype(dtypes.as_dtype(dtype).as_numpy_dtype)[0]).max
+
+
+@pytest.mark.parametrize('dtype', ['qint8', 'quint8', 'qint16'])
+def test_clipped_to_type_range(dtype):
+    info = np.iinfo(np.dtype(dtypes.as_dtype(dtype).as_numpy_dtype)[0])
+    params = QuantizationParams(0.1, 0, None)
+    quantized, _ = quantize(np.array([-1e6, 0, 1e6], np.float32), dtype, params=params)
+    storage = quantized.view(quantized.dtype[0])
+    assert storage.tolist() == [info.min, 0, info.max]
+
+
+def test_not_quantized_type():
+    with pytest.raises(TypeError):
+        quantize(np.zeros(3, np.float32), np.int8)
+
+
+@pytest.mark.parametrize('dtype, enum', QUANTIZED_TYPES)
+def test_make_quantized_tensor_proto(dtype, enum):
+    values = np.random.RandomState(2).uniform(-1, 1, (2, 3)).astype(np.float32)
+    tensor, params = make_quantized_tensor_proto(values, dtype)
+    assert tensor.dtype == enum
+    assert [dim.size for dim in tensor.tensor_shape.dim] == [2, 3]
+    quantized, _ = quantize(values, dtype, params=params)
+    np.testing.assert_array_equal(tensor_util.MakeNdarray(tensor), quantized)
@@ -0,0 +1,92 @@
+import numpy as np
+import pytest
+
+from tensorflow_serving.apis import predict_pb2
+from tensorflow.python.framework import tensor_util
+
+from apis import ModelSpec, PredictRequest, PredictRequestTemplate
+
+MODEL_SPEC = ModelSpec(name='model', version=3, signature_name='serving_default')
+
+
+def template(output_filter=('scores', 'classes'), **inputs):
+    inputs = inputs or {'images': np.zeros((2, 4, 3), np.float32)}
+    return PredictRequestTemplate(PredictRequest(
+        model_spec=MODEL_SPEC, output_filter=list(output_filter),
+        inputs={key: {'values': value} for key, value in inputs.items()}))
+
+
+# the request `render` should be the bytes of
+def expected(inputs, output_filter=('scores', 'classes')):
+    request = predict_pb2.PredictRequest()
+    request.model_spec.CopyFrom(PredictRequest.unwrap_pb(MODEL_SPEC))
+    for key, value in inputs.items():
+        request.inputs[key].CopyFrom(tensor_util.MakeTensorProto(value))
+    request.output_filter.extend(output_filter)
+    return request
+
+
+def parsed(data):
+    return predict_pb2.PredictRequest.FromString(data)
+
+
+@pytest.mark.parametrize('output_filter', [(), ('scores',), ('scores', 'classes')])
+def test_same_bytes(output_filter):
+    batch = np.random.rand(2, 4, 3).astype(np.float32)
+    data = template(output_filter).render(images=batch)
+    assert data == expected({'images': batch}, output_filter).SerializeToString()
+    assert parsed(data).model_spec.version.value == 3
+    assert list(parsed(data).output_filter) == list(output_filter)
+
+
+def test_reshaped():
+    t = template()
+    for batch_size in (1, 5, 2):
+        batch = np.random.rand(batch_size, 4, 3).astype(np.float32)
+        assert t.render(images=batch) == expected({'images': batch}).SerializeToString()
+
+
+def test_examples():
+    examples = [np.random.rand(4, 3).astype(np.float32) for _ in range(3)]
+    data = template().render(images=examples)
+    assert data == expected({'images': np.stack(examples)}).SerializeToString()
+    # raw buffers, as the template's example shape
+    data = template().render(images=[example.tobytes() for example in examples[:2]])
+    assert data == expected({'images': np.stack(examples[:2])}).SerializeToString()
+
+
+def test_buffer():
+    batch = np.random.rand(2, 4, 3).astype(np.float32)
+    data = template().render(images=memoryview(batch.tobytes()))
+    assert data == expected({'images': batch}).SerializeToString()
+
+
+def test_several_inputs():
+    inputs = {'images': np.random.rand(2, 4).astype(np.float32), 'ids': np.arange(2, dtype=np.int32),
+              'mask': np.ones((2, 4), np.uint8)}
+    t = template(**inputs)
+    assert sorted(t.input_keys) == sorted(inputs)
+    inputs = {key: np.concatenate([value, value]) for key, value in inputs.items()}
+    assert parsed(t.render(inputs)) == expected(inputs)
+
+
+@pytest.mark.parametrize('dtype', [np.float16, 'bfloat16'])
+def test_half_precision(dtype):
+    batch = np.random.rand(2, 3).astype(np.float32)
+    request = PredictRequest(model_spec=MODEL_SPEC, inputs={'x': {'values': batch, 'dtype': dtype}})
+    t = PredictRequestTemplate(request)
+    assert parsed(t.render(x=batch)) == PredictRequest.unwrap_pb(request)
+
+
+def test_invalid_inputs():
+    t = template()
+    with pytest.raises(ValueError):
+        t.render(other=np.zeros((2, 4, 3), np.float32))
+    with pytest.raises(TypeError):
+        t.render(images=np.zeros((2, 4, 3), np.float64))
+    with pytest.raises(ValueError):
+        t.render(images=b'\0' * 7)
+    with pytest.raises(ValueError):
+        t.render(images=[np.zeros((4, 3), np.float32), np.zeros((3, 4), np.float32)])
+    with pytest.raises(ValueError):
+        t.render(images=[])
@@ -0,0 +1,92 @@
+from collections import namedtuple
+
+import numpy as np
+import pytest
+
+from tensorflow.core.framework import types_pb2
+
+from apis import PredictRequest
+from tf_utils import _make_ndarray, _sparse_components
+
+# as TensorFlow's `SparseTensorValue`
+SparseTensorValue = namedtuple('SparseTensorValue', ['indices', 'values', 'dense_shape'])
+
+INDICES = [[1, 2], [0, 3], [1, 0], [0, 1]]
+VALUES = [1.5, 2.5, 3.5, 4.5]
+
+
+def test_components_reordered():
+    indices, values, dense_shape = _sparse_components((INDICES, np.array(VALUES), [2, 4]))
+    assert indices.dtype == np.int64 and dense_shape.dtype == np.int64
+    # row-major, the values following their indices
+    assert indices.tolist() == [[0, 1], [0, 3], [1, 0], [1, 2]]
+    assert values.tolist() == [4.5, 2.5, 3.5, 1.5]
+    assert dense_shape.tolist() == [2, 4]
+
+
+def test_components_list_values():
+    _, values, _ = _sparse_components((INDICES, [1, 2, 3, 4], [2, 4]))
+    # still a list, so its dtype is inferred as for dense inputs
+    assert values == [4, 2, 3, 1]
+
+
+def test_components_not_reordered():
+    indices, values, _ = _sparse_components((INDICES, VALUES, [2, 4]), reorder=False)
+    assert indices.tolist() == INDICES and values == VALUES
+
+
+def test_components_ordered_as_is():
+    indices = np.array([[0, 0, 1], [0, 1, 0], [2, 0, 0]])
+    values = np.arange(3.0)
+    result = _sparse_components(SparseTensorValue(indices, values, (3, 2, 2)))
+    assert result[1] is values
+
+
+def test_components_duplicates_are_unordered():
+    indices, values, _ = _sparse_components(([[1, 0], [0, 0], [0, 0]], [1, 2, 3], [2, 1]))
+    assert indices.tolist() == [[0, 0], [0, 0], [1, 0]]
+    assert values == [2, 3, 1]
+
+
+def test_components_empty():
+    indices, values, dense_shape = _sparse_components(([], [], [3, 4]))
+    assert indices.shape == (0, 2) and dense_shape.tolist() == [3, 4]
+
+
+@pytest.mark.parametrize('sparse', [
+    ([[0, 1]], [1.0], [2, 2, 2]),                  # rank mismatch
+    ([[0, 1], [1, 1]], [1.0], [2, 2]),             # values mismatch
+    ([0, 1], [1.0, 2.0], [2]),                     # 1-D indices
+])
+def test_components_invalid(sparse):
+    with pytest.raises(ValueError):
+        _sparse_components(sparse)
+
+
+def test_scipy():
+    sparse = pytest.importorskip('scipy.sparse')
+    matrix = sparse.csr_matrix(([4.0, 5.0, 6.0], ([1, 0, 1], [2, 1, 0])), shape=(2, 3))
+    indices, values, dense_shape = _sparse_components(matrix)
+    assert indices.tolist() == [[0, 1], [1, 0], [1, 2]]
+    assert values.tolist() == [5.0, 6.0, 4.0]
+    assert dense_shape.tolist() == [2, 3]
+
+
+def test_predict_request():
+    request = PredictRequest(inputs={'ids': {'sparse': (INDICES, VALUES, [2, 4]), 'dtype': 'float64'}})
+    inputs = request.inputs
+    assert sorted(inputs) == ['ids_dense_shape', 'ids_indices', 'ids_values']
+    assert inputs['ids_indices'].dtype == types_pb2.DT_INT64
+    assert inputs['ids_dense_shape'].dtype == types_pb2.DT_INT64
+    assert inputs['ids_values'].dtype == types_pb2.DT_DOUBLE
+    assert _make_ndarray(inputs['ids_indices']).tolist() == [[0, 1], [0, 3], [1, 0], [1, 2]]
+    assert _make_ndarray(inputs['ids_values']).tolist() == [4.5, 2.5, 3.5, 1.5]
+    assert _make_ndarray(inputs['ids_dense_shape']).tolist() == [2, 4]
+
+
+def test_predict_request_keys():
+    request = PredictRequest(inputs={'x': {'sparse': SparseTensorValue(INDICES, [1, 2, 3, 4], [2, 4]),
+                                           'keys': ('{}/i', '{}/v', '{}/s')}})
+    assert sorted(request.inputs) == ['x/i', 'x/s', 'x/v']
+    # inferred as for a dense input
+    assert request.inputs['x/v'].dtype == types_pb2.DT_INT32
@@ -0,0 +1,314 @@
+import numpy as np
+import pytest
+
+from tensorflow.core.framework import tensor_pb2, types_pb2
+from tensorflow.python.framework import dtypes, tensor_util
+
+import tf_utils
+from apis import PredictRequest
+from base import Message
+
+
+@pytest.fixture
+def tensor():
+    return tensor_util.MakeTensorProto(np.arange(12, dtype=np.float32).reshape(3, 4))
+
+
+def test_copy(tensor):
+    values = tensor_util.MakeNdarray(tensor)
+    values[0, 0] = -1
+    np.testing.assert_array_equal(tensor_util.MakeNdarray(tensor), np.arange(12).reshape(3, 4))
+
+
+def test_view(tensor):
+    values = tensor_util.MakeNdarray(tensor, copy=False)
+    assert not values.flags.writeable
+    # still valid once the tensor changes
+    tensor.tensor_content = b''
+    np.testing.assert_array_equal(values, np.arange(12).reshape(3, 4))
+
+
+@pytest.mark.parametrize('dtype', [np.float32, np.float64])
+def test_out(tensor, dtype):
+    out = np.zeros((3, 4), dtype)
+    assert tensor_util.MakeNdarray(tensor, out=out) is out
+    np.testing.assert_array_equal(out, np.arange(12).reshape(3, 4))
+
+
+def test_out_typed_fields():
+    tensor = tensor_pb2.TensorProto(dtype=dtypes.int32.as_datatype_enum, int_val=[7])
+    tensor.tensor_shape.dim.add().size = 3
+    out = np.zeros(3, np.int64)
+    tensor_util.MakeNdarray(tensor, out=out)
+    np.testing.assert_array_equal(out, [7, 7, 7])
+
+
+def test_out_of_another_shape(tensor):
+    with pytest.raises(ValueError):
+        tensor_util.MakeNdarray(tensor, out=np.zeros((4, 3), np.float32))
+
+
+def test_out_unsafe_cast(tensor):
+    with pytest.raises(TypeError):
+        tensor_util.MakeNdarray(tensor, out=np.zeros((3, 4), np.int32))
+
+
+@pytest.mark.parametrize('use_half_val', [False, True])
+def test_float16_round_trip(use_half_val):
+    values = np.array([[0, 1.5, -2.25], [65504, 6e-8, np.inf]], np.float16)
+    tensor = tensor_util.MakeTensorProto(values, use_half_val=use_half_val)
+    assert tensor.dtype == types_pb2.DT_HALF
+    assert bool(tensor.half_val) == use_half_val and bool(tensor.tensor_content) != use_half_val
+    decoded = tensor_util.MakeNdarray(tensor)
+    assert decoded.dtype == np.float16
+    np.testing.assert_array_equal(decoded, values)
+
+
+def test_float16_rounds_floats():
+    values = np.random.rand(3, 4).astype(np.float32)
+    tensor = tensor_util.MakeTensorProto(values, dtype='float16')
+    np.testing.assert_array_equal(tensor_util.MakeNdarray(tensor), values.astype(np.float16))
+
+
+@pytest.mark.parametrize('use_half_val', [False, True])
+def test_bfloat16_round_trip(use_half_val):
+    # exactly representable in bfloat16 (8 bits of mantissa)
+    values = np.array([[0, 1.5, -2.25], [3.0 * 2 ** 100, 2 ** -130, -np.inf]], np.float32)
+    tensor = tensor_util.MakeTensorProto(values, dtype='bfloat16', use_half_val=use_half_val)
+    assert tensor.dtype == types_pb2.DT_BFLOAT16
+    assert bool(tensor.half_val) == use_half_val
+    # widened to float32, as numpy has no bfloat16
+    decoded = tensor_util.MakeNdarray(tensor)
+    assert decoded.dtype == np.float32
+    np.testing.assert_array_equal(decoded, values)
+
+
+def test_bfloat16_rounding():
+    ulp = 2.0 ** -7
+    values = np.array([1 + ulp / 2, 1 + 3 * ulp / 2, 1 + ulp / 2 + 2 ** -20, np.nan, -np.nan], np.float32)
+    decoded = tensor_util.MakeNdarray(tensor_util.MakeTensorProto(values, dtype='bfloat16'))
+    # to nearest, ties to even, and NaNs stay NaNs
+    np.testing.assert_array_equal(decoded[:3], [1, 1 + 2 * ulp, 1 + ulp])
+    assert np.isnan(decoded[3:]).all()
+
+
+@pytest.mark.parametrize('values', [
+    [b'a', b'', b'bc'],
+    ['unicode é', 'b'],
+    np.array([b'a\x00', b'\x00b', b''], dtype=object),
+    np.array([[b'a', b'b'], [b'c', b'd']]),
+    np.array(['x', 'yz']),
+])
+def test_string_round_trip(values):
+    tensor = tensor_util.MakeTensorProto(values)
+    assert tensor.dtype == types_pb2.DT_STRING
+    decoded = tensor_util.MakeNdarray(tensor)
+    expected = np.array([value.encode('utf-8') if isinstance(value, str) else value
+                         for value in np.asarray(values, dtype=object).ravel()], dtype=object)
+    assert decoded.dtype == object
+    assert decoded.shape == np.shape(values)
+    assert decoded.ravel().tolist() == expected.tolist()
+
+
+def test_string_padding():
+    tensor = tensor_util.MakeTensorProto([b'a', b'b'], shape=[2, 2])
+    assert tensor_util.MakeNdarray(tensor).tolist() == [[b'a', b'b'], [b'b', b'b']]
+    empty = tensor_pb2.TensorProto(dtype=types_pb2.DT_STRING)
+    empty.tensor_shape.dim.add().size = 2
+    assert tensor_util.MakeNdarray(empty).tolist() == [b'', b'']
+
+
+@pytest.mark.parametrize('dtype', [np.float32, np.float64, np.int8, np.int16, np.int32, np.int64,
+                                   np.uint8, np.uint16, np.uint32, np.uint64, np.complex64,
+                                   np.complex128, np.bool_])
+def test_typed_fields_round_trip(dtype):
+    values = (np.arange(6) % 2 if dtype is np.bool_ else np.arange(6) * 3).astype(dtype)
+    if np.dtype(dtype).kind == 'c':
+        values = values + 1j * values[::-1]
+    # padded, so stored in the typed field
+    tensor = tensor_util.MakeTensorProto(values, dtype=dtype, shape=[8])
+    assert not tensor.tensor_content
+    decoded = tensor_util.MakeNdarray(tensor)
+    assert decoded.dtype == dtype
+    np.testing.assert_array_equal(decoded, np.concatenate([values, values[-1:], values[-1:]]))
+
+
+# TensorFlow's `make_tensor_proto` semantics, that the internal engine follows
+@pytest.mark.parametrize('values, kwargs, dtype, shape, field', [
+    (1.0, {}, types_pb2.DT_FLOAT, [], 'float_val'),
+    ([1, 2, 3], {}, types_pb2.DT_INT32, [3], 'tensor_content'),
+    ([1, 2 ** 40], {}, types_pb2.DT_INT64, [2], 'tensor_content'),
+    (5, {'shape': [3]}, types_pb2.DT_INT32, [3], 'int_val'),
+    ([1, 2], {'shape': [4]}, types_pb2.DT_INT32, [4], 'int_val'),
+    (True, {}, types_pb2.DT_BOOL, [], 'bool_val'),
+    (1 + 2j, {}, types_pb2.DT_COMPLEX128, [], 'dcomplex_val'),
+    ([[1, 2], [3, 4]], {'dtype': 'float16'}, types_pb2.DT_HALF, [2, 2], 'tensor_content'),
+    (['a', 'bc'], {}, types_pb2.DT_STRING, [2], 'string_val'),
+    (np.zeros((2, 3), np.uint8), {}, types_pb2.DT_UINT8, [2, 3], 'tensor_content'),
+    (np.float32(1), {'dtype': 'float64'}, types_pb2.DT_DOUBLE, [], 'double_val'),
+])
+def test_make_tensor_proto_semantics(values, kwargs, dtype, shape, field):
+    tensor = tensor_util.MakeTensorProto(values, **kwargs)
+    assert tensor.dtype == dtype
+    assert [dim.size for dim in tensor.tensor_shape.dim] == shape
+    assert [descriptor.name for descriptor, _ in tensor.ListFields()][-1] == field
+
+
+@pytest.mark.parametrize('values, kwargs, error', [
+    ([1, 2, 3], {'shape': [2]}, ValueError),
+    ([[1], [2, 3]], {}, ValueError),
+    ([1, None], {}, ValueError),
+    (5, {'shape': [2], 'verify_shape': True}, TypeError),
+    ([1, 2], {'shape': [2, 2], 'allow_broadcast': True}, TypeError),
+    (np.zeros(3, np.float32), {'dtype': 'string'}, TypeError),
+    (['a'], {'dtype': 'int32'}, TypeError),
+])
+def test_make_tensor_proto_errors(values, kwargs, error):
+    with pytest.raises(error):
+        tensor_util.MakeTensorProto(values, **kwargs)
+
+
+PARITY_CASES = [
+    (1.0, {}), ([1, 2, 3], {}), ([1, 2 ** 40], {}), (5, {'shape': [3]}), ([1, 2], {'shape': [4]}),
+    (True, {}), ([[1.5, 2], [3, 4]], {}), (['a', 'bc'], {}), (np.arange(6, dtype=np.int32), {}),
+    (np.arange(6, dtype=np.uint8).reshape(2, 3), {}), (np.float32(2), {'dtype': 'float64'}),
+    (np.arange(4, dtype=np.float32), {'dtype': 'float16'}), (7, {'shape': [2, 2], 'allow_broadcast': True}),
+    (np.array([b'a', b'bc'], dtype=object), {}), (np.arange(3, dtype=np.complex64), {}),
+]
+
+
+@pytest.fixture
+def tensorflow():
+    try:
+        tf_utils.use_engine('tensorflow')
+    except ImportError:
+        pytest.skip('TensorFlow is not installed')
+    try:
+        yield tf_utils
+    finally:
+        tf_utils.use_engine('internal')
+
+
+@pytest.mark.parametrize('values, kwargs', PARITY_CASES)
+def test_parity_with_tensorflow(tensorflow, values, kwargs):
+    tensor = tensorflow.make_tensor_proto(values, **kwargs)
+    assert tensor_util.MakeTensorProto(values, **kwargs) == tensor
+    np.testing.assert_array_equal(tensor_util.MakeNdarray(tensor), tensorflow.make_ndarray(tensor))
+
+
+# the vendored dtypes are given to TensorFlow as `DataType` enum values
+def test_parity_with_tensorflow_vendored_dtypes(tensorflow):
+    values = np.arange(6).reshape(2, 3)
+    tensor = tensorflow._make_tensor_proto(values, dtypes.int64)
+    assert tensor.dtype == types_pb2.DT_INT64
+    np.testing.assert_array_equal(tensorflow.make_ndarray(tensor), values)
+
+
+def test_parity_with_tensorflow_batch_of_buffers(tensorflow):
+    examples = [np.full((2, 3), i, np.float32) for i in range(4)]
+    tensor = tensorflow._make_batch_tensor_proto([example.tobytes() for example in examples],
+                                                 dtypes.float32, (2, 3))
+    assert tensor_util.MakeBatchTensorProto(examples) == tensor
+
+
+def test_stack_examples():
+    examples = [np.full((2, 3), i, np.float32) for i in range(4)]
+    np.testing.assert_array_equal(tf_utils._stack_examples(examples), np.stack(examples))
+    buffers = [example.tobytes() for example in examples]
+    np.testing.assert_array_equal(tf_utils._stack_examples(buffers, dtypes.float32, (2, 3)),
+                                  np.stack(examples))
+    with pytest.raises(ValueError):
+        tf_utils._stack_examples(buffers)
+    with pytest.raises(ValueError):
+        tf_utils._stack_examples(buffers, dtypes.float32, (3, 3))
+    with pytest.raises(ValueError):
+        tf_utils._stack_examples(examples, example_shape=(3, 2))
+    with pytest.raises(ValueError):
+        tf_utils._stack_examples([])
+    assert tf_utils._datatype_enum(dtypes.int64) == types_pb2.DT_INT64
+    assert tf_utils._datatype_enum(np.float16) == types_pb2.DT_HALF
+    assert tf_utils._datatype_enum(None) is None
+
+
+EXAMPLES = [np.arange(6, dtype=np.float32).reshape(2, 3) * i for i in range(4)]
+
+
+@pytest.mark.parametrize('dtype', [np.float32, np.int32, np.uint8, np.float16])
+def test_batch_tensor_proto(dtype):
+    examples = [example.astype(dtype) for example in EXAMPLES]
+    assert tensor_util.MakeBatchTensorProto(examples) == tensor_util.MakeTensorProto(np.stack(examples))
+    # from any iterable, e.g. a generator
+    assert tensor_util.MakeBatchTensorProto(iter(examples)) == tensor_util.MakeTensorProto(np.stack(examples))
+
+
+def test_batch_tensor_proto_of_buffers():
+    buffers = [example.tobytes() for example in EXAMPLES]
+    tensor = tensor_util.MakeBatchTensorProto(buffers, dtypes.float32, (2, 3))
+    assert tensor == tensor_util.MakeTensorProto(np.stack(EXAMPLES))
+    # as well as `bytearray`s and `memoryview`s
+    tensor = tensor_util.MakeBatchTensorProto([memoryview(bytearray(buffer)) for buffer in buffers],
+                                              np.float32, [2, 3])
+    assert tensor == tensor_util.MakeTensorProto(np.stack(EXAMPLES))
+
+
+def test_batch_tensor_proto_float64():
+    examples = [example.astype(np.float64) for example in EXAMPLES]
+    tensor = tensor_util.MakeBatchTensorProto(examples)
+    assert tensor.dtype == types_pb2.DT_FLOAT
+    np.testing.assert_array_equal(tensor_util.MakeNdarray(tensor), np.stack(EXAMPLES))
+
+
+@pytest.mark.parametrize('examples, kwargs', [
+    ([], {}),
+    ([EXAMPLES[0], EXAMPLES[1][:1]], {}),
+    (EXAMPLES, {'example_shape': (3, 2)}),
+    ([example.tobytes() for example in EXAMPLES], {}),
+    ([example.tobytes() for example in EXAMPLES], {'dtype': dtypes.float32}),
+    ([example.tobytes() for example in EXAMPLES], {'dtype': dtypes.float32, 'example_shape': (2, 2)}),
+    ([EXAMPLES[0].tobytes(), EXAMPLES[1].tobytes()[:-4]], {'dtype': dtypes.float32, 'example_shape': (2, 3)}),
+])
+def test_batch_tensor_proto_errors(examples, kwargs):
+    with pytest.raises(ValueError):
+        tensor_util.MakeBatchTensorProto(examples, **kwargs)
+
+
+def test_predict_request_examples():
+    request = Message.unwrap_pb(PredictRequest(inputs={
+        'k': {'examples': EXAMPLES},
+        'b': {'examples': [example.tobytes() for example in EXAMPLES], 'dtype': dtypes.float32,
+              'example_shape': (2, 3)},
+    }))
+    assert request.inputs['k'] == tensor_util.MakeTensorProto(np.stack(EXAMPLES))
+    assert request.inputs['b'] == request.inputs['k']
+    with pytest.raises(ValueError):
+        PredictRequest(inputs={'k': {'examples': [EXAMPLES[0], EXAMPLES[1][:1]]}})
+
+
+@pytest.mark.parametrize('downcast, enum', [('float16', types_pb2.DT_HALF), (dtypes.bfloat16, types_pb2.DT_BFLOAT16)])
+def test_downcast(downcast, enum):
+    values = np.linspace(-1, 1, 12, dtype=np.float32).reshape(3, 4)
+    assert tf_utils._make_tensor_proto(values, downcast=downcast).dtype == enum
+    assert tf_utils._make_tensor_proto(values.astype(np.float64), downcast=downcast).dtype == enum
+    assert tf_utils._make_batch_tensor_proto(list(values), downcast=downcast).dtype == enum
+    # an explicit `dtype`, and non-float inputs, are left as is
+    assert tf_utils._make_tensor_proto(values, dtypes.float32, downcast=downcast).dtype == types_pb2.DT_FLOAT
+    assert tf_utils._make_tensor_proto(values.astype(np.int32), downcast=downcast).dtype == types_pb2.DT_INT32
+
+
+@pytest.mark.parametrize('float_dtype, enum', [('float16', types_pb2.DT_HALF), ('bfloat16', types_pb2.DT_BFLOAT16)])
+def test_predict_request_float_dtype(float_dtype, enum):
+    values = np.linspace(-1, 1, 12, dtype=np.float32).reshape(3, 4)
+    request = Message.unwrap_pb(PredictRequest(float_dtype=float_dtype, inputs={
+        'x': {'values': values},
+        'batch': {'examples': list(values)},
+        'typed': {'values': values, 'dtype': dtypes.float32},
+        'ids': {'values': np.arange(4, dtype=np.int32)},
+    }))
+    assert request.inputs['x'].dtype == request.inputs['batch'].dtype == enum
+    assert request.inputs['typed'].dtype == types_pb2.DT_FLOAT
+    assert request.inputs['ids'].dtype == types_pb2.DT_INT32
+    # half precision, rounded to the nearest
+    np.testing.assert_allclose(tensor_util.MakeNdarray(request.inputs['x']), values, rtol=1e-2)
+    # not asked for, float32 stays float32
+    request = Message.unwrap_pb(PredictRequest(inputs={'x': {'values': values}}))
+    assert request.inputs['x'].dtype == types_pb2.DT_FLOAT
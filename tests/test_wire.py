@@ -0,0 +1,118 @@
+import numpy as np
+import pytest
+
+import stand_in_server
+from tensorflow_serving.apis import predict_pb2
+
+import wire
+from apis import ModelSpec, PredictionService, PredictRequest, PredictResponse
+from tf_utils import _make_tensor_proto
+
+OUTPUTS = {'scores': np.arange(6, dtype=np.float32).reshape(2, 3), 'classes': np.array([3, 1], np.int64),
+           'labels': np.array([b'cat', b'dog'], dtype=object)}
+
+
+@pytest.fixture(scope='module')
+def data():
+    return stand_in_server.predict_response(OUTPUTS)
+
+
+@pytest.mark.parametrize('value', [0, 1, 127, 128, 300, 2 ** 32, 2 ** 63 - 1, -1, -2 ** 31])
+def test_varint(value):
+    encoded = wire.encode_varint(value)
+    decoded, pos = wire.decode_varint(b'\x00' + encoded + b'\x00', 1)
+    assert pos == len(encoded) + 1
+    assert decoded == value % (1 << 64)
+
+
+def test_iter_fields(data):
+    response = predict_pb2.PredictResponse.FromString(data)
+    fields = list(wire.iter_fields(data))
+    assert [number for number, _, _, _ in fields].count(1) == len(OUTPUTS)
+    number, wire_type, start, stop = fields[-1]
+    assert (number, wire_type) == (2, wire.WIRETYPE_LENGTH_DELIMITED)
+    assert data[start:stop] == response.model_spec.SerializeToString()
+
+
+@pytest.mark.parametrize('data, error', [
+    (b'\x80', 'Truncated varint'),                       # tag cut off
+    (b'\x08\x80\x80', 'Truncated varint'),               # varint value cut off
+    (b'\x08' + b'\xff' * 10 + b'\x01', 'Malformed varint'),
+    (b'\x0b', 'Unsupported wire type'),                  # start group
+    (b'\x0a\x05ab', 'Truncated message'),                # length past the end
+    (b'\x09\x00\x00', 'Truncated message'),              # fixed64 cut off
+    (b'\x0d\x00', 'Truncated message'),                  # fixed32 cut off
+])
+def test_iter_fields_malformed(data, error):
+    with pytest.raises(ValueError, match=error):
+        list(wire.iter_fields(data))
+
+
+def test_iter_fields_past_end():
+    # a field running past the end of the enclosing one
+    with pytest.raises(ValueError, match='Truncated message'):
+        list(wire.iter_fields(b'\x0a\x03\x0a\x05a\x00\x00\x00\x00', 2, 5))
+
+
+def test_scan_map(data):
+    response = predict_pb2.PredictResponse.FromString(data)
+    found = wire.scan_map(data, 1)
+    assert sorted(found) == sorted(OUTPUTS)
+    assert all(found[key] == response.outputs[key].SerializeToString() for key in OUTPUTS)
+    assert list(wire.scan_map(data, 1, ['scores', b'labels', 'missing'])) in (
+        ['scores', 'labels'], ['labels', 'scores'])
+
+
+@pytest.mark.parametrize('keys', [None, ['scores']])
+def test_scan_map_truncated(data, keys):
+    # cut anywhere but between two fields (which leaves a valid message)
+    ends = {stop for _, _, _, stop in wire.iter_fields(data)}
+    for size in set(range(1, len(data))) - ends:
+        with pytest.raises(ValueError):
+            wire.scan_map(data[:size], 1, keys)
+
+
+def test_scan_map_empty_entry():
+    # a map entry with neither key nor value, as for an empty key and value
+    assert wire.scan_map(b'\x0a\x00', 1) == {'': b''}
+
+
+def test_parse_outputs_from_bytes(data):
+    outputs = PredictResponse.parse_outputs_from_bytes(data, ['scores', 'labels'])
+    assert sorted(outputs) == ['labels', 'scores'] and 'classes' not in outputs
+    np.testing.assert_array_equal(outputs['scores'], OUTPUTS['scores'])
+    np.testing.assert_array_equal(outputs['labels'], OUTPUTS['labels'])
+    # decoded once
+    assert outputs['scores'] is outputs['scores']
+
+
+def test_lazy_outputs(data):
+    response = PredictResponse.wrap(predict_pb2.PredictResponse.FromString(data))
+    outputs = response.parse_outputs(lazy=True, copy=False)
+    assert len(outputs) == 3 and not outputs._arrays
+    np.testing.assert_array_equal(outputs['classes'], OUTPUTS['classes'])
+    assert list(outputs._arrays) == ['classes']
+
+
+def test_predict_bytes(data):
+    server, address = stand_in_server.serve(lambda request: data)
+    try:
+        service = PredictionService(address)
+        request = PredictRequest(model_spec=ModelSpec(name='model'),
+                                 inputs={'x': {'values': np.zeros((1, 2), np.float32)}})
+        response = service.predict_bytes(request)
+        assert bytes(response) == data and not response.is_parsed
+        assert response.model_spec.name == 'model' and response.is_parsed
+        np.testing.assert_array_equal(response.parse_outputs()['scores'], OUTPUTS['scores'])
+        # already serialized
+        serialized = PredictRequest.unwrap_pb(request).SerializeToString()
+        assert service.predict_bytes(serialized).data == data
+    finally:
+        server.stop(None)
+
+
+def test_output_tensor_round_trip():
+    tensor = _make_tensor_proto(OUTPUTS['scores'])
+    response = predict_pb2.PredictResponse()
+    response.outputs['scores'].CopyFrom(tensor)
+    assert wire.scan_map(response.SerializeToString(), 1)['scores'] == tensor.SerializeToString()
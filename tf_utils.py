@@ -1,21 +1,129 @@
-# Fallback in case tensorflow library is not available.
-try:
-	from tensorflow.contrib.util import make_tensor_proto, make_ndarray
-	# Tensorflow implementation
-	_TENSORFLOW_AVAILABLE = True
-except ImportError:
-	from tensorflow.python.framework.tensor_util import MakeTensorProto, MakeNdarray
-	# Internal implementation
-	_TENSORFLOW_AVAILABLE = False
-
-print("Tensorflow Library Available: {}".format(_TENSORFLOW_AVAILABLE))
-
-def _make_tensor_proto(values, dtype=None, shape=None, verify_shape=False, allow_broadcast=False):
+import os
+
+import numpy as np
+
+# Internal implementation
+from tensorflow.python.framework import dtypes
+from tensorflow.python.framework.tensor_util import MakeTensorProto, MakeBatchTensorProto, MakeNdarray
+
+# The conversion engine: the internal codec (see `tensor_util`), unless the
+# TensorFlow library is asked for, i.e. with `use_engine('tensorflow')` or the
+# `TF_SERVING_CLIENT_ENGINE=tensorflow` environment variable. TensorFlow is
+# only imported then, as importing it just to build protos is costly.
+ENGINES = ('internal', 'tensorflow')
+
+_TENSORFLOW_AVAILABLE = False
+make_tensor_proto = make_ndarray = None
+
+def use_engine(engine):
+	global _TENSORFLOW_AVAILABLE, make_tensor_proto, make_ndarray
+	if engine not in ENGINES:
+		raise ValueError('`engine` must be one of {}, got {}.'.format(ENGINES, engine))
+	if engine == 'tensorflow':
+		# Tensorflow implementation
+		try:
+			from tensorflow.contrib.util import make_tensor_proto, make_ndarray
+		except ImportError:
+			# TensorFlow 2
+			from tensorflow import make_tensor_proto, make_ndarray
+	_TENSORFLOW_AVAILABLE = engine == 'tensorflow'
+
+use_engine(os.environ.get('TF_SERVING_CLIENT_ENGINE', 'internal'))
+
+_FLOAT_TYPES = (np.float32, np.float64)
+
+# `downcast` (i.e. float16 or bfloat16) is the dtype float inputs are encoded as,
+# when no `dtype` is given, halving their size; the model's signature must accept it.
+def _make_tensor_proto(values, dtype=None, shape=None, verify_shape=False, allow_broadcast=False,
+                       downcast=None):
+    if downcast is not None and dtype is None and getattr(values, 'dtype', None) in _FLOAT_TYPES:
+        dtype = downcast
+    if _TENSORFLOW_AVAILABLE:
+        return make_tensor_proto(values, _datatype_enum(dtype), shape, verify_shape, allow_broadcast)
+    return MakeTensorProto(values, dtype, shape, verify_shape, allow_broadcast)
+
+# `examples` is an iterable of per-example arrays (or raw buffers, see `MakeBatchTensorProto`)
+def _make_batch_tensor_proto(examples, dtype=None, example_shape=None, downcast=None):
+    examples = examples if isinstance(examples, (list, tuple)) else list(examples)
+    if downcast is not None and dtype is None and examples \
+            and getattr(examples[0], 'dtype', None) in _FLOAT_TYPES:
+        dtype = downcast
     if _TENSORFLOW_AVAILABLE:
-        return make_tensor_proto(values, dtype, shape, verify_shape, allow_broadcast)
-    return MakeTensorProto(values, dtype)
+        return make_tensor_proto(_stack_examples(examples, dtype, example_shape), _datatype_enum(dtype))
+    return MakeBatchTensorProto(examples, dtype, example_shape)
+
+# TensorFlow doesn't know the (vendored) `dtypes.DType`, it's given the `DataType` enum value
+def _datatype_enum(dtype):
+    return None if dtype is None else dtypes.as_dtype(dtype).as_datatype_enum
+
+# the batch of `examples` for TensorFlow, raw buffers read as `MakeBatchTensorProto` does
+def _stack_examples(examples, dtype=None, example_shape=None):
+    if not examples:
+        raise ValueError('Expected at least one example.')
+    if not isinstance(examples[0], np.ndarray):
+        if dtype is None or example_shape is None:
+            raise ValueError('`dtype` and `example_shape` are required for raw buffers.')
+        np_dtype = np.dtype(dtypes.as_dtype(dtype).as_numpy_dtype)
+        example_size = int(np.prod(example_shape, dtype=np.int64)) * np_dtype.itemsize
+        for example in examples:
+            if memoryview(example).nbytes != example_size:
+                raise ValueError('Expected a buffer of {} bytes, got {}'.format(
+                    example_size, memoryview(example).nbytes))
+        examples = [np.frombuffer(example, np_dtype).reshape(example_shape) for example in examples]
+    elif example_shape is not None:
+        example_shape = tuple(example_shape)
+        for example in examples:
+            if np.shape(example) != example_shape:
+                raise ValueError('Expected an example of shape {}, got {}'.format(example_shape, np.shape(example)))
+    return np.stack(examples)
+
+# `sparse` is a SciPy sparse matrix (or array), anything with `indices`, `values`
+# and `dense_shape` attributes (e.g. TF's `SparseTensorValue`), or such a tuple.
+# Returns the int64 `indices` of shape (nnz, rank), the `values` (nnz,) and the
+# int64 `dense_shape` (rank,), without densifying; with `reorder`, the entries
+# are sorted by their indices (row-major), as TensorFlow's sparse ops expect.
+def _sparse_components(sparse, reorder=True):
+    if hasattr(sparse, 'tocoo'):
+        # SciPy isn't imported here, its sparse matrices convert themselves
+        coo = sparse.tocoo()
+        indices = np.empty((coo.nnz, 2), dtype=np.int64)
+        indices[:, 0] = coo.row
+        indices[:, 1] = coo.col
+        values, dense_shape = coo.data, coo.shape
+    elif hasattr(sparse, 'dense_shape'):
+        indices, values, dense_shape = sparse.indices, sparse.values, sparse.dense_shape
+    else:
+        indices, values, dense_shape = sparse
+    dense_shape = np.asarray(dense_shape, dtype=np.int64).reshape(-1)
+    indices = np.asarray(indices, dtype=np.int64)
+    if indices.size == 0:
+        indices = indices.reshape(0, dense_shape.size)
+    if indices.ndim != 2 or indices.shape[1] != dense_shape.size or len(values) != len(indices):
+        raise ValueError('Expected `indices` of shape (nnz, rank), `values` of shape (nnz,) and '
+                         '`dense_shape` of shape (rank,), got {}, {} and {}.'.format(
+                             indices.shape, np.shape(values), dense_shape.shape))
+    if reorder and not _is_ordered(indices):
+        order = np.lexsort(indices.T[::-1])
+        indices = indices[order]
+        # lists are kept as lists, so that their dtype is inferred as for dense inputs
+        values = values[order] if isinstance(values, np.ndarray) else np.asarray(values)[order].tolist()
+    return indices, values, dense_shape
+
+# whether each row of `indices` is (strictly) after the previous one, in row-major order
+def _is_ordered(indices):
+    if len(indices) < 2:
+        return True
+    diff = indices[1:] - indices[:-1]
+    # the first non-zero difference of each pair decides (none, i.e. duplicates, is unordered)
+    first = (diff != 0).argmax(axis=1)
+    return bool((diff[np.arange(len(diff)), first] > 0).all())
 
-def _make_ndarray(tensor):
+# `copy=False` may return a read-only view over the tensor's bytes (see `MakeNdarray`)
+def _make_ndarray(tensor, copy=True, out=None):
 	if _TENSORFLOW_AVAILABLE:
-		return make_ndarray(tensor)
-	return MakeNdarray(tensor)
+		values = make_ndarray(tensor)
+		if out is None:
+			return values
+		out[...] = values
+		return out
+	return MakeNdarray(tensor, copy, out)
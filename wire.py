@@ -0,0 +1,102 @@
+# Helpers for reading and writing the protobuf wire format by hand, for the
+# few places where building (or parsing) the whole `pb` message is avoidable.
+# See: https://developers.google.com/protocol-buffers/docs/encoding
+
+WIRETYPE_VARINT = 0
+WIRETYPE_FIXED64 = 1
+WIRETYPE_LENGTH_DELIMITED = 2
+WIRETYPE_FIXED32 = 5
+
+
+def encode_varint(value):
+    if value < 0:
+        # negative int32/int64 values are always encoded as 10 bytes
+        value += 1 << 64
+    out = bytearray()
+    while value > 0x7f:
+        out.append((value & 0x7f) | 0x80)
+        value >>= 7
+    out.append(value)
+    return bytes(out)
+
+
+def encode_tag(field_number, wire_type):
+    return encode_varint((field_number << 3) | wire_type)
+
+
+def encode_length_delimited(field_number, data):
+    return encode_tag(field_number, WIRETYPE_LENGTH_DELIMITED) + encode_varint(len(data)) + data
+
+
+def decode_varint(data, pos):
+    '''Returns the varint at `data[pos]` and the position right after it.'''
+    value = shift = 0
+    try:
+        while True:
+            byte = data[pos]
+            pos += 1
+            value |= (byte & 0x7f) << shift
+            if byte < 0x80:
+                return value, pos
+            shift += 7
+            if shift >= 70:
+                raise ValueError('Malformed varint (more than 10 bytes).')
+    except IndexError:
+        raise ValueError('Truncated varint.') from None
+
+
+def iter_fields(data, pos=0, end=None):
+    '''Yields `(field_number, wire_type, start, stop)` for each field in `data[pos:end]`.
+
+    For varints `start:stop` spans the encoded varint, for length-delimited
+    fields it spans the payload (i.e. without the length prefix). Raises
+    `ValueError` on malformed input, or a field running past `end`.
+    '''
+    if end is None:
+        end = len(data)
+    while pos < end:
+        tag, pos = decode_varint(data, pos)
+        field_number, wire_type = tag >> 3, tag & 0x7
+        if wire_type == WIRETYPE_VARINT:
+            start = pos
+            _, pos = decode_varint(data, pos)
+        elif wire_type == WIRETYPE_LENGTH_DELIMITED:
+            length, start = decode_varint(data, pos)
+            pos = start + length
+        elif wire_type == WIRETYPE_FIXED64:
+            start, pos = pos, pos + 8
+        elif wire_type == WIRETYPE_FIXED32:
+            start, pos = pos, pos + 4
+        else:
+            raise ValueError('Unsupported wire type {} (field {}).'.format(wire_type, field_number))
+        if pos > end:
+            raise ValueError('Truncated message.')
+        yield field_number, wire_type, start, pos
+
+
+def scan_map(data, field_number, keys=None):
+    '''Returns the raw (serialized) values of the `string` keyed map `field_number` of `data`.
+
+    Only the entries whose key is in `keys` (all, if None) are sliced out,
+    the others are skipped over without being parsed.
+    '''
+    if keys is not None:
+        keys = {key.encode() if isinstance(key, str) else key for key in keys}
+    found = {}
+    for number, wire_type, start, stop in iter_fields(data):
+        if number != field_number or wire_type != WIRETYPE_LENGTH_DELIMITED:
+            continue
+        key = value = None
+        # entry := key (1), value (2)
+        for entry_number, _, entry_start, entry_stop in iter_fields(data, start, stop):
+            if entry_number == 1:
+                key = data[entry_start:entry_stop]
+                if keys is not None and key not in keys:
+                    break
+            elif entry_number == 2:
+                value = (entry_start, entry_stop)
+        else:
+            key = bytes(key or b'')
+            if keys is None or key in keys:
+                found[key.decode()] = data[value[0]:value[1]] if value else b''
+    return found